@@ -0,0 +1,389 @@
+"""
+bench
+=====
+
+Benchmarks for the load, transform, and render hot paths of tasyba.
+
+Each benchmark runs a stage (such as `read_table` or `build_html_table`)
+over a dataset, either synthetic (tall or wide tables, in different
+encodings and with different delimiters) or real (`second_demo/carib.tsv`).
+Every stage is run in a fresh process, so that its peak memory can be
+measured, and reports wall time, throughput in rows and megabytes per
+second, and peak resident set size.
+
+Results are stored as JSON files in `benchmarks/results/`, which can be
+compared between versions:
+
+    python benchmarks/bench.py --size medium --label before
+    python benchmarks/bench.py --size medium --label after
+    python benchmarks/bench.py --compare results/before.json results/after.json
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+# Import the library
+import tasyba
+
+# Paths to the benchmark directory, the default results, and the real-world
+# dataset
+BENCH_PATH = Path(__file__).parent
+RESULTS_PATH = BENCH_PATH / "results"
+CARIB_PATH = BENCH_PATH.parent / "second_demo" / "carib.tsv"
+
+# Number of rows of tall and wide tables for each size preset; wide tables
+# always have `WIDE_COLUMNS` columns
+SIZES = {
+    "small": {"tall": 10_000, "wide": 500},
+    "medium": {"tall": 200_000, "wide": 5_000},
+    "large": {"tall": 2_000_000, "wide": 50_000},
+}
+WIDE_COLUMNS = 200
+
+# Synthetic datasets, as (name, shape, encoding, delimiter)
+DATASETS = [
+    ("tall-utf8-comma", "tall", "utf-8", ","),
+    ("tall-latin1-semicolon", "tall", "latin-1", ";"),
+    ("tall-utf8-tab", "tall", "utf-8", "\t"),
+    ("wide-utf8-comma", "wide", "utf-8", ","),
+]
+
+# Values for the categorical columns of synthetic tables
+REGIONS = ["north", "south", "east", "west", "centre"]
+GENDERS = ["boy", "girl"]
+STYLES = ["tee", "golf", "fancy", "polo", "tank"]
+NAMES = ["Ana", "Bjørn", "Céline", "Dário", "Éowyn", "François", "Günther", "Iñigo"]
+
+
+def generate_table(
+    filename: Path, shape: str, rows: int, encoding: str, delimiter: str
+):
+    """
+    Writes a synthetic table, with the same contents for the same arguments.
+
+    Tall tables follow a "sales" layout (with `region`, `gender`, `style`, and
+    `units` columns, suitable for pivoting) plus numeric, date, and text
+    columns with non-ASCII characters; wide tables add `WIDE_COLUMNS`
+    numeric columns to it.
+    """
+
+    rng = random.Random(rows)
+
+    header = ["id", "region", "gender", "style", "units", "price", "date", "name"]
+    if shape == "wide":
+        header += [f"col{idx}" for idx in range(WIDE_COLUMNS)]
+
+    with open(filename, "w", encoding=encoding, newline="") as handler:
+        handler.write(delimiter.join(header) + "\n")
+        for idx in range(rows):
+            row = [
+                str(idx),
+                rng.choice(REGIONS),
+                rng.choice(GENDERS),
+                rng.choice(STYLES),
+                str(rng.randint(1, 50)),
+                "%.2f" % rng.uniform(1, 100),
+                "2020-%02i-%02i" % (rng.randint(1, 12), rng.randint(1, 28)),
+                "%s %i" % (rng.choice(NAMES), rng.randint(1, 1000)),
+            ]
+            if shape == "wide":
+                row += [str(rng.randint(0, 9999)) for _ in range(WIDE_COLUMNS)]
+            handler.write(delimiter.join(row) + "\n")
+
+
+def prepare_datasets(data_path: Path, size: str) -> List[Dict[str, Any]]:
+    """
+    Generates the synthetic datasets, if needed, and lists all datasets.
+    """
+
+    datasets = []
+    for name, shape, encoding, delimiter in DATASETS:
+        rows = SIZES[size][shape]
+        filename = data_path / f"{name}-{rows}.csv"
+        if not filename.exists():
+            print(f"Generating `{filename.name}`...", file=sys.stderr)
+            generate_table(filename, shape, rows, encoding, delimiter)
+        datasets.append({"name": name, "path": filename, "rows": rows, "pivot": True})
+
+    if CARIB_PATH.exists():
+        with open(CARIB_PATH, encoding="utf-8") as handler:
+            rows = sum(1 for _ in handler) - 1
+        datasets.append(
+            {"name": "carib", "path": CARIB_PATH, "rows": rows, "pivot": False}
+        )
+
+    return datasets
+
+
+# Stages: each is a function receiving a dataset and a working directory, and
+# returning a function to be timed (anything before it is setup, and is not
+# timed), which returns the number of rows processed
+
+
+def stage_read_tabular(dataset, work_path):
+    def run():
+        return sum(1 for _ in tasyba.iter_tabular(dataset["path"]))
+
+    return run
+
+
+def stage_read_table(dataset, work_path):
+    def run():
+        return len(tasyba.read_table(dataset["path"]))
+
+    return run
+
+
+def stage_describe_resource(dataset, work_path):
+    # Frictionless only reads relative paths by default
+    os.chdir(dataset["path"].parent)
+
+    def run():
+        tasyba.describe_resource(dataset["path"].name, cache=False)
+        return dataset["rows"]
+
+    return run
+
+
+def stage_run_makefile(dataset, work_path):
+    if not dataset["pivot"]:
+        return None
+
+    config = {
+        "steps": [
+            {"add_resource": {"name": "data", "source": dataset["path"].name}},
+            {"table_pivot": {"name": "data", "columns": ["region", "gender", "units"]}},
+        ]
+    }
+    os.chdir(dataset["path"].parent)
+
+    def run():
+        package = tasyba.run_makefile(config, dataset["path"].parent)
+        package.get_resource("data").read_rows()
+        return dataset["rows"]
+
+    return run
+
+
+def stage_build_html_table(dataset, work_path):
+    tables = {"data": tasyba.read_table(dataset["path"])}
+    template_env = tasyba.load_template({})
+    replaces = {
+        key: "benchmark"
+        for key in ["title", "description", "author", "favicon", "mainlink", "citation"]
+    }
+    os.chdir(work_path)
+
+    def run():
+        tasyba.build_html_table("data", tables, replaces, template_env)
+        return len(tables["data"])
+
+    return run
+
+
+STAGES = {
+    "read_tabular": stage_read_tabular,
+    "read_table": stage_read_table,
+    "describe_resource": stage_describe_resource,
+    "run_makefile": stage_run_makefile,
+    "build_html_table": stage_build_html_table,
+}
+
+
+def _run_stage(stage, dataset, work_path, connection):
+    # Run a stage in a child process, sending back its measurements
+    try:
+        run = STAGES[stage](dataset, work_path)
+        if run is None:
+            connection.send(None)
+            return
+
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        rows = run()
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+
+        # Linux reports the peak in kilobytes, macOS in bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if sys.platform != "darwin":
+            peak *= 1024
+
+        connection.send({"rows": rows, "wall": wall, "cpu": cpu, "peak_rss": peak})
+    except Exception as error:
+        # Report the type and message of the error, as its representation
+        # can hold whole samples of data (e.g., for decoding errors)
+        connection.send({"error": f"{type(error).__name__}: {error}"})
+
+
+def run_stage(stage: str, dataset: Dict[str, Any], work_path: Path) -> Optional[Dict]:
+    """
+    Runs a stage over a dataset in a fresh process, returning its results.
+    """
+
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_run_stage, args=(stage, dataset, work_path, sender)
+    )
+    process.start()
+    result = receiver.recv()
+    process.join()
+
+    if result is None:
+        return None
+
+    result.update(stage=stage, dataset=dataset["name"])
+    if "error" not in result:
+        size = dataset["path"].stat().st_size
+        result["bytes"] = size
+        result["rows_per_s"] = result["rows"] / result["wall"]
+        result["mb_per_s"] = size / 1e6 / result["wall"]
+
+    return result
+
+
+def metadata() -> Dict[str, Any]:
+    """
+    Collects information on the environment of a benchmark run.
+    """
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_PATH,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = None
+
+    return {
+        "version": tasyba.__version__,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def print_results(results: List[Dict[str, Any]]):
+    """
+    Prints benchmark results as a table.
+    """
+
+    print(
+        f"{'stage':<18} {'dataset':<22} {'rows':>10} {'wall (s)':>9} "
+        f"{'rows/s':>11} {'MB/s':>8} {'peak RSS (MB)':>14}"
+    )
+    for result in results:
+        if "error" in result:
+            print(
+                f"{result['stage']:<18} {result['dataset']:<22} "
+                f"FAILED ({result['error']})"
+            )
+            continue
+        print(
+            f"{result['stage']:<18} {result['dataset']:<22} {result['rows']:>10} "
+            f"{result['wall']:>9.3f} {result['rows_per_s']:>11.0f} "
+            f"{result['mb_per_s']:>8.2f} {result['peak_rss'] / 1e6:>14.1f}"
+        )
+
+
+def compare(baseline_file: Path, current_file: Path):
+    """
+    Prints the ratios of wall time and peak memory between two result files.
+    """
+
+    with open(baseline_file, encoding="utf-8") as handler:
+        baseline = json.load(handler)
+    with open(current_file, encoding="utf-8") as handler:
+        current = json.load(handler)
+
+    baseline_results = {
+        (result["stage"], result["dataset"]): result
+        for result in baseline["results"]
+        if "error" not in result
+    }
+
+    print(f"{'stage':<18} {'dataset':<22} {'wall':>8} {'peak RSS':>9}")
+    for result in current["results"]:
+        base = baseline_results.get((result["stage"], result["dataset"]))
+        if base is None or "error" in result:
+            continue
+        print(
+            f"{result['stage']:<18} {result['dataset']:<22} "
+            f"{result['wall'] / base['wall']:>7.2f}x "
+            f"{result['peak_rss'] / base['peak_rss']:>8.2f}x"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tasyba hot paths.")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--datasets", nargs="+", help="Names of datasets to run.")
+    parser.add_argument(
+        "--data-dir", type=Path, help="Where to keep generated datasets."
+    )
+    parser.add_argument("--label", help="Name of the results file.")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        type=Path,
+        metavar=("BASELINE", "CURRENT"),
+        help="Compare two results files instead of running benchmarks.",
+    )
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    data_path = args.data_dir or Path(tempfile.gettempdir()) / "tasyba-bench"
+    data_path.mkdir(parents=True, exist_ok=True)
+    datasets = prepare_datasets(data_path, args.size)
+    if args.datasets:
+        datasets = [dataset for dataset in datasets if dataset["name"] in args.datasets]
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for stage in args.stages:
+            for dataset in datasets:
+                print(f"Running `{stage}` on `{dataset['name']}`...", file=sys.stderr)
+                result = run_stage(stage, dataset, Path(work_dir))
+                if result:
+                    results.append(result)
+
+    print_results(results)
+
+    # Store the results
+    RESULTS_PATH.mkdir(exist_ok=True)
+    meta = metadata()
+    label = args.label or f"{meta['version']}-{meta['commit']}-{args.size}"
+    results_file = RESULTS_PATH / f"{label}.json"
+    with open(results_file, "w", encoding="utf-8") as handler:
+        json.dump(
+            {"metadata": meta, "size": args.size, "results": results},
+            handler,
+            indent=2,
+            default=str,
+        )
+    print(f"Results written to `{results_file}`.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
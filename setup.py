@@ -38,8 +38,12 @@ setup(
     ],
     data_files=resource_files,
     description="A set of tools for managing and deploying tabular data",
+    entry_points={"console_scripts": ["tasyba=tasyba.__main__:main"]},
     extras_require={
+        "arrow": ["pyarrow"],
+        "brotli": ["brotli"],
         "dev": ["black", "flake8", "twine", "wheel"],
+        "numpy": ["numpy"],
         "test": ["pytest"],
     },
     include_package_data=True,
@@ -51,7 +55,7 @@ setup(
     name="tasyba",
     packages=find_packages(where="src"),
     package_dir={"": "src"},
-    python_requires=">=3.6",
+    python_requires=">=3.7",
     test_suite="tests",
     tests_require=[],
     url="https://github.com/tresoldi/tasyba",
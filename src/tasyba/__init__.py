@@ -1,5 +1,10 @@
 """
 tasyba __init__.py file
+
+The functions and classes of the package namespace are loaded lazily, on
+first access, so that importing tasyba (as done by the command-line
+interface and by every worker process) does not import slow dependencies,
+such as frictionless, that the task at hand might not need.
 """
 
 # Package metadata
@@ -8,85 +13,103 @@ __author__ = "Tiago Tresoldi"
 __email__ = "tiago.tresoldi@lingfil.uu.se"
 
 # Import Python standard libraries
-from pathlib import Path  # TODO: drop when moving to frictionless
-
-# Import modules
-from .common import read_tabular
-from .fl import describe_resource
-from .render import render_database, load_template, build_html_table
-from .script import load_makefile, run_makefile
-
-
-def caller(filepath):
-    # TODO: move to header when moving to its own module
-    from frictionless import Package
+from typing import TYPE_CHECKING
+import importlib
 
-    # Read and parse configuration file
-    config = load_makefile(filepath)
+# Modules providing each name of the package namespace
+_LAZY = {
+    "read_tabular": "common",
+    "iter_tabular": "common",
+    "read_table": "common",
+    "MappedTabular": "mapped",
+    "describe_resource": "fl",
+    "describe_resource_descriptor": "fl",
+    "ResourceCache": "cache",
+    "render_database": "render",
+    "load_template": "render",
+    "build_html_table": "render",
+    "build_html_tables": "render",
+    "build_sql_page": "render",
+    "load_makefile": "script",
+    "run_makefile": "script",
+    "compile_makefile": "script",
+    "dependencies": "scheduler",
+    "prefetch": "scheduler",
+    "BuildManifest": "manifest",
+    "Profiler": "instrument",
+    "stage": "instrument",
+    "Table": "table",
+    "infer_types": "inference",
+    "infer_schema": "inference",
+    "build_replaces": "deploy",
+    "caller": "deploy",
+    "Deployment": "deploy",
+    "Watcher": "watcher",
+    "watch": "watcher",
+}
 
-    # Iterate over the steps
-    package = Package()
-    tables = {}
-    for entry in config["steps"]:
-        # Obtain a tuple representation of the entry, from where we draw the command and
-        # its arguments, making it easier to later move to a programming-language-like
-        # interface
-        command, args = tuple(entry.items())[0]
+# Let static analyzers see the lazy names
+if TYPE_CHECKING:
+    from .common import read_tabular, iter_tabular, read_table
+    from .mapped import MappedTabular
+    from .fl import describe_resource, describe_resource_descriptor
+    from .cache import ResourceCache
+    from .render import render_database, load_template, build_html_table
+    from .render import build_html_tables, build_sql_page
+    from .script import load_makefile, run_makefile, compile_makefile
+    from .scheduler import dependencies, prefetch
+    from .manifest import BuildManifest
+    from .instrument import Profiler, stage
+    from .table import Table
+    from .inference import infer_types, infer_schema
+    from .deploy import build_replaces, caller, Deployment
+    from .watcher import Watcher, watch
 
-        if command == "describe_resource":
-            # Describe a resource
-            resource = describe_resource(args["source"])
 
-            # Store the resource if requested
-            # TODO: check if the name is already taken, have a flag to overwrite
-            if "write" in args:
-                resource.to_yaml(args["write"])
+def __getattr__(name):
+    # Import the module providing a name on first access, storing the name
+    # in the namespace so that later accesses do not reach this function
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-        elif command == "add_resource":
-            # Add a resource to the package; if we point to a YAML file,
-            # we assume it is a frictionless resource description; otherwise,
-            # we assume it is a path to a raw data file (tabular, Excel,
-            # JSON, etc.), which must be loaded via a frictionless resource
-            # description
+    value = getattr(importlib.import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
 
-            # Load data
-            table_name = args.get("name", Path(args["source"]).stem)
-            tables[table_name] = read_tabular(args["source"])
-        elif command == "field_remove":
-            # Remove fields
-            # TODO: move to frictionless
-            for row in tables[args["table"]]:
-                for field in args["fields"]:
-                    del row[field]
-        elif command == "table_deploy":
-            # Build replacement dictionary; which for future expansions it is
-            # preferable to keep separate from the actual configuration while
-            # using a single file not to scare potential users with too much
-            # structure to learn. Remember that, in order to make
-            # deployment easy, we are being quite strict here in terms of
-            # templates, etc.
-            replaces = {
-                "title": args["title"],
-                "description": args["description"],
-                "author": args["author"],
-                "favicon": args["favicon"],
-                "mainlink": args["mainlink"],
-                "citation": args["citation"],
-            }
+    return value
 
-            # Load Jinja2 template
-            template_env = load_template(args)
 
-            # Render table as HTML
-            build_html_table(args["table"], tables, replaces, template_env)
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
 
 # Build the package namespace
 __all__ = [
     "read_tabular",
+    "iter_tabular",
+    "read_table",
+    "MappedTabular",
+    "Table",
+    "infer_types",
+    "infer_schema",
     "run_makefile",
     "load_makefile",
+    "compile_makefile",
     "load_template",
+    "build_html_table",
+    "build_html_tables",
+    "build_sql_page",
     "render_database",
+    "build_replaces",
     "caller",
+    "Deployment",
+    "watch",
+    "Watcher",
+    "dependencies",
+    "prefetch",
+    "describe_resource",
+    "describe_resource_descriptor",
+    "ResourceCache",
+    "BuildManifest",
+    "Profiler",
+    "stage",
 ]
@@ -0,0 +1,134 @@
+"""
+Command-line interface for tasyba.
+"""
+
+# Import Python standard libraries
+from typing import *
+import argparse
+import contextlib
+import logging
+import sys
+
+# Import the library
+import tasyba
+
+
+def compress_formats(value: str) -> List[str]:
+    """
+    Parses a comma-separated list of compression formats.
+    """
+
+    formats = [fmt.strip() for fmt in value.split(",") if fmt.strip()]
+    for fmt in formats:
+        if fmt not in ["gzip", "br"]:
+            raise argparse.ArgumentTypeError(f"invalid compression format: '{fmt}'")
+
+    return formats
+
+
+def main(argv: Optional[List[str]] = None):
+    """
+    Entry point for the command-line interface.
+    """
+
+    parser = argparse.ArgumentParser(
+        prog="tasyba", description="Run a tasyba deployment script."
+    )
+    parser.add_argument("script", help="The path to the script, in YAML format.")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="The maximum number of steps to run concurrently (default: 1).",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild all pages, even if their inputs did not change.",
+    )
+    parser.add_argument(
+        "--timestamp",
+        action="store_true",
+        help="Make the build time part of the inputs of each page; "
+        "otherwise, incremental builds leave it out of the pages.",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Write compressed copies of the outputs.",
+    )
+    parser.add_argument(
+        "--compress-formats",
+        type=compress_formats,
+        metavar="FORMATS",
+        help="The comma-separated formats of the compressed copies (gzip, br; "
+        "default: both; implies --compress).",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running, rebuilding the outputs affected by changes to "
+        "the sources and templates.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report the time, throughput, and memory of each step.",
+    )
+    parser.add_argument(
+        "--profile-json",
+        metavar="FILE",
+        help="Write the profiling report as JSON to FILE (implies --profile).",
+    )
+    parser.add_argument(
+        "--profile-dump",
+        metavar="DIR",
+        help="Write a cProfile dump of each step to DIR (implies --profile).",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="Show progress information."
+    )
+    args = parser.parse_args(argv)
+
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+
+    # A bare `--compress` selects all formats
+    compress = ()
+    if args.compress_formats:
+        compress = args.compress_formats
+    elif args.compress:
+        compress = ["gzip", "br"]
+
+    if args.watch:
+        tasyba.watch(
+            args.script,
+            jobs=args.jobs,
+            incremental=not args.force,
+            timestamp=args.timestamp,
+            compress=compress,
+        )
+        return
+
+    profiler = None
+    if args.profile or args.profile_json or args.profile_dump:
+        profiler = tasyba.Profiler(dump_dir=args.profile_dump)
+
+    with profiler or contextlib.ExitStack():
+        tasyba.caller(
+            args.script,
+            jobs=args.jobs,
+            incremental=not args.force,
+            timestamp=args.timestamp,
+            compress=compress,
+        )
+
+    if profiler:
+        print(profiler.report(), file=sys.stderr)
+        if args.profile_json:
+            profiler.save(args.profile_json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Module for grouping and pivoting tables.
+
+Rows are grouped by the dictionary codes of their keys, mapped to their
+rank in the sorted order of the values, so that values are never hashed nor
+compared row by row, and groups come out sorted. Numeric values are read
+from typed arrays where available (see `TypedValues`).
+
+Rows are aggregated in chunks: with NumPy, if installed, each chunk is
+reduced with a single sort of its groups; otherwise, the distinct
+combinations of groups and values of each chunk are counted first. When
+the number of groups held in memory exceeds a limit, the partial aggregates
+are spilled to disk, sorted, and merged at the end, so that memory use is
+bounded no matter the number of groups.
+"""
+
+# Import Python standard libraries
+from collections import Counter
+from itertools import compress, groupby
+from operator import itemgetter
+from typing import *
+import heapq
+import logging
+import pickle
+import tempfile
+
+# Import other modules
+from tasyba.instrument import stage
+from tasyba.table import Column, Table, TypedValues
+
+# Aggregation functions; missing values are ignored by all of them, so that
+# "count" is the number of values present
+AGGREGATES = ("sum", "mean", "count", "min", "max", "first")
+
+# Values considered missing
+MISSING_VALUES = {"", None}
+
+# Number of rows aggregated at a time
+CHUNK_ROWS = 1024 * 1024
+
+# Number of groups held in memory before spilling partial aggregates
+MAX_GROUPS = 1024 * 1024
+
+# Number of partial aggregates per record of the spill files
+SPILL_BATCH = 64 * 1024
+
+# How partial aggregates are combined, by function
+_COMBINE = {
+    "sum": lambda old, new: old + new,
+    "count": lambda old, new: old + new,
+    "mean": lambda old, new: (old[0] + new[0], old[1] + new[1]),
+    "min": min,
+    "max": max,
+    "first": lambda old, new: old,
+}
+
+
+def _numpy():
+    # Import NumPy, if installed, for vectorized reductions
+    try:
+        import numpy
+    except ImportError:
+        return None
+
+    return numpy
+
+
+def _sort_key(field_type: Optional[str]) -> Callable:
+    # Build the sort key of the values of a column, with missing values first
+    # and numbers in numeric order
+    if field_type in ("integer", "number"):
+        return lambda value: (1, float(value)) if value not in MISSING_VALUES else (0,)
+
+    return lambda value: (1, value) if value not in MISSING_VALUES else (0,)
+
+
+def _ranks(column: Column, field_type: Optional[str]) -> Tuple[List[int], List[int]]:
+    # Compute the rank of each code in the sorted order of the values of a
+    # column, and the code of each rank
+    values = list(column.values)
+    key = _sort_key(field_type)
+    order = sorted(range(len(values)), key=lambda code: key(values[code]))
+
+    ranks = [0] * len(values)
+    for rank, code in enumerate(order):
+        ranks[code] = rank
+
+    return ranks, order
+
+
+def _numbers(column: Column, field: str) -> List[Optional[Union[int, float]]]:
+    # Convert the distinct values of a column to numbers, for sums and means
+    if isinstance(column.values, TypedValues):
+        return column.values.tolist()
+
+    numbers = []
+    for value in column.values:
+        if value in MISSING_VALUES:
+            numbers.append(None)
+            continue
+        try:
+            numbers.append(int(value))
+        except ValueError:
+            try:
+                numbers.append(float(value))
+            except ValueError:
+                raise ValueError(
+                    f"Cannot aggregate non-numeric value `{value}` of `{field}`."
+                ) from None
+
+    return numbers
+
+
+def _chunk_python(key_codes, value_codes, key_ranks, present, operands, aggfun):
+    # Aggregate a chunk of rows, counting the distinct combinations of the
+    # codes of their keys and values first, so that only these are looked up
+    rows = zip(*key_codes, value_codes)
+
+    if aggfun == "first":
+        # Keep the first value of each group, as the last one assigned when
+        # going backwards
+        rows = list(compress(rows, map(present.__getitem__, value_codes)))
+        firsts = {codes[:-1]: codes[-1] for codes in reversed(rows)}
+        return {
+            tuple(map(list.__getitem__, key_ranks, codes)): operands[code]
+            for codes, code in firsts.items()
+        }
+
+    partial = {}
+    for codes, count in Counter(rows).items():
+        code = codes[-1]
+        if not present[code]:
+            continue
+        key = tuple(map(list.__getitem__, key_ranks, codes[:-1]))
+        operand = operands[code]
+        if aggfun == "count":
+            partial[key] = partial.get(key, 0) + count
+        elif aggfun == "sum":
+            partial[key] = partial.get(key, 0) + operand * count
+        elif aggfun == "mean":
+            old = partial.get(key, (0, 0))
+            partial[key] = (old[0] + operand * count, old[1] + count)
+        elif key in partial:
+            partial[key] = _COMBINE[aggfun](partial[key], operand)
+        else:
+            partial[key] = operand
+
+    return partial
+
+
+def _chunk_numpy(
+    np, key_codes, value_codes, key_ranks, present, operands, fractional, aggfun
+):
+    # Aggregate a chunk of rows with a single sort of their groups, whose
+    # identifiers combine the ranks of their keys, and reductions over the
+    # runs of each group; integer and float operands are summed apart, so
+    # that sums are floats only for groups with floats, as in Python
+    mask = present[np.frombuffer(value_codes, dtype=value_codes.typecode)]
+    group = np.zeros(int(mask.sum()), dtype=np.int64)
+    for ranks, codes in zip(key_ranks, key_codes):
+        group *= len(ranks)
+        group += ranks[np.frombuffer(codes, dtype=codes.typecode)[mask]]
+    if not len(group):
+        return {}
+
+    order = np.argsort(group, kind="stable")
+    codes = np.frombuffer(value_codes, dtype=value_codes.typecode)[mask][order]
+    group, values = group[order], operands[codes]
+    starts = np.flatnonzero(np.concatenate(([True], group[1:] != group[:-1])))
+    counts = np.diff(np.append(starts, len(group)))
+
+    if aggfun in ("sum", "mean"):
+        sums = np.add.reduceat(values, starts).tolist()
+        if fractional is not None:
+            floats, fractions = fractional
+            has_floats = np.logical_or.reduceat(floats[codes], starts).tolist()
+            float_sums = np.add.reduceat(fractions[codes], starts).tolist()
+            sums = [
+                int_sum + float_sum if has_float else int_sum
+                for int_sum, float_sum, has_float in zip(sums, float_sums, has_floats)
+            ]
+
+    if aggfun == "count":
+        results = counts.tolist()
+    elif aggfun == "sum":
+        results = sums
+    elif aggfun == "mean":
+        results = list(zip(sums, counts.tolist()))
+    elif aggfun == "min":
+        results = np.minimum.reduceat(values, starts).tolist()
+    elif aggfun == "max":
+        results = np.maximum.reduceat(values, starts).tolist()
+    else:
+        results = values[starts].tolist()
+
+    # Decode the identifiers of the groups into the ranks of their keys
+    group = group[starts]
+    keys = []
+    for ranks in reversed(key_ranks):
+        keys.append((group % len(ranks)).tolist())
+        group = group // len(ranks)
+
+    return dict(zip(zip(*reversed(keys)), results))
+
+
+def _spill(partials: Dict[Tuple, Any]):
+    # Write partial aggregates to a temporary file, sorted by group
+    handler = tempfile.TemporaryFile()
+    items = sorted(partials.items())
+    for idx in range(0, len(items), SPILL_BATCH):
+        pickle.dump(items[idx : idx + SPILL_BATCH], handler)
+
+    return handler
+
+
+def _read_spill(handler) -> Iterator[Tuple[Tuple, Any]]:
+    # Read the partial aggregates of a temporary file, closing it at the end
+    handler.seek(0)
+    with handler:
+        while True:
+            try:
+                yield from pickle.load(handler)
+            except EOFError:
+                return
+
+
+def aggregate(
+    table: Table,
+    keys: List[str],
+    field: str,
+    aggfun: str = "sum",
+    max_groups: int = MAX_GROUPS,
+    vectorized: Optional[bool] = None,
+) -> Tuple[Iterator[Tuple[Tuple[int, ...], str]], List[List[str]]]:
+    """
+    Aggregates the values of a field of a table, grouped by other fields.
+
+    Parameters
+    ----------
+    table : Table
+        The table.
+    keys : List[str]
+        The fields grouping the rows.
+    field : str
+        The field whose values are aggregated.
+    aggfun : str, optional
+        The aggregation function, one of `AGGREGATES`, by default "sum";
+        "sum" and "mean" require numeric values. Missing values are
+        ignored, and groups with no values are left out.
+    max_groups : int, optional
+        The maximum number of groups held in memory, above which partial
+        aggregates are spilled to disk, by default `MAX_GROUPS`.
+    vectorized : Optional[bool]
+        Whether to use NumPy, by default only if it is installed.
+
+    Returns
+    -------
+    Tuple[Iterator[Tuple[Tuple[int,...],str]],List[List[str]]]
+        An iterator over the groups, in sorted order, each as the ranks of
+        its keys and the aggregated value, and the values of each key by
+        rank.
+    """
+
+    if aggfun not in AGGREGATES:
+        raise ValueError(f"Unknown aggregation function: {aggfun}")
+
+    np = _numpy() if vectorized is not False else None
+    if vectorized and np is None:
+        raise ImportError("Vectorized aggregation requires `numpy`.")
+
+    # Rank the values of the keys, and prepare the operands of the values:
+    # numbers for sums and means, and ranks (which preserve the order of
+    # the values) otherwise
+    key_columns = [table.column(key) for key in keys]
+    key_ranks, key_orders = zip(
+        *[
+            _ranks(column, table.types.get(key))
+            for column, key in zip(key_columns, keys)
+        ]
+    )
+    column = table.column(field)
+    value_ranks, value_order = _ranks(column, table.types.get(field))
+    present = [value not in MISSING_VALUES for value in column.values]
+    if aggfun in ("sum", "mean"):
+        operands = _numbers(column, field)
+    else:
+        operands = value_ranks
+
+    # Group identifiers, as well as sums of integers, must fit in 64 bits to
+    # be vectorized; otherwise, Python integers are used
+    cardinality = 1
+    for ranks in key_ranks:
+        cardinality *= max(1, len(ranks))
+    integers = [abs(x) for x in operands if isinstance(x, int)]
+    bound = max(integers, default=0) * len(table)
+    if np is not None and cardinality < 2**62 and bound < 2**63:
+        floats = [isinstance(x, float) for x in operands]
+        if any(floats):
+            fractional = (
+                np.array(floats, dtype=bool),
+                np.array([x if f else 0.0 for x, f in zip(operands, floats)]),
+            )
+        else:
+            fractional = None
+        args = (
+            [np.array(ranks, dtype=np.int64) for ranks in key_ranks],
+            np.array(present, dtype=bool),
+            np.array(
+                [x if isinstance(x, int) else 0 for x in operands], dtype=np.int64
+            ),
+            fractional,
+            aggfun,
+        )
+    else:
+        np = None
+        args = (key_ranks, present, operands, aggfun)
+
+    combine = _COMBINE[aggfun]
+    partials, spills = {}, []
+    with stage("aggregate", aggfun=aggfun) as record:
+        for start in range(0, len(table), CHUNK_ROWS):
+            stop = start + CHUNK_ROWS
+            key_codes = [key_column.codes[start:stop] for key_column in key_columns]
+            value_codes = column.codes[start:stop]
+            if np is not None:
+                chunk = _chunk_numpy(np, key_codes, value_codes, *args)
+            else:
+                chunk = _chunk_python(key_codes, value_codes, *args)
+
+            for key, value in chunk.items():
+                partials[key] = (
+                    combine(partials[key], value) if key in partials else value
+                )
+
+            if len(partials) > max_groups:
+                spills.append(_spill(partials))
+                partials = {}
+        record["rows"] = len(table)
+
+    if spills:
+        logging.info("Merging %i spilled runs of partial aggregates.", len(spills))
+        merged = heapq.merge(
+            *[_read_spill(handler) for handler in spills],
+            sorted(partials.items()),
+            key=itemgetter(0),
+        )
+    else:
+        merged = sorted(partials.items())
+
+    values = list(column.values)
+
+    def finalize(value):
+        # Convert a partial aggregate to its final value, as a string
+        if aggfun in ("min", "max", "first"):
+            return values[value_order[value]]
+        elif aggfun == "mean":
+            return str(value[0] / value[1])
+
+        return str(value)
+
+    def groups():
+        # Combine the partial aggregates of each group, in sorted order
+        for key, items in groupby(merged, key=itemgetter(0)):
+            value = next(items)[1]
+            for _, other in items:
+                value = combine(value, other)
+            yield key, finalize(value)
+
+    key_values = []
+    for key_column, order in zip(key_columns, key_orders):
+        distinct = list(key_column.values)
+        key_values.append([distinct[code] for code in order])
+
+    return groups(), key_values
+
+
+def group_table(
+    table: Table, keys: List[str], field: str, aggfun: str = "sum", **kwargs
+) -> Table:
+    """
+    Groups the rows of a table, aggregating the values of a field.
+
+    The resulting table has the key fields and the aggregated field, with
+    one row per group, sorted by key. Additional arguments are passed to
+    `aggregate()`.
+    """
+
+    groups, key_values = aggregate(table, keys, field, aggfun, **kwargs)
+
+    result = Table(keys + [field])
+    for ranks, value in groups:
+        row = {key: values[rank] for key, values, rank in zip(keys, key_values, ranks)}
+        row[field] = value
+        result.append(row)
+
+    return result
+
+
+def pivot_table(
+    table: Table,
+    index: str,
+    columns: str,
+    values: str,
+    aggfun: str = "sum",
+    **kwargs,
+) -> Table:
+    """
+    Pivots a table, aggregating the values of each pair of keys.
+
+    As with the `pivot` of `petl`, used by frictionless, the resulting table
+    has the `index` field, with one row per distinct value, followed by one
+    field per distinct value of `columns`, both sorted, and cells holding
+    the aggregated `values` of their row and field (see `aggregate()`), or
+    missing if none. Additional arguments are passed to `aggregate()`.
+
+    Parameters
+    ----------
+    table : Table
+        The table to pivot.
+    index : str
+        The field whose values identify the rows.
+    columns : str
+        The field whose values identify the fields.
+    values : str
+        The field whose values are aggregated.
+    aggfun : str, optional
+        The aggregation function, one of `AGGREGATES`, by default "sum".
+
+    Returns
+    -------
+    Table
+        The pivoted table.
+    """
+
+    groups, (index_values, column_values) = aggregate(
+        table, [index, columns], values, aggfun, **kwargs
+    )
+    column_values = ["" if value is None else value for value in column_values]
+
+    result = Table([index] + column_values)
+    groups = groupby(groups, key=lambda group: group[0][0])
+    current = next(groups, None)
+    for rank, value in enumerate(index_values):
+        row = dict.fromkeys(column_values, "")
+        row[index] = value
+        if current and current[0] == rank:
+            for (_, column_rank), cell in current[1]:
+                row[column_values[column_rank]] = cell
+            current = next(groups, None)
+        result.append(row)
+
+    logging.debug(
+        "Table pivoted to %i rows and %i fields.", len(result), len(column_values)
+    )
+
+    return result
@@ -0,0 +1,236 @@
+"""
+Module with a persistent, on-disk cache for resource descriptions.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+# Default location and maximum size (in bytes) of the cache; the location
+# can be set with the `TASYBA_CACHE_DIR` environment variable
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "tasyba"
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+# Size of the blocks read when hashing file contents
+_HASH_BLOCK = 1024 * 1024
+
+
+def hash_file(filename: Union[Path, str]) -> str:
+    """
+    Computes the SHA-256 hash of the contents of a file.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to hash.
+
+    Returns
+    -------
+    str
+        The hexadecimal digest of the file contents.
+    """
+
+    digest = hashlib.sha256()
+    with open(filename, "rb") as handler:
+        for block in iter(lambda: handler.read(_HASH_BLOCK), b""):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+def _write_json(filename: Path, data: Dict[str, Any]):
+    # Write a JSON file atomically, so that concurrent readers (e.g., other
+    # processes of a parallel build) never see a partial file
+    handle, tmp_name = tempfile.mkstemp(dir=filename.parent, suffix=".tmp")
+    with os.fdopen(handle, "w", encoding="utf-8") as handler:
+        json.dump(data, handler)
+    os.replace(tmp_name, filename)
+
+
+def _unlink(filename: Path):
+    try:
+        filename.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _read_json(filename: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(filename, encoding="utf-8") as handler:
+            return json.load(handler)
+    except (OSError, ValueError):
+        return None
+
+
+class ResourceCache:
+    """
+    A persistent cache of resource descriptions and validation reports.
+
+    Entries are keyed by the hash of the contents of the described file and
+    by the options used for describing it. The size and modification time
+    of each file are recorded along with its hash, so that unchanged files
+    are not hashed again. When the total size of the entries exceeds
+    `max_size`, the least recently used ones are evicted.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[Union[Path, str]] = None,
+        max_size: int = DEFAULT_MAX_SIZE,
+    ):
+        if directory is None:
+            directory = os.environ.get("TASYBA_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+        (self.directory / "entries").mkdir(parents=True, exist_ok=True)
+        (self.directory / "stats").mkdir(parents=True, exist_ok=True)
+
+    def _stat_file(self, filename: Union[Path, str]) -> Path:
+        path_id = hashlib.sha1(str(Path(filename).resolve()).encode("utf-8"))
+        return self.directory / "stats" / f"{path_id.hexdigest()}.json"
+
+    def _entry_file(self, key: str) -> Path:
+        return self.directory / "entries" / f"{key}.json"
+
+    def content_hash(self, filename: Union[Path, str]) -> str:
+        """
+        Returns the hash of the contents of a file.
+
+        The file is only read if its size or modification time changed
+        since the hash was last computed.
+        """
+
+        stat = os.stat(filename)
+        stat_file = self._stat_file(filename)
+
+        cached = _read_json(stat_file)
+        if (
+            cached
+            and cached["size"] == stat.st_size
+            and cached["mtime"] == stat.st_mtime_ns
+        ):
+            return cached["hash"]
+
+        content_hash = hash_file(filename)
+        _write_json(
+            stat_file,
+            {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash},
+        )
+
+        return content_hash
+
+    def key(self, filename: Union[Path, str], **options) -> str:
+        """
+        Builds the cache key for a file and a set of options.
+
+        Parameters
+        ----------
+        filename : Union[Path,str]
+            The path to the file.
+        **options
+            Additional, JSON-serializable values that affect the cached
+            results; the path as given is always included, as it is part of
+            the resource description.
+
+        Returns
+        -------
+        str
+            The cache key.
+        """
+
+        key_data = {
+            "hash": self.content_hash(filename),
+            "path": str(filename),
+            "options": options,
+        }
+        key_json = json.dumps(key_data, sort_keys=True, default=str)
+
+        return hashlib.sha256(key_json.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the entry stored under a key, if any.
+        """
+
+        entry_file = self._entry_file(key)
+        entry = _read_json(entry_file)
+        if entry is not None:
+            # Mark the entry as recently used, for eviction
+            try:
+                os.utime(entry_file)
+            except OSError:
+                pass
+
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any], source: Union[Path, str]):
+        """
+        Stores an entry under a key, evicting old entries if needed.
+
+        Parameters
+        ----------
+        key : str
+            The cache key, as returned by `key()`.
+        entry : Dict[str,Any]
+            The JSON-serializable data to store.
+        source : Union[Path,str]
+            The path to the file the entry refers to, used for explicit
+            invalidation.
+        """
+
+        entry = dict(entry, source=str(Path(source).resolve()))
+        _write_json(self._entry_file(key), entry)
+        self.evict()
+
+    def evict(self):
+        """
+        Evicts the least recently used entries until the cache fits in its
+        maximum size.
+        """
+
+        entries = []
+        for entry_file in (self.directory / "entries").glob("*.json"):
+            try:
+                stat = entry_file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_file))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_file in sorted(entries):
+            if total <= self.max_size:
+                break
+            logging.debug("Evicting cache entry `%s`", entry_file.name)
+            _unlink(entry_file)
+            total -= size
+
+    def invalidate(self, filename: Optional[Union[Path, str]] = None):
+        """
+        Removes entries from the cache.
+
+        Parameters
+        ----------
+        filename : Optional[Union[Path,str]]
+            The path to the file whose entries should be removed; if not
+            provided, the cache is cleared entirely.
+        """
+
+        if filename is None:
+            for cache_file in self.directory.glob("*/*.json"):
+                _unlink(cache_file)
+            return
+
+        source = str(Path(filename).resolve())
+        for entry_file in (self.directory / "entries").glob("*.json"):
+            entry = _read_json(entry_file)
+            if entry is not None and entry.get("source") == source:
+                _unlink(entry_file)
+
+        _unlink(self._stat_file(filename))
@@ -0,0 +1,257 @@
+"""
+Module for reading and writing tables in columnar formats.
+
+Parquet, Arrow IPC, and Feather files are read with the optional `pyarrow`
+package, memory-mapped where possible and reading only the columns needed.
+Arrow dictionary encoding maps directly to the dictionary-encoded columns
+of `Table`, so that values are never expanded into rows; numeric columns
+are kept in typed arrays (see `TypedValues`).
+"""
+
+# Import Python standard libraries
+from array import array
+from pathlib import Path
+from typing import *
+import logging
+import os
+
+# Import other modules
+from tasyba.instrument import stage
+from tasyba.table import Column, Table, TypedValues, _CODE_TYPES
+
+# Suffixes of the columnar formats, by format
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "feather",
+    ".feather": "feather",
+    ".ipc": "feather",
+}
+
+# Missing values in Arrow (nulls) are read as this value
+MISSING_VALUE = ""
+
+
+def is_columnar(filename: Union[Path, str]) -> bool:
+    """
+    Checks whether a file is in a columnar format, from its suffix.
+    """
+
+    return Path(filename).suffix.lower() in COLUMNAR_FORMATS
+
+
+def _pyarrow():
+    # Import pyarrow, with a helpful message if it is not installed
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError(
+            "Reading and writing columnar formats requires `pyarrow`, "
+            "which can be installed with `pip install tasyba[arrow]`."
+        ) from exc
+
+    return pyarrow
+
+
+def _field_type(pa, data_type) -> Optional[str]:
+    # Return the type of a field from its Arrow type, if not a string
+    if pa.types.is_integer(data_type):
+        return "integer"
+    elif pa.types.is_floating(data_type):
+        return "number"
+    elif pa.types.is_boolean(data_type):
+        return "boolean"
+    elif pa.types.is_date(data_type):
+        return "date"
+
+    return None
+
+
+def _code_types(pa) -> Dict[str, Any]:
+    # Map the typecodes of dictionary codes to Arrow types
+    return {"B": pa.uint8(), "H": pa.uint16(), "I": pa.uint32()}
+
+
+def _buffer_array(typecode: str, arrow_array) -> array:
+    # Copy the values of a primitive Arrow array, with no nulls, into an array
+    values = array(typecode)
+    offset, length = arrow_array.offset, len(arrow_array)
+    data = memoryview(arrow_array.buffers()[1])
+    values.frombytes(
+        data[offset * values.itemsize : (offset + length) * values.itemsize]
+    )
+
+    return values
+
+
+def _column(pa, chunked) -> Tuple[Column, Optional[str]]:
+    # Build a column from an Arrow column, along with its type if known
+    import pyarrow.compute as pc
+
+    data = chunked.combine_chunks()
+
+    # Dictionary-encoded columns (such as those written by `write_columnar()`)
+    # are used as they are, unless they hold nulls
+    if pa.types.is_dictionary(data.type):
+        field_type = _field_type(pa, data.type.value_type)
+        if data.null_count or data.dictionary.null_count:
+            data = data.dictionary_decode()
+    else:
+        field_type = _field_type(pa, data.type)
+
+    if not pa.types.is_dictionary(data.type):
+        if field_type in ("integer", "number"):
+            # Nulls of numbers are encoded as a single missing value
+            data = pc.dictionary_encode(data, null_encoding="encode")
+        else:
+            data = pc.fill_null(data.cast(pa.string()), MISSING_VALUE)
+            data = pc.dictionary_encode(data)
+    dictionary = data.dictionary
+
+    # Store the codes in the smallest typecode, as when appending values
+    for typecode, limit in _CODE_TYPES:
+        if len(dictionary) <= limit:
+            break
+    codes = _buffer_array(typecode, data.indices.cast(_code_types(pa)[typecode]))
+
+    # Keep numbers in typed arrays
+    if field_type in ("integer", "number"):
+        missing = (
+            dictionary.is_null().to_pylist().index(True)
+            if dictionary.null_count
+            else None
+        )
+        arrow_type = pa.int64() if field_type == "integer" else pa.float64()
+        values = TypedValues(
+            _buffer_array(
+                "q" if field_type == "integer" else "d",
+                pc.fill_null(dictionary.cast(arrow_type), 0),
+            ),
+            missing,
+            None if missing is None else MISSING_VALUE,
+        )
+    else:
+        values = dictionary.cast(pa.string()).to_pylist()
+
+    return Column.from_codes(codes, values), field_type
+
+
+def read_columnar(
+    filename: Union[Path, str], exclude: Iterable[str] = (), memory_map: bool = True
+) -> Table:
+    """
+    Reads a table from a Parquet, Arrow IPC, or Feather file.
+
+    Only the columns not in `exclude` are read. Missing values are read as
+    empty strings, as from tabular files, while the types of numeric,
+    boolean, and date columns are taken from the file (see `infer_types()`
+    for the types of the other columns).
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file, whose format is given by its suffix (see
+        `COLUMNAR_FORMATS`).
+    exclude : Iterable[str], optional
+        The columns not to read, by default none.
+    memory_map : bool, optional
+        Whether to memory-map the file, instead of reading it, by default
+        True.
+
+    Returns
+    -------
+    Table
+        The contents of the file.
+    """
+
+    pa = _pyarrow()
+    filename = Path(filename)
+    fmt = COLUMNAR_FORMATS[filename.suffix.lower()]
+    exclude = set(exclude)
+
+    with stage("read_columnar", file=str(filename)) as record:
+        # Parquet files are only read for the columns needed, while the
+        # columns of memory-mapped Arrow files are only read when used
+        if fmt == "parquet":
+            import pyarrow.parquet as parquet
+
+            schema = parquet.read_schema(filename, memory_map=memory_map)
+            columns = [name for name in schema.names if name not in exclude]
+            data = parquet.read_table(filename, columns=columns, memory_map=memory_map)
+        else:
+            import pyarrow.feather as feather
+
+            data = feather.read_table(filename, memory_map=memory_map)
+            columns = [name for name in data.column_names if name not in exclude]
+
+        built, types = {}, {}
+        for name in columns:
+            built[name], types[name] = _column(pa, data.column(name))
+        table = Table.from_columns(built)
+        table.types.update(
+            {name: field_type for name, field_type in types.items() if field_type}
+        )
+
+        record.update(rows=len(table), bytes_read=os.path.getsize(filename))
+
+    logging.info("Read %i columns of `%s`", len(columns), filename)
+
+    return table
+
+
+def write_columnar(table: Table, filename: Union[Path, str]):
+    """
+    Writes a table to a Parquet, Arrow IPC, or Feather file.
+
+    Columns are written dictionary-encoded, except for numeric ones, which
+    are written as numbers; missing values of numeric columns are written
+    as nulls.
+
+    Parameters
+    ----------
+    table : Table
+        The table to write.
+    filename : Union[Path,str]
+        The path to the file, whose format is given by its suffix (see
+        `COLUMNAR_FORMATS`).
+    """
+
+    pa = _pyarrow()
+    filename = Path(filename)
+    fmt = COLUMNAR_FORMATS.get(filename.suffix.lower())
+    if fmt is None:
+        raise ValueError(f"Unknown columnar format: {filename.suffix}")
+
+    with stage("write_columnar", file=str(filename)) as record:
+        arrays = []
+        for field in table.fields:
+            column = table.column(field)
+            codes = column.codes
+            indices = pa.Array.from_buffers(
+                _code_types(pa)[codes.typecode],
+                len(codes),
+                [None, pa.py_buffer(codes)],
+            )
+            if isinstance(column.values, TypedValues):
+                values = column.values
+                arrow_type = (
+                    pa.int64() if values.array.typecode == "q" else pa.float64()
+                )
+                dictionary = pa.array(values.tolist(), type=arrow_type)
+                data = pa.DictionaryArray.from_arrays(indices, dictionary)
+                arrays.append(data.dictionary_decode())
+            else:
+                dictionary = pa.array(column.values, type=pa.string())
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        data = pa.Table.from_arrays(arrays, names=table.fields)
+
+        if fmt == "parquet":
+            import pyarrow.parquet as parquet
+
+            parquet.write_table(data, filename)
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(data, filename)
+
+        record.update(rows=len(table), bytes_written=os.path.getsize(filename))
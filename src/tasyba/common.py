@@ -5,14 +5,182 @@ Common functions for the TASYBA project.
 # Import Python standard libraries
 from pathlib import Path
 from typing import *
+import codecs
 import csv
+import os
 
-# Import 3rd-party libraries
-import chardet
-import yaml
+# Import other modules
+from tasyba.columnar import is_columnar, read_columnar
+from tasyba.inference import infer_types
+from tasyba.instrument import stage
+from tasyba.table import Table
 
+# Number of bytes read from the head of a file for detecting its encoding
+# and dialect
+SAMPLE_SIZE = 64 * 1024
 
-def read_tabular(filename: Union[Path, str]) -> List[Dict[str, str]]:
+# Minimum confidence of a detected encoding; below it, or if the detected
+# encoding cannot decode the sample, the first fallback that can is used
+ENCODING_CONFIDENCE = 0.5
+FALLBACK_ENCODINGS = ["utf-8", "cp1252", "latin-1"]
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    # Check whether a sample decodes, allowing it to end in an incomplete
+    # multibyte character
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+    except (LookupError, UnicodeDecodeError):
+        return False
+
+    return True
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Detects the character encoding of a sample.
+
+    The encoding is detected with `chardet`, imported only when needed, as
+    it is slow to import. As the sample might hold only ASCII characters
+    while the rest of the file does not, ASCII is reported as its superset,
+    UTF-8. Detections with a confidence below `ENCODING_CONFIDENCE`, which
+    for text with few non-ASCII characters can be as unrelated as Big5, or
+    which cannot decode the sample, are replaced by the first encoding of
+    `FALLBACK_ENCODINGS` that decodes it.
+
+    The function can be used as the `encoding_function` of a frictionless
+    `Detector`, so that frictionless reads files with the same encoding.
+
+    Parameters
+    ----------
+    sample : bytes
+        The sample, from the head of a file.
+
+    Returns
+    -------
+    str
+        The name of the detected encoding.
+    """
+
+    import chardet
+
+    with stage("chardet", bytes_read=len(sample)):
+        detected = chardet.detect(sample)
+    encoding = detected["encoding"]
+    if not encoding or encoding.lower() == "ascii":
+        return "utf-8"
+
+    if (detected["confidence"] or 0) >= ENCODING_CONFIDENCE and _decodes(
+        sample, encoding
+    ):
+        return encoding
+
+    # Latin-1 decodes any sample, so that a fallback is always found
+    return next(enc for enc in FALLBACK_ENCODINGS if _decodes(sample, enc))
+
+
+def detect_format(
+    filename: Union[Path, str], sample_size: int = SAMPLE_SIZE
+) -> Tuple[str, Type[csv.Dialect]]:
+    """
+    Detects the character encoding and the CSV dialect of a tabular file.
+
+    Detection is performed on a sample from the head of the file, so that
+    the cost does not depend on the size of the file. The sample is cut
+    at the last complete line, so that neither a partial row nor a
+    truncated multibyte character is passed to the detectors.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to inspect.
+    sample_size : int, optional
+        The number of bytes to read from the head of the file, by default
+        `SAMPLE_SIZE`.
+
+    Returns
+    -------
+    Tuple[str, Type[csv.Dialect]]
+        The name of the detected encoding and the detected dialect.
+    """
+
+    with open(filename, "rb") as handler:
+        sample = handler.read(sample_size)
+        truncated = bool(handler.read(1))
+
+    return detect_sample_format(sample, truncated)
+
+
+def detect_sample_format(
+    sample: bytes, truncated: bool = False
+) -> Tuple[str, Type[csv.Dialect]]:
+    """
+    Detects the character encoding and the CSV dialect of a sample.
+
+    Parameters
+    ----------
+    sample : bytes
+        The sample, from the head of a tabular file.
+    truncated : bool, optional
+        Whether the sample does not cover the entire file, in which case
+        its last line is ignored, by default False.
+
+    Returns
+    -------
+    Tuple[str, Type[csv.Dialect]]
+        The name of the detected encoding and the detected dialect.
+    """
+
+    # Drop the last, potentially incomplete, line if the sample does not
+    # cover the entire file
+    if truncated and b"\n" in sample:
+        sample = sample[: sample.rindex(b"\n") + 1]
+
+    encoding = detect_encoding(sample)
+
+    with stage("csv.Sniffer", bytes_read=len(sample)):
+        dialect = csv.Sniffer().sniff(sample.decode(encoding, errors="ignore"))
+
+    return encoding, dialect
+
+
+def iter_tabular(
+    filename: Union[Path, str], sample_size: int = SAMPLE_SIZE
+) -> Iterator[Dict[str, str]]:
+    """
+    Iterates over the rows of a tabular file, yielding dictionaries.
+
+    The encoding and the dialect are detected from a sample of the head of
+    the file (see `detect_format()`), and rows are then read lazily, so
+    that memory usage does not depend on the size of the file. The first
+    row of the file will be used as a header to provide the keys for the
+    dictionaries.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to read.
+    sample_size : int, optional
+        The number of bytes used for detecting encoding and dialect, by
+        default `SAMPLE_SIZE`.
+
+    Returns
+    -------
+    Iterator[Dict[str,str]]
+        An iterator over the rows of the tabular file.
+    """
+
+    encoding, dialect = detect_format(filename, sample_size)
+
+    with open(filename, encoding=encoding, newline="") as handler:
+        reader = csv.DictReader(handler, dialect=dialect)
+        for row in reader:
+            yield row
+
+
+def read_tabular(
+    filename: Union[Path, str], sample_size: int = SAMPLE_SIZE
+) -> List[Dict[str, str]]:
     """
     Reads a tabular file and returns its contents as list of dictionaries.
 
@@ -20,12 +188,16 @@ def read_tabular(filename: Union[Path, str]) -> List[Dict[str, str]]:
     using the `csv.Sniffer` functionality,
     as well as the character encoding using the `chardet` library. The first
     row of the file will be used as a header to provide the keys for the
-    dictionaries.
+    dictionaries. For large files, consider using `iter_tabular()`, which
+    does not hold all the rows in memory.
 
     Parameters
     ----------
     filename : Union[Path,str]
         The path to the file to read.
+    sample_size : int, optional
+        The number of bytes used for detecting encoding and dialect, by
+        default `SAMPLE_SIZE`.
 
     Returns
     -------
@@ -33,15 +205,70 @@ def read_tabular(filename: Union[Path, str]) -> List[Dict[str, str]]:
         The contents of the tabular file as a list of dictionaries.
     """
 
-    # Read file to detect encoding and delimiter
-    with open(filename, "rb") as handler:
-        raw = handler.read()
-        encoding = chardet.detect(raw)["encoding"]
-        dialect = csv.Sniffer().sniff(raw.decode(encoding))
+    with stage("read_tabular", file=str(filename)) as record:
+        rows = list(iter_tabular(filename, sample_size))
+        record.update(rows=len(rows), bytes_read=os.path.getsize(filename))
 
-    # Read file with detected encoding and delimiter
-    with open(filename, encoding=encoding) as handler:
-        reader = csv.DictReader(handler, dialect=dialect)
-        data = [row for row in reader]
+    return rows
+
+
+def read_table(
+    filename: Union[Path, str],
+    sample_size: int = SAMPLE_SIZE,
+    typed: bool = True,
+    exclude: Iterable[str] = (),
+    jobs: int = 1,
+) -> Table:
+    """
+    Reads a tabular file into a column-oriented `Table`.
+
+    Rows are streamed from the file with `iter_tabular()` and stored
+    directly in columnar form, so that no list of dictionaries is ever
+    built. Files in columnar formats, such as Parquet, are read directly
+    into columns instead (see `read_columnar()`). The types of the columns
+    are then inferred, with the values of numeric columns stored in typed
+    arrays where possible (see `infer_types()`).
+
+    With several jobs, tabular files of at least `PARALLEL_MIN` bytes are
+    parsed in chunks by a pool of processes (see `read_table_parallel()`),
+    into the same table.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to read.
+    sample_size : int, optional
+        The number of bytes used for detecting encoding and dialect, by
+        default `SAMPLE_SIZE`.
+    typed : bool, optional
+        Whether to infer the types of the columns, by default True.
+    exclude : Iterable[str], optional
+        The fields not to store, such as those removed later on, by default
+        none.
+    jobs : int, optional
+        The maximum number of processes parsing tabular files, by default 1.
+
+    Returns
+    -------
+    Table
+        The contents of the tabular file.
+    """
+
+    # Imported here, as the parser depends on this module
+    from tasyba.parse import PARALLEL_MIN, read_table_parallel
+
+    table = None
+    if is_columnar(filename):
+        table = read_columnar(filename, exclude)
+    elif jobs > 1 and os.path.getsize(filename) >= PARALLEL_MIN:
+        table = read_table_parallel(filename, sample_size, exclude, jobs)
+
+    if table is None:
+        with stage("read_table", file=str(filename)) as record:
+            table = Table.from_rows(iter_tabular(filename, sample_size), exclude)
+            record.update(rows=len(table), bytes_read=os.path.getsize(filename))
+
+    if typed:
+        infer_types(table)
 
-    return data
+    return table
@@ -0,0 +1,186 @@
+"""
+Module for precompressing the output files of a build.
+
+Static hosts can serve `.gz` and `.br` siblings of each file directly
+(e.g., with the `gzip_static` and `brotli_static` options of nginx),
+instead of compressing large pages on every request. Brotli compression
+requires the optional `brotli` package.
+"""
+
+# Import Python standard libraries
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import *
+import gzip
+import importlib.util
+import logging
+import os
+import shutil
+import tempfile
+
+# Import other modules
+from tasyba.instrument import stage
+from tasyba.manifest import WRITE_BUFFER, hash_inputs, replace_if_changed
+
+# Suffixes of the compressed siblings, by format
+FORMATS = {"gzip": ".gz", "br": ".br"}
+
+# Suffixes of the files worth compressing
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".sqlite"}
+
+
+def available_formats(formats: Iterable[str]) -> List[str]:
+    """
+    Returns the requested compression formats that can be used.
+
+    Brotli is dropped, with a warning, if the `brotli` package is not
+    installed.
+
+    Parameters
+    ----------
+    formats : Iterable[str]
+        The requested formats, from the keys of `FORMATS`.
+
+    Returns
+    -------
+    List[str]
+        The formats that can be used.
+    """
+
+    available = []
+    for fmt in formats:
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown compression format: {fmt}")
+        if fmt == "br" and importlib.util.find_spec("brotli") is None:
+            logging.warning("Package `brotli` is not installed, skipping `.br` files.")
+            continue
+        available.append(fmt)
+
+    return available
+
+
+def compress_file(filename: Union[Path, str], fmt: str) -> bool:
+    """
+    Writes a compressed sibling of a file, unless it is unchanged.
+
+    The file is compressed at the highest level in chunks, through a
+    temporary file, so that memory usage does not depend on its size.
+    Gzip headers store neither the file name nor a timestamp, so that the
+    same content always yields the same compressed file.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to compress.
+    fmt : str
+        The compression format, either "gzip" or "br".
+
+    Returns
+    -------
+    bool
+        Whether the compressed file was written.
+    """
+
+    filename = Path(filename)
+    target = filename.with_name(filename.name + FORMATS[fmt])
+
+    handle, tmp_name = tempfile.mkstemp(
+        dir=target.parent, prefix=f".{target.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(handle, "wb") as output, open(filename, "rb") as source:
+            if fmt == "gzip":
+                with gzip.GzipFile(
+                    filename="", mode="wb", compresslevel=9, fileobj=output, mtime=0
+                ) as compressed:
+                    shutil.copyfileobj(source, compressed, WRITE_BUFFER)
+            else:
+                import brotli
+
+                compressor = brotli.Compressor(quality=11)
+                for chunk in iter(lambda: source.read(WRITE_BUFFER), b""):
+                    output.write(compressor.process(chunk))
+                output.write(compressor.finish())
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+    return replace_if_changed(tmp_name, target)
+
+
+def compress_outputs(
+    filenames: Iterable[Union[Path, str]],
+    formats: Iterable[str] = ("gzip", "br"),
+    manifest=None,
+    jobs: int = 1,
+) -> int:
+    """
+    Writes compressed siblings of a set of output files.
+
+    Only files with a suffix in `COMPRESSIBLE` are compressed. If a build
+    manifest is provided, files whose size and modification time did not
+    change since they were last compressed are skipped; as unchanged outputs
+    are never rewritten, this avoids compressing them again. Without a
+    manifest, files older than their compressed siblings are skipped.
+
+    Parameters
+    ----------
+    filenames : Iterable[Union[Path,str]]
+        The paths to the files to compress; missing files are ignored.
+    formats : Iterable[str], optional
+        The compression formats to write, by default both gzip and brotli
+        (if available, see `available_formats()`).
+    manifest : Optional[BuildManifest]
+        The build manifest, if any.
+    jobs : int, optional
+        The maximum number of files compressed concurrently, by default 1.
+
+    Returns
+    -------
+    int
+        The number of compressed files written.
+    """
+
+    formats = available_formats(formats)
+
+    # Collect the files to compress, along with the digests of their state
+    tasks = []
+    for filename in filenames:
+        filename = Path(filename)
+        if filename.suffix not in COMPRESSIBLE or not filename.is_file():
+            continue
+
+        stats = filename.stat()
+        for fmt in formats:
+            target = filename.with_name(filename.name + FORMATS[fmt])
+            digest = hash_inputs([stats.st_size, stats.st_mtime_ns, fmt])
+            if manifest:
+                if manifest.is_current(target, digest):
+                    continue
+            elif target.exists() and target.stat().st_mtime_ns >= stats.st_mtime_ns:
+                continue
+            tasks.append((filename, fmt, target, digest))
+
+    with stage("compress_outputs") as record:
+        if jobs <= 1 or len(tasks) <= 1:
+            written = [compress_file(filename, fmt) for filename, fmt, _, _ in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                written = list(
+                    executor.map(
+                        compress_file,
+                        [task[0] for task in tasks],
+                        [task[1] for task in tasks],
+                    )
+                )
+        record["bytes_written"] = sum(
+            target.stat().st_size for _, _, target, _ in tasks
+        )
+
+    if manifest:
+        for _, _, target, digest in tasks:
+            manifest.record(target, digest)
+
+    logging.info("%i files compressed, %i of them changed.", len(tasks), sum(written))
+
+    return sum(written)
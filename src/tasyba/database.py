@@ -0,0 +1,224 @@
+"""
+Module for building SQLite databases from tables.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import logging
+import os
+import sqlite3
+import tempfile
+
+# Import other modules
+from tasyba.manifest import replace_if_changed
+from tasyba.table import Table, TypedValues
+
+# SQLite column types for frictionless field types; other types are stored
+# as text
+SQL_TYPES = {
+    "integer": "INTEGER",
+    "year": "INTEGER",
+    "boolean": "INTEGER",
+    "number": "REAL",
+}
+
+# Values accepted for boolean fields, following frictionless defaults
+TRUE_VALUES = {"true", "True", "TRUE", "1"}
+FALSE_VALUES = {"false", "False", "FALSE", "0"}
+
+
+def quote_identifier(name: str) -> str:
+    """
+    Quotes an SQL identifier, such as a table or column name.
+    """
+
+    return '"%s"' % name.replace('"', '""')
+
+
+def _converter(field_type: str) -> Callable[[str], Any]:
+    # Build a function converting a string value to a Python value of the
+    # SQL type of the field; values that cannot be converted are kept as
+    # strings, which SQLite stores as they are
+    def convert(value):
+        if value is None or value == "":
+            return None
+
+        try:
+            if field_type in ("integer", "year"):
+                return int(value)
+            elif field_type == "number":
+                return float(value)
+            elif field_type == "boolean":
+                if value in TRUE_VALUES:
+                    return 1
+                elif value in FALSE_VALUES:
+                    return 0
+        except ValueError:
+            pass
+
+        return value
+
+    return convert
+
+
+def _field_types(schema: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    # Map field names to their frictionless types
+    if not schema:
+        return {}
+
+    return {field["name"]: field["type"] for field in schema["fields"]}
+
+
+def table_schema(
+    table: Table, schema: Optional[Dict[str, Any]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Returns the SQL column names and types of a table.
+
+    Parameters
+    ----------
+    table : Table
+        The table.
+    schema : Optional[Dict[str,Any]]
+        The frictionless schema of the table, if any, from which column
+        types are taken; fields missing from the schema are stored as text.
+
+    Returns
+    -------
+    List[Tuple[str,str]]
+        The name and SQL type of each column, in order.
+    """
+
+    field_types = _field_types(schema)
+
+    return [
+        (field.lower(), SQL_TYPES.get(field_types.get(field), "TEXT"))
+        for field in table.fields
+    ]
+
+
+def build_sqlite(
+    tables: Dict[str, Table],
+    filename: Union[Path, str],
+    schemata: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> bool:
+    """
+    Writes a set of tables to an SQLite database.
+
+    Each table is inserted in bulk, in a single transaction, with values
+    converted to the types of its frictionless schema, if provided.
+    Indexes are created for the primary and foreign keys declared in the
+    schema or, if there are none, for the first column. The database is
+    built in a temporary file, which only replaces `filename` if the
+    contents differ.
+
+    Parameters
+    ----------
+    tables : Dict[str,Table]
+        The tables to write, by name.
+    filename : Union[Path,str]
+        The path to the database file.
+    schemata : Optional[Dict[str,Dict[str,Any]]]
+        The frictionless schemata of the tables, by name, if any.
+
+    Returns
+    -------
+    bool
+        Whether the database file was written.
+    """
+
+    if schemata is None:
+        schemata = {}
+
+    filename = Path(filename)
+    handle, tmp_name = tempfile.mkstemp(
+        dir=filename.parent, prefix=f".{filename.name}.", suffix=".tmp"
+    )
+    os.close(handle)
+
+    try:
+        connection = sqlite3.connect(tmp_name, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode = OFF")
+            connection.execute("PRAGMA synchronous = OFF")
+            for table_name, table in tables.items():
+                _write_table(connection, table_name, table, schemata.get(table_name))
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+    return replace_if_changed(tmp_name, filename)
+
+
+def _write_table(
+    connection: sqlite3.Connection,
+    table_name: str,
+    table: Table,
+    schema: Optional[Dict[str, Any]],
+):
+    columns = table_schema(table, schema)
+    field_types = _field_types(schema)
+
+    sql_table = quote_identifier(table_name)
+    column_defs = ", ".join(
+        f"{quote_identifier(name)} {sql_type}" for name, sql_type in columns
+    )
+    placeholders = ", ".join("?" for _ in columns)
+
+    # Convert each distinct value of a column only once; values already
+    # stored as numbers are used as they are
+    converted = []
+    for field in table.fields:
+        field_type = field_types.get(field, "string")
+        values = table.column(field).values
+        if isinstance(values, TypedValues) and SQL_TYPES.get(field_type) in (
+            "INTEGER",
+            "REAL",
+        ):
+            converted.append(values.tolist())
+        else:
+            convert = _converter(field_type)
+            converted.append([convert(value) for value in values])
+    codes = [table.column(field).codes for field in table.fields]
+    rows = (
+        tuple(values[code] for values, code in zip(converted, row_codes))
+        for row_codes in zip(*codes)
+    )
+
+    connection.execute("BEGIN")
+    connection.execute(f"DROP TABLE IF EXISTS {sql_table}")
+    connection.execute(f"CREATE TABLE {sql_table} ({column_defs})")
+    connection.executemany(f"INSERT INTO {sql_table} VALUES ({placeholders})", rows)
+
+    # Index the keys of the table
+    index_fields = []
+    if schema:
+        primary_key = schema.get("primaryKey", [])
+        if isinstance(primary_key, str):
+            primary_key = [primary_key]
+        index_fields.append(primary_key)
+        for foreign_key in schema.get("foreignKeys", []):
+            fields = foreign_key["fields"]
+            index_fields.append([fields] if isinstance(fields, str) else fields)
+    index_fields = [
+        fields
+        for fields in index_fields
+        if fields and all(field in table.columns for field in fields)
+    ]
+    if not index_fields and table.fields:
+        index_fields = [table.fields[:1]]
+
+    for idx, fields in enumerate(index_fields):
+        index_name = quote_identifier(f"{table_name}_idx{idx}")
+        index_columns = ", ".join(quote_identifier(field.lower()) for field in fields)
+        connection.execute(
+            f"CREATE INDEX {index_name} ON {sql_table} ({index_columns})"
+        )
+
+    connection.execute("COMMIT")
+
+    logging.info("Table `%s` written to database with %i rows.", table_name, len(table))
@@ -0,0 +1,566 @@
+"""
+Module for running deployment scripts, building a site from their tables.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import datetime
+
+# Import other modules
+from tasyba.aggregate import pivot_table
+from tasyba.columnar import is_columnar, write_columnar
+from tasyba.common import SAMPLE_SIZE, read_table
+from tasyba.compress import compress_outputs
+from tasyba.inference import infer_schema
+from tasyba.instrument import stage
+from tasyba.links import key_anchors, parse_links, resolve_links
+from tasyba.manifest import BuildManifest
+from tasyba.parse import PARALLEL_MIN
+from tasyba.render import build_assets, build_html_tables, build_sql_page
+from tasyba.render import load_template, template_dir
+from tasyba.scheduler import BARRIER, dependencies, dependents, prefetch, step_names
+from tasyba.script import load_makefile
+from tasyba.transpose import BLOCK_SIZE, transpose_table
+
+
+def load_kind(filename: Union[Path, str], jobs: int) -> str:
+    """
+    Returns the kind of executor for loading a table (see `prefetch()`).
+
+    Loads are I/O-bound for the interpreter running them when the parsing
+    happens elsewhere: columnar files are decoded by `pyarrow`, which
+    releases the GIL, and large tabular files parsed with several jobs are
+    parsed by their own pool of processes (see `read_table_parallel()`).
+    Such loads run on threads, which also saves pickling the table back;
+    other tabular files are parsed by the interpreter, and run on
+    processes.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to load.
+    jobs : int
+        The number of jobs the file is parsed with.
+
+    Returns
+    -------
+    str
+        Either "thread" or "process".
+    """
+
+    if is_columnar(filename):
+        return "thread"
+
+    try:
+        if jobs > 1 and Path(filename).stat().st_size >= PARALLEL_MIN:
+            return "thread"
+    except OSError:
+        # Missing files fail when loaded, whatever the executor
+        pass
+
+    return "process"
+
+
+def build_replaces(args):
+    """
+    Build the replacement dictionary for the pages of a deployment step.
+    """
+
+    # Build replacement dictionary; which for future expansions it is
+    # preferable to keep separate from the actual configuration while
+    # using a single file not to scare potential users with too much
+    # structure to learn. Remember that, in order to make
+    # deployment easy, we are being quite strict here in terms of
+    # templates, etc.
+    replaces = {
+        "title": args["title"],
+        "description": args["description"],
+        "author": args["author"],
+        "favicon": args["favicon"],
+        "mainlink": args["mainlink"],
+        "citation": args["citation"],
+    }
+
+    return replaces
+
+
+class Deployment:
+    """
+    A deployment script, along with the state of its last run.
+
+    The tables loaded and the build manifest are kept between runs, so that
+    the steps affected by changes to the files the script reads, such as
+    sources and templates, can be run again without running the whole
+    script (see `affected_steps()`), as done by `tasyba.watcher`.
+    """
+
+    def __init__(
+        self,
+        filepath,
+        jobs=1,
+        incremental=True,
+        timestamp=False,
+        compress=(),
+        auto_reload=False,
+    ):
+        """
+        Parameters
+        ----------
+        filepath : Union[Path,str]
+            The path to the script, in YAML format.
+        jobs : int, optional
+            The maximum number of steps, or of tables being rendered, run
+            concurrently, by default 1.
+        incremental : bool, optional
+            Whether to skip pages whose inputs did not change since the last
+            build, as recorded in the build manifest, by default True.
+        timestamp : bool, optional
+            Whether the build time is part of the inputs of each page, which
+            forces all pages to be rebuilt; otherwise, it is not shown in the
+            pages, by default False.
+        compress : Sequence[str], optional
+            The formats of the compressed copies to write next to each output
+            file, such as "gzip" and "br" (see `compress_outputs()`), by
+            default none.
+        auto_reload : bool, optional
+            Whether templates edited on disk since they were loaded are
+            reloaded, which is needed for running steps again after changes
+            to templates, by default False.
+        """
+
+        self.jobs = jobs
+        self.compress = compress
+        self.auto_reload = auto_reload
+
+        # Read and parse configuration file
+        config = load_makefile(filepath)
+
+        # Obtain a tuple representation of each entry, from where we draw the
+        # command and its arguments, making it easier to later move to a
+        # programming-language-like interface
+        self.steps = [tuple(entry.items())[0] for entry in config["steps"]]
+        self.deps = dependencies(self.steps)
+
+        # Load the record of previous builds, if any
+        self.manifest = BuildManifest(timestamp=timestamp, force=not incremental)
+
+        # The tables loaded, the step adding each of them, and the fields
+        # not loaded at all as they are removed before being used
+        self.tables = {}
+        self.added = {}
+        self.pruned = {}
+
+    def unused_fields(self, idx: int) -> Set[str]:
+        """
+        Collects the fields of a table removed before being used.
+
+        Parameters
+        ----------
+        idx : int
+            The index of the `add_resource` step loading the table.
+
+        Returns
+        -------
+        Set[str]
+            The fields removed by `field_remove` steps before any other step
+            uses the table, which need not be loaded.
+        """
+
+        _, args = self.steps[idx]
+        name = f"table:{args.get('name', Path(args['source']).stem)}"
+
+        unused = set()
+        for command, args in self.steps[idx + 1 :]:
+            reads, writes = step_names(command, args)
+            if command == "field_remove" and name in writes:
+                unused.update(args["fields"])
+            elif name in reads | writes or BARRIER in reads:
+                break
+
+        return unused
+
+    def layouts(self) -> Dict[str, Tuple[Optional[int], str]]:
+        """
+        Collects the layout of the pages of each deployed table.
+
+        Returns
+        -------
+        Dict[str,Tuple[Optional[int],str]]
+            The page size and the shard format of each table, as deployed by
+            its last `table_deploy` step.
+        """
+
+        return {
+            args["table"]: (args.get("page_size"), args.get("shard_format", "html"))
+            for command, args in self.steps
+            if command == "table_deploy"
+        }
+
+    def link_keys(self) -> Dict[str, Set[str]]:
+        """
+        Collects the key fields of each table referenced by links.
+
+        Returns
+        -------
+        Dict[str,Set[str]]
+            The fields of each table referenced by the links of any
+            `table_deploy` step, whose cells are rendered as anchors.
+        """
+
+        keys = {}
+        for command, args in self.steps:
+            if command == "table_deploy":
+                for target, key in parse_links(
+                    args.get("links"), args["table"]
+                ).values():
+                    keys.setdefault(target, set()).add(key)
+
+        return keys
+
+    def watched_files(self) -> Dict[Path, Set[int]]:
+        """
+        Returns the files read by the steps of the script.
+
+        Returns
+        -------
+        Dict[Path,Set[int]]
+            The indexes of the steps reading each file, which includes the
+            sources of resources and the templates of deploy steps.
+        """
+
+        watched = {}
+        for idx, (command, args) in enumerate(self.steps):
+            reads, _ = step_names(command, args)
+            filenames = [Path(name[5:]) for name in reads if name.startswith("file:")]
+            if command in ("table_deploy", "sql_deploy"):
+                filenames += [
+                    path.resolve()
+                    for path in template_dir(args).rglob("*")
+                    if path.is_file()
+                ]
+            for filename in filenames:
+                watched.setdefault(filename, set()).add(idx)
+
+        return watched
+
+    def affected_steps(self, filenames: Iterable[Union[Path, str]]) -> Set[int]:
+        """
+        Collects the steps to run again after changes to a set of files.
+
+        These are the steps reading the files and all the steps depending
+        on them. As steps such as `field_remove` modify tables in place,
+        the steps loading the tables they modify are also run again, so
+        that each step finds its tables as in a full run.
+
+        Parameters
+        ----------
+        filenames : Iterable[Union[Path,str]]
+            The paths to the files that changed.
+
+        Returns
+        -------
+        Set[int]
+            The indexes of the steps to run again.
+        """
+
+        watched = self.watched_files()
+        changed = set()
+        for filename in filenames:
+            changed |= watched.get(Path(filename).resolve(), set())
+
+        affected = dependents(self.deps, changed)
+        while True:
+            reload = set()
+            for idx in affected:
+                command, args = self.steps[idx]
+                if command == "add_resource":
+                    continue
+                _, writes = step_names(command, args)
+                for prev_idx in range(idx - 1, -1, -1):
+                    prev_command, prev_args = self.steps[prev_idx]
+                    if prev_command == "add_resource" and (
+                        step_names(prev_command, prev_args)[1] & (writes - {"tables"})
+                    ):
+                        reload.add(prev_idx)
+                        break
+
+            if reload <= affected:
+                return affected
+            affected = dependents(self.deps, affected | reload)
+
+    def _visible_tables(self, idx):
+        # The tables added before a step, as in a full run of the script
+        return {
+            name: table for name, table in self.tables.items() if self.added[name] < idx
+        }
+
+    def run(self, indexes: Optional[Iterable[int]] = None):
+        """
+        Runs the steps of the script, in order.
+
+        Parameters
+        ----------
+        indexes : Optional[Iterable[int]]
+            The indexes of the steps to run, by default all of them; steps
+            can only be run again after a run of all the steps.
+        """
+
+        if indexes is None:
+            indexes = range(len(self.steps))
+        selected = set(indexes)
+        steps = self.steps
+        jobs = self.jobs
+        manifest = self.manifest
+
+        # Collect the steps that load or describe data, which are run ahead
+        # and concurrently when they do not depend on other steps; their
+        # results are still used in script order, so that the outcome does not
+        # depend on the number of jobs.
+        # Loads run ahead share the budget of jobs for parsing, as each runs
+        # in a worker of a pool of `jobs` workers; loads run in order, in
+        # the current process, parse with all the jobs
+        loads = [idx for idx in selected if steps[idx][0] == "add_resource"]
+        load_jobs = max(1, jobs // max(1, len(loads)))
+
+        tasks = {}
+        for idx in sorted(selected):
+            command, args = steps[idx]
+            if command == "describe_resource":
+                from tasyba.fl import describe_resource_descriptor
+
+                tasks[idx] = (
+                    describe_resource_descriptor,
+                    (args["source"], args.get("write")),
+                    "process",
+                )
+            elif command == "add_resource":
+                tasks[idx] = (
+                    read_table,
+                    (
+                        args["source"],
+                        SAMPLE_SIZE,
+                        True,
+                        self.unused_fields(idx),
+                        load_jobs,
+                    ),
+                    load_kind(args["source"], load_jobs),
+                )
+        futures = prefetch(
+            tasks, [step_deps & selected for step_deps in self.deps], jobs
+        )
+
+        def task_result(idx):
+            # Obtain the result of a task, running it now if it was not run ahead
+            if idx in futures:
+                return futures[idx].result()
+            func, args, _ = tasks[idx]
+            if steps[idx][0] == "add_resource":
+                args = args[:-1] + (jobs,)
+            return func(*args)
+
+        # Iterate over the steps; all pages share the same build time, and
+        # deploy steps already run as part of a batch are skipped
+        current_time = datetime.datetime.now().ctime()
+        deployed = set()
+        assets = {}
+
+        # The layouts of the deployed tables and the keys referenced by
+        # links, along with the indexes of the keys, built once per run
+        layouts = self.layouts()
+        link_keys = self.link_keys()
+        key_indexes = {}
+
+        def build_site_replaces(args):
+            # Build the replacements of a deploy step, building the static
+            # assets of its templates on first use
+            replaces = build_replaces(args)
+            template_path = args.get("template_path")
+            if template_path not in assets:
+                assets[template_path] = build_assets(
+                    load_template(args, auto_reload=self.auto_reload),
+                    replaces,
+                    manifest,
+                )
+            replaces["assets"] = assets[template_path]
+
+            return replaces
+
+        tables = self.tables
+        for idx in sorted(selected):
+            command, args = steps[idx]
+            with stage(command, step=idx) as record:
+                if command == "describe_resource":
+                    # Describe a resource, storing it if requested
+                    task_result(idx)
+
+                elif command == "add_resource":
+                    # Add a resource to the package; if we point to a YAML
+                    # file, we assume it is a frictionless resource description;
+                    # otherwise, we assume it is a path to a raw data file
+                    # (tabular, Excel, JSON, etc.), which must be loaded via a
+                    # frictionless resource description
+
+                    # Load data, except for the fields removed before being
+                    # used; columnar formats such as Parquet are read directly
+                    table_name = args.get("name", Path(args["source"]).stem)
+                    tables[table_name] = task_result(idx)
+                    self.added[table_name] = idx
+                    self.pruned[table_name] = self.unused_fields(idx)
+                    record["rows"] = len(tables[table_name])
+                elif command == "field_remove":
+                    # Remove fields; as tables are stored by column, this does
+                    # not depend on the number of rows
+                    # TODO: move to frictionless
+                    pruned = self.pruned.get(args["table"], set())
+                    tables[args["table"]].remove_fields(
+                        [field for field in args["fields"] if field not in pruned]
+                    )
+                elif command == "table_transpose":
+                    # Transpose a table out of core, holding at most
+                    # `block_size` rows of values in memory; the transposed
+                    # table is then held in memory, as all deployed tables
+                    tables[args["name"]] = transpose_table(
+                        tables[args["name"]], args.get("block_size", BLOCK_SIZE)
+                    )
+                    record["rows"] = len(tables[args["name"]])
+                elif command == "table_pivot":
+                    # Pivot a table, aggregating the values of each pair of
+                    # keys with the native engine
+                    index, columns, values = args["columns"]
+                    tables[args["name"]] = pivot_table(
+                        tables[args["name"]],
+                        index,
+                        columns,
+                        values,
+                        args.get("aggfun", "sum"),
+                    )
+                    record["rows"] = len(tables[args["name"]])
+                elif command == "table_write":
+                    # Write a table in a columnar format, such as Parquet, for
+                    # use by later scripts
+                    write_columnar(tables[args["table"]], args["path"])
+                elif command == "table_deploy":
+                    # Render tables as HTML, sharding them if requested; with
+                    # more than one job, the tables of consecutive deploy
+                    # steps, which are independent, are rendered together and
+                    # in parallel
+                    if idx in deployed:
+                        continue
+
+                    batch = [args]
+                    for next_idx in range(idx + 1, len(steps)):
+                        next_command, next_args = steps[next_idx]
+                        if jobs <= 1 or next_command != "table_deploy":
+                            break
+                        if next_idx not in selected:
+                            break
+                        if next_args["table"] in {item["table"] for item in batch}:
+                            break
+                        batch.append(next_args)
+                    deployed.update(range(idx + 1, idx + len(batch)))
+
+                    # Links are resolved here, once, so that workers only
+                    # receive the link of each distinct value
+                    visible = self._visible_tables(idx)
+                    options = {}
+                    for item in batch:
+                        table = tables[item["table"]]
+                        options[item["table"]] = {
+                            "page_size": item.get("page_size"),
+                            "shard_format": item.get("shard_format", "html"),
+                            "search": item.get("search", False),
+                            "links": resolve_links(
+                                table,
+                                parse_links(item.get("links"), item["table"]),
+                                visible,
+                                layouts,
+                                key_indexes,
+                            ),
+                            "anchors": key_anchors(
+                                table, link_keys.get(item["table"], ())
+                            ),
+                        }
+
+                    record["rows"] = sum(len(tables[item["table"]]) for item in batch)
+                    build_html_tables(
+                        [
+                            (
+                                item["table"],
+                                build_site_replaces(item),
+                                item,
+                                options[item["table"]],
+                            )
+                            for item in batch
+                        ],
+                        visible,
+                        manifest=manifest,
+                        current_time=current_time,
+                        jobs=jobs,
+                        auto_reload=self.auto_reload,
+                    )
+
+                elif command == "sql_deploy":
+                    # Build the SQL query page and its database, for the
+                    # requested tables or all of them; column types are those
+                    # inferred when loading each table
+                    visible = self._visible_tables(idx)
+                    table_names = args.get("tables", list(visible))
+                    sql_tables = {name: tables[name] for name in table_names}
+                    schemata = {
+                        name: infer_schema(table) for name, table in sql_tables.items()
+                    }
+
+                    replaces = build_site_replaces(args)
+                    template_env = load_template(args, auto_reload=self.auto_reload)
+                    build_sql_page(
+                        sql_tables,
+                        replaces,
+                        template_env,
+                        schemata=schemata,
+                        manifest=manifest,
+                        database=args.get("database", "database.sqlite"),
+                        current_time=current_time,
+                    )
+
+        # Compress all outputs, skipping those that did not change
+        if self.compress:
+            compress_outputs(list(manifest.entries), self.compress, manifest, jobs)
+
+        manifest.save()
+
+        # Later runs only rebuild the outputs whose inputs changed
+        manifest.force = False
+
+
+def caller(filepath, jobs=1, incremental=True, timestamp=False, compress=()):
+    """
+    Runs a deployment script, building a site from its tables.
+
+    Parameters
+    ----------
+    filepath : Union[Path,str]
+        The path to the script, in YAML format.
+    jobs : int, optional
+        The maximum number of steps, or of tables being rendered, run
+        concurrently, by default 1.
+    incremental : bool, optional
+        Whether to skip pages whose inputs did not change since the last
+        build, as recorded in the build manifest, by default True.
+    timestamp : bool, optional
+        Whether the build time is part of the inputs of each page, which
+        forces all pages to be rebuilt; otherwise, it is not shown in the
+        pages, by default False.
+    compress : Sequence[str], optional
+        The formats of the compressed copies to write next to each output
+        file, such as "gzip" and "br" (see `compress_outputs()`), by default
+        none.
+    """
+
+    Deployment(
+        filepath,
+        jobs=jobs,
+        incremental=incremental,
+        timestamp=timestamp,
+        compress=compress,
+    ).run()
@@ -6,13 +6,48 @@ Module with functions for interfacing with the frictionless framework.
 from pathlib import Path
 from typing import *
 import logging
+import os
 
 # Import 3rd-party libraries
 import frictionless
 
+# Import other modules
+from tasyba.cache import ResourceCache
+from tasyba.common import detect_encoding
+from tasyba.instrument import stage
+
+# Cache used by default by `describe_resource()`, created on first use
+_DEFAULT_CACHE = None
+
+
+def default_cache() -> ResourceCache:
+    """
+    Returns the default resource cache, creating it if needed.
+    """
+
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ResourceCache()
+
+    return _DEFAULT_CACHE
+
+
+def resource_detector() -> frictionless.Detector:
+    """
+    Returns a frictionless detector sharing the encoding detection of tasyba.
+
+    Frictionless falls back to UTF-8 for encodings detected with low
+    confidence, which fails on files in other encodings, such as Latin-1,
+    that the tabular readers of tasyba can read (see `detect_encoding()`).
+    """
+
+    return frictionless.Detector(encoding_function=detect_encoding)
+
 
 def describe_resource(
-    filename: Union[Path, str], validate=True
+    filename: Union[Path, str],
+    validate=True,
+    cache: Union[bool, ResourceCache] = False,
 ) -> frictionless.Resource:
     """
     Obtain the frictionless description of a resource (i.e., single table).
@@ -20,7 +55,13 @@ def describe_resource(
     Note that the function will by default also perform pre-resource
     validation, which can be disabled by setting the `validate` parameter.
     The validation will stop execution and show the error report if the
-    resource is not valid.
+    resource is not valid. The resource is described first, and the
+    validation is performed against the inferred description, so that
+    inference only happens once.
+
+    Descriptions and validation reports can be stored in a persistent
+    cache, keyed by the contents of the file, so that unchanged resources
+    are not read again.
 
     Parameters
     ----------
@@ -28,17 +69,83 @@ def describe_resource(
         The path to the resource to describe.
     validate : bool, optional
         Whether to perform pre-resource validation, by default True.
+    cache : Union[bool,ResourceCache], optional
+        The cache to use; `True` uses the default cache (see
+        `default_cache()`) and `False` disables caching, by default False.
     """
 
-    if validate:
-        # Validate the resource
-        report = frictionless.validate(filename)
-        if not report["valid"]:
-            logging.error(report.to_summary())
-            raise ValueError(
-                "Resource is not valid, please see validation report above."
-            )
+    if cache is True:
+        cache = default_cache()
+
+    # Try to obtain the results from the cache
+    entry = {}
+    key = None
+    if cache:
+        key = cache.key(filename, frictionless=frictionless.__version__)
+        entry = cache.get(key) or {}
+
+    # Describe and validate the resource, unless previous results are
+    # available; note that `entry` is only stored back if it was updated
+    cached = dict(entry)
+    if "resource" in entry:
+        # As when describing, the cached path was provided by the user and
+        # can be trusted
+        resource = frictionless.Resource(entry["resource"], trusted=True)
+    else:
+        with stage("frictionless.describe", file=str(filename)) as record:
+            resource = frictionless.describe(filename, detector=resource_detector())
+            record["bytes_read"] = os.path.getsize(filename)
+        entry["resource"] = resource.to_dict()
 
-    resource = frictionless.describe(filename)
+    if validate and "report" not in entry:
+        with stage("frictionless.validate", file=str(filename)) as record:
+            report = frictionless.validate(resource)
+            record["bytes_read"] = os.path.getsize(filename)
+        entry["report"] = {"valid": report.valid, "summary": report.to_summary()}
+
+    if cache and entry != cached:
+        cache.put(key, entry, filename)
+
+    if validate and not entry["report"]["valid"]:
+        logging.error(entry["report"]["summary"])
+        raise ValueError("Resource is not valid, please see validation report above.")
 
     return resource
+
+
+def describe_resource_descriptor(
+    filename: Union[Path, str],
+    write: Optional[Union[Path, str]] = None,
+    cache: Union[bool, ResourceCache] = True,
+) -> Dict[str, Any]:
+    """
+    Describe a resource, returning its descriptor as a dictionary.
+
+    Unlike the `Resource` returned by `describe_resource()`, the descriptor
+    can be passed between processes, which allows resources to be described
+    in parallel.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the resource to describe.
+    write : Optional[Union[Path,str]]
+        The path where to store the description as YAML, if any.
+    cache : Union[bool,ResourceCache], optional
+        The cache to use, as in `describe_resource()`; builds use the default
+        cache, by default True.
+
+    Returns
+    -------
+    Dict[str,Any]
+        The resource descriptor.
+    """
+
+    resource = describe_resource(filename, cache=cache)
+
+    # Store the resource if requested
+    # TODO: check if the name is already taken, have a flag to overwrite
+    if write:
+        resource.to_yaml(write)
+
+    return resource.to_dict()
@@ -0,0 +1,219 @@
+"""
+Module for inferring the types of the columns of tables.
+
+As columns are dictionary-encoded, types are inferred from the distinct
+values of each column only, so that the cost depends on the number of
+distinct values rather than on the number of rows.
+
+The inferred types are those of frictionless ("integer", "number",
+"boolean", "date", and "string"), plus "categorical" for string columns
+with few distinct values, which are described as strings constrained to
+an enumeration in frictionless schemata.
+"""
+
+# Import Python standard libraries
+from array import array
+from typing import *
+import datetime
+import logging
+import re
+
+# Import other modules
+from tasyba.database import FALSE_VALUES, TRUE_VALUES
+from tasyba.instrument import stage
+from tasyba.table import Table, TypedValues
+
+# Values considered missing, which are ignored when inferring types
+MISSING_VALUES = {"", None}
+
+# Patterns of the values of each type
+INTEGER_PATTERN = re.compile(r"[-+]?[0-9]+")
+NUMBER_PATTERN = re.compile(r"[-+]?([0-9]+(\.[0-9]*)?|\.[0-9]+)([eE][-+]?[0-9]+)?")
+DATE_PATTERN = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+# Maximum number of distinct values of a categorical column, and maximum
+# ratio of distinct values to rows
+CATEGORICAL_MAX = 32
+CATEGORICAL_RATIO = 0.5
+
+# Typecodes of the arrays storing the values of numeric columns
+TYPECODES = {"integer": "q", "number": "d"}
+
+
+def _is_date(value: str) -> bool:
+    # Check that a value is a valid date in ISO format
+    if not DATE_PATTERN.fullmatch(value):
+        return False
+    try:
+        datetime.date.fromisoformat(value)
+    except ValueError:
+        return False
+
+    return True
+
+
+def infer_type(values: Sequence[Optional[str]], nrows: Optional[int] = None) -> str:
+    """
+    Infers the type of a column from its distinct values.
+
+    Types are tried from the most to the least specific: "integer",
+    "number", "boolean", "date", and, for columns with at most
+    `CATEGORICAL_MAX` distinct values and `CATEGORICAL_RATIO` times as many
+    rows, "categorical"; any other column is of type "string". Missing
+    values are ignored, and columns with no other values are strings.
+
+    Parameters
+    ----------
+    values : Sequence[Optional[str]]
+        The distinct values of the column.
+    nrows : Optional[int]
+        The number of rows of the column, by default the number of values.
+
+    Returns
+    -------
+    str
+        The type of the column.
+    """
+
+    values = [value for value in values if value not in MISSING_VALUES]
+    if not values:
+        return "string"
+
+    # Each check stops at the first value that does not match
+    if all(map(INTEGER_PATTERN.fullmatch, values)):
+        return "integer"
+    elif all(map(NUMBER_PATTERN.fullmatch, values)):
+        return "number"
+    elif all(value in TRUE_VALUES or value in FALSE_VALUES for value in values):
+        return "boolean"
+    elif all(map(_is_date, values)):
+        return "date"
+
+    if nrows is None:
+        nrows = len(values)
+    if len(values) <= CATEGORICAL_MAX and len(values) <= nrows * CATEGORICAL_RATIO:
+        return "categorical"
+
+    return "string"
+
+
+def typed_values(
+    values: Sequence[Optional[str]], field_type: str
+) -> Optional[TypedValues]:
+    """
+    Converts the distinct values of a numeric column to a typed array.
+
+    Values are only converted if their string representation can be
+    restored exactly (so that "7" is converted, but not "07" or "+7" in an
+    integer column, nor "7.50" in a number column), and if there is at most
+    one missing value.
+
+    Parameters
+    ----------
+    values : Sequence[Optional[str]]
+        The distinct values of the column, all of the given type or missing.
+    field_type : str
+        The type of the column, either "integer" or "number", as returned by
+        `infer_type()`.
+
+    Returns
+    -------
+    Optional[TypedValues]
+        The typed values, or `None` if they cannot be converted.
+    """
+
+    missing = [code for code, value in enumerate(values) if value in MISSING_VALUES]
+    if len(missing) > 1 or field_type not in TYPECODES:
+        return None
+
+    # Use a placeholder for the missing value, if any
+    present = list(values)
+    if missing:
+        present[missing[0]] = "0" if field_type == "integer" else "0.0"
+
+    convert = int if field_type == "integer" else float
+    try:
+        typed = array(TYPECODES[field_type], map(convert, present))
+    except OverflowError:
+        return None
+    if not all(map(str.__eq__, map(str, typed), present)):
+        return None
+
+    if missing:
+        return TypedValues(typed, missing[0], values[missing[0]])
+
+    return TypedValues(typed)
+
+
+def infer_types(table: Table, typed: bool = True) -> Dict[str, str]:
+    """
+    Infers the types of the columns of a table.
+
+    The types are stored in the `types` of the table, and fields whose
+    types are already known are skipped. Unless `typed` is false, the
+    distinct values of numeric columns are also stored in typed arrays
+    where possible (see `typed_values()`), which take much less memory than
+    strings.
+
+    Parameters
+    ----------
+    table : Table
+        The table.
+    typed : bool, optional
+        Whether to store numeric columns in typed arrays, by default True.
+
+    Returns
+    -------
+    Dict[str,str]
+        The type of each field.
+    """
+
+    with stage("infer_types") as record:
+        for field, column in table.columns.items():
+            if field in table.types:
+                continue
+
+            table.types[field] = infer_type(column.values, len(column))
+            if typed and table.types[field] in TYPECODES:
+                values = typed_values(column.values, table.types[field])
+                if values is not None:
+                    column.set_values(values)
+        record["rows"] = len(table)
+
+    logging.debug("Types of table inferred: %s", table.types)
+
+    return table.types
+
+
+def infer_schema(table: Table) -> Dict[str, Any]:
+    """
+    Builds a frictionless schema descriptor for a table.
+
+    Types are inferred if not already known (see `infer_types()`).
+
+    Parameters
+    ----------
+    table : Table
+        The table.
+
+    Returns
+    -------
+    Dict[str,Any]
+        The schema descriptor, listing the name and type of each field;
+        categorical fields are strings constrained to their values.
+    """
+
+    if set(table.types) != set(table.columns):
+        infer_types(table)
+
+    fields = []
+    for field in table.fields:
+        if table.types[field] == "categorical":
+            values = sorted(set(table.column(field).values) - MISSING_VALUES)
+            fields.append(
+                {"name": field, "type": "string", "constraints": {"enum": values}}
+            )
+        else:
+            fields.append({"name": field, "type": table.types[field]})
+
+    return {"fields": fields}
@@ -0,0 +1,213 @@
+"""
+Module for profiling the stages of a build.
+
+Functions along the hot paths of tasyba (reading tables, describing
+resources, running scripts, and rendering pages) wrap their work in
+`stage()` blocks. These cost next to nothing unless a `Profiler` is
+active, in which case each stage records its wall and CPU times, the rows
+and bytes it processed, and its peak memory, so that the time of a build
+can be attributed to, for example, encoding detection, frictionless
+inference, or template rendering.
+
+Stages run in worker processes (see `scheduler.prefetch()`) are not
+recorded; their cost appears as the time the main process waits for them.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import contextlib
+import cProfile
+import json
+import re
+import threading
+import time
+import tracemalloc
+
+# The active profiler, if any
+_PROFILER = None
+
+
+class Profiler:
+    """
+    A recorder of the time, throughput, and memory usage of build stages.
+
+    The profiler records the stages entered while it is active, as a
+    context manager, in the thread where it was activated. Stages can be
+    nested, in which case the figures of a stage include those of its
+    children.
+    """
+
+    def __init__(
+        self, memory: bool = True, dump_dir: Optional[Union[Path, str]] = None
+    ):
+        """
+        Parameters
+        ----------
+        memory : bool, optional
+            Whether to record the peak memory of each stage, over the
+            memory in use when it started, by default True. Memory is traced
+            with `tracemalloc`, which slows down allocation-heavy code.
+        dump_dir : Optional[Union[Path,str]]
+            A directory where to store a `cProfile` dump of each top-level
+            stage, if any. Dumps can be inspected with `pstats` or turned
+            into flame graphs by tools such as `snakeviz` or `flameprof`.
+        """
+
+        self.memory = memory
+        self.dump_dir = Path(dump_dir) if dump_dir else None
+        self.records: List[Dict[str, Any]] = []
+
+        # Peak memory of the children of each open stage
+        self._peaks: List[int] = []
+        self._previous = None
+        self._started_tracing = False
+        self._thread = None
+
+    def __enter__(self) -> "Profiler":
+        global _PROFILER
+        self._previous = _PROFILER
+        self._thread = threading.get_ident()
+        _PROFILER = self
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.dump_dir:
+            self.dump_dir.mkdir(parents=True, exist_ok=True)
+
+        return self
+
+    def __exit__(self, *exc_info):
+        global _PROFILER
+        _PROFILER = self._previous
+
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _peak(self) -> Tuple[int, int]:
+        # Collect the current memory and its peak since the last reset,
+        # resetting it for the next measurement; without `reset_peak()`
+        # (Python < 3.9) the peak covers the whole run
+        current, peak = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        return current, peak
+
+    @contextlib.contextmanager
+    def stage(self, name: str, **info) -> Iterator[Dict[str, Any]]:
+        """
+        Records a stage, yielding its record for the caller to complete.
+
+        Parameters
+        ----------
+        name : str
+            The name of the stage, such as the function or command run.
+        info
+            Additional information to store in the record, such as the file
+            processed.
+
+        Yields
+        ------
+        Dict[str,Any]
+            The record of the stage, where the caller can set the number of
+            `rows` processed and of `bytes_read` and `bytes_written`.
+        """
+
+        record = {"name": name, "depth": len(self._peaks)}
+        record.update(info)
+        for key in ("rows", "bytes_read", "bytes_written"):
+            record.setdefault(key, None)
+        number = len(self.records)
+        self.records.append(record)
+
+        # Attribute the memory used so far to the enclosing stage
+        start_memory = 0
+        if self.memory:
+            start_memory, peak = self._peak()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+        self._peaks.append(0)
+
+        profile = None
+        if self.dump_dir and record["depth"] == 0:
+            profile = cProfile.Profile()
+
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield record
+        finally:
+            if profile:
+                profile.disable()
+            record["wall"] = time.perf_counter() - start_wall
+            record["cpu"] = time.process_time() - start_cpu
+
+            # Report the peak over the memory in use when the stage started
+            peak = self._peaks.pop()
+            if self.memory:
+                peak = max(peak, self._peak()[1])
+                record["peak_memory"] = peak - start_memory
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+
+            if profile:
+                slug = re.sub(r"\W+", "-", name).strip("-")
+                profile.dump_stats(str(self.dump_dir / f"{number:03d}-{slug}.prof"))
+
+    def report(self) -> str:
+        """
+        Returns the records as a table, with nested stages indented.
+        """
+
+        def fmt(value, width, spec):
+            return f"{'-':>{width}}" if value is None else f"{value:{width}{spec}}"
+
+        lines = [
+            f"{'stage':<36} {'wall (s)':>9} {'cpu (s)':>9} {'rows':>10} "
+            f"{'read (MB)':>10} {'written (MB)':>12} {'peak (MB)':>10}"
+        ]
+        for record in self.records:
+            name = "  " * record["depth"] + record["name"]
+            mb = {
+                key: None if record.get(key) is None else record[key] / 1e6
+                for key in ("bytes_read", "bytes_written", "peak_memory")
+            }
+            lines.append(
+                f"{name:<36} {fmt(record.get('wall'), 9, '.3f')} "
+                f"{fmt(record.get('cpu'), 9, '.3f')} {fmt(record['rows'], 10, 'd')} "
+                f"{fmt(mb['bytes_read'], 10, '.2f')} "
+                f"{fmt(mb['bytes_written'], 12, '.2f')} "
+                f"{fmt(mb['peak_memory'], 10, '.1f')}"
+            )
+
+        return "\n".join(lines)
+
+    def save(self, filename: Union[Path, str]):
+        """
+        Writes the records to a JSON file.
+        """
+
+        with open(filename, "w", encoding="utf-8") as handler:
+            json.dump({"stages": self.records}, handler, indent=2, default=str)
+
+
+@contextlib.contextmanager
+def stage(name: str, **info) -> Iterator[Dict[str, Any]]:
+    """
+    Records a stage in the active profiler, if any.
+
+    When no profiler is active, or when called from a thread other than the
+    one the profiler was activated in, the yielded record is discarded.
+    See `Profiler.stage()` for the parameters.
+    """
+
+    profiler = _PROFILER
+    if profiler is None or profiler._thread != threading.get_ident():
+        yield {}
+        return
+
+    with profiler.stage(name, **info) as record:
+        yield record
@@ -0,0 +1,273 @@
+"""
+Module for resolving links between the tables of a site.
+
+Foreign keys declare that the values of a field refer to the values of a
+key field of another table (or of the same one). Links are resolved
+through a hash index of each key field, built once, and only for the
+distinct values of the referring field, as columns are dictionary-encoded,
+so that the cost is linear in the size of the tables.
+
+Rows are linked through anchors on the cells of their keys, on the page of
+the referenced table holding them.
+"""
+
+# Import Python standard libraries
+from array import array
+from pathlib import Path
+from typing import *
+import logging
+import urllib.parse
+
+# Import 3rd-party libraries
+import yaml
+
+# Import other modules
+from tasyba.render import page_file
+from tasyba.table import Column, Table
+
+# Values that never refer to a row
+MISSING_VALUES = {"", None}
+
+
+def foreign_keys(
+    descriptor: Dict[str, Any], table_name: str
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Collects the foreign keys of a frictionless resource or schema.
+
+    Only keys of a single field can be linked, and other keys are skipped
+    with a warning. References to the resource itself, with an empty
+    resource name, are references to `table_name`.
+
+    Parameters
+    ----------
+    descriptor : Dict[str,Any]
+        The resource descriptor, or its schema.
+    table_name : str
+        The name of the table described.
+
+    Returns
+    -------
+    Dict[str,Tuple[str,str]]
+        The referenced table and key field of each referring field.
+    """
+
+    schema = descriptor.get("schema", descriptor)
+
+    links = {}
+    for key in schema.get("foreignKeys", []):
+        fields = key["fields"]
+        ref_fields = key["reference"]["fields"]
+        if isinstance(fields, str):
+            fields = [fields]
+        if isinstance(ref_fields, str):
+            ref_fields = [ref_fields]
+        if len(fields) != 1 or len(ref_fields) != 1:
+            logging.warning("Skipping foreign key of several fields: %s", fields)
+            continue
+
+        target = key["reference"].get("resource") or table_name
+        links[fields[0]] = (target, ref_fields[0])
+
+    return links
+
+
+def parse_links(
+    links: Union[str, Dict[str, Any], None], table_name: str
+) -> Dict[str, Tuple[str, str]]:
+    """
+    Parses the links of a deploy step.
+
+    Links are given either as a mapping from each referring field to its
+    key, as `table.field` or as a mapping with `table` and `field`, or as
+    the path to a frictionless resource or schema descriptor, in YAML or
+    JSON, whose foreign keys are used (see `foreign_keys()`).
+
+    Parameters
+    ----------
+    links : Union[str,Dict[str,Any],None]
+        The links of the step, if any.
+    table_name : str
+        The name of the table deployed.
+
+    Returns
+    -------
+    Dict[str,Tuple[str,str]]
+        The referenced table and key field of each referring field.
+    """
+
+    if not links:
+        return {}
+
+    if isinstance(links, (str, Path)):
+        with open(links, encoding="utf-8") as handler:
+            return foreign_keys(yaml.safe_load(handler), table_name)
+
+    parsed = {}
+    for field, key in links.items():
+        if isinstance(key, str):
+            target, _, key_field = key.rpartition(".")
+            if not target:
+                raise ValueError(f"Invalid link `{key}`, expected `table.field`.")
+            parsed[field] = (target, key_field)
+        else:
+            parsed[field] = (key["table"], key["field"])
+
+    return parsed
+
+
+def key_index(column: Column) -> Dict[str, int]:
+    """
+    Builds a hash index of the distinct values of a key column.
+
+    As codes are dictionary-encoded, the first row of each value is found
+    by a single pass over the codes, which stops as soon as all values
+    were found.
+
+    Parameters
+    ----------
+    column : Column
+        The key column.
+
+    Returns
+    -------
+    Dict[str,int]
+        The index of the first row holding each value, except missing ones.
+    """
+
+    first = array("q", [-1]) * len(column.values)
+    missing = len(first)
+    for row, code in enumerate(column.codes):
+        if first[code] < 0:
+            first[code] = row
+            missing -= 1
+            if not missing:
+                break
+
+    return {
+        value: first[code]
+        for code, value in enumerate(column.values)
+        if value not in MISSING_VALUES and first[code] >= 0
+    }
+
+
+def anchor_id(field: str, value: str) -> str:
+    """
+    Returns the identifier of the anchor of a key value.
+
+    Values are percent-encoded, so that identifiers hold no whitespace.
+    """
+
+    return f"{field}-{urllib.parse.quote(value, safe='')}"
+
+
+def key_anchors(table: Table, fields: Iterable[str]) -> Dict[str, Dict[int, str]]:
+    """
+    Builds the anchors of the values of the key fields of a table.
+
+    Only the first row holding each value gets an anchor, which is the row
+    links point to (see `resolve_links()`), so that identifiers are unique
+    in the page even if a key has repeated values.
+
+    Parameters
+    ----------
+    table : Table
+        The table.
+    fields : Iterable[str]
+        The key fields referenced by other tables; fields not in the table
+        are skipped.
+
+    Returns
+    -------
+    Dict[str,Dict[int,str]]
+        The anchor identifier of each key field, by the index of the first
+        row holding each distinct value; other rows, and missing values,
+        have no anchor.
+    """
+
+    return {
+        field: {
+            row: anchor_id(field, value)
+            for value, row in key_index(table.column(field)).items()
+        }
+        for field in fields
+        if field in table.columns
+    }
+
+
+def resolve_links(
+    table: Table,
+    links: Dict[str, Tuple[str, str]],
+    tables: Dict[str, Table],
+    layouts: Dict[str, Tuple[Optional[int], str]],
+    indexes: Optional[Dict[Tuple[str, str], Tuple[Column, Dict[str, int]]]] = None,
+) -> Dict[str, List[Optional[str]]]:
+    """
+    Resolves the links of the values of a table to rows of other tables.
+
+    Each link points to the page of the referenced table holding the first
+    row with the value, as given by its layout, and to the anchor of the
+    value there (see `key_anchors()`); as rows loaded from JSON shards have
+    no anchors, links to such tables point to their page only. Links to
+    tables not deployed, or to fields not found, are skipped with a warning.
+
+    Parameters
+    ----------
+    table : Table
+        The referring table.
+    links : Dict[str,Tuple[str,str]]
+        The referenced table and key field of each referring field (see
+        `parse_links()`).
+    tables : Dict[str,Table]
+        The tables that can be referenced, by name.
+    layouts : Dict[str,Tuple[Optional[int],str]]
+        The page size and the shard format of each deployed table.
+    indexes : Optional[Dict[Tuple[str,str],Tuple[Column,Dict[str,int]]]]
+        A cache of the key indexes already built, with the columns they were
+        built from, which is updated with the new indexes.
+
+    Returns
+    -------
+    Dict[str,List[Optional[str]]]
+        The link of each distinct value of each referring field, by
+        dictionary code, or `None` for values not found.
+    """
+
+    if indexes is None:
+        indexes = {}
+
+    urls = {}
+    for field, (target, key) in links.items():
+        if field not in table.columns:
+            logging.warning("Skipping link of missing field `%s`.", field)
+            continue
+        if target not in tables or key not in tables[target].columns:
+            logging.warning("Skipping link of `%s` to `%s.%s`.", field, target, key)
+            continue
+        if target not in layouts:
+            logging.warning("Skipping link to `%s`, which is not deployed.", target)
+            continue
+
+        # Build the index of the key only once, unless the column changed
+        column = tables[target].column(key)
+        cached = indexes.get((target, key))
+        if cached is None or cached[0] is not column:
+            cached = indexes[target, key] = (column, key_index(column))
+        index = cached[1]
+
+        page_size, shard_format = layouts[target]
+        field_urls = []
+        for value in table.column(field).values:
+            row = index.get(value)
+            if row is None:
+                field_urls.append(None)
+            elif shard_format == "json":
+                field_urls.append(page_file(target, 1))
+            else:
+                number = row // page_size + 1 if page_size else 1
+                field_urls.append(
+                    f"{page_file(target, number)}#{anchor_id(key, value)}"
+                )
+        urls[field] = field_urls
+
+    return urls
@@ -0,0 +1,222 @@
+"""
+Module for incremental builds, recording the inputs of each output file.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import filecmp
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+# Size of the buffer used when streaming output files to disk
+WRITE_BUFFER = 1024 * 1024
+
+# Default name of the manifest file, stored in the output directory
+MANIFEST_FILE = ".tasyba-manifest.json"
+
+
+def hash_inputs(inputs: Any) -> str:
+    """
+    Computes a hash for a JSON-serializable structure of build inputs.
+
+    Values that cannot be serialized are hashed by their string
+    representation.
+
+    Parameters
+    ----------
+    inputs : Any
+        The inputs to hash.
+
+    Returns
+    -------
+    str
+        The hexadecimal digest of the inputs.
+    """
+
+    inputs_json = json.dumps(inputs, sort_keys=True, default=str)
+
+    return hashlib.sha256(inputs_json.encode("utf-8")).hexdigest()
+
+
+def write_if_changed(filename: Union[Path, str], content: Union[str, bytes]) -> bool:
+    """
+    Writes a file, unless it already exists with the same content.
+
+    Leaving unchanged files untouched preserves their modification times,
+    so that synchronization tools do not transfer them again.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to write.
+    content : Union[str,bytes]
+        The content to write; strings are encoded as UTF-8.
+
+    Returns
+    -------
+    bool
+        Whether the file was written.
+    """
+
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    filename = Path(filename)
+    if filename.exists() and filename.stat().st_size == len(content):
+        if filename.read_bytes() == content:
+            return False
+
+    filename.write_bytes(content)
+
+    return True
+
+
+def stream_if_changed(
+    filename: Union[Path, str], chunks: Iterable[str]
+) -> Tuple[bool, int]:
+    """
+    Writes a file from a stream of strings, unless its content is unchanged.
+
+    Chunks are encoded as UTF-8 and written, through a buffer, to a
+    temporary file in the same directory, which replaces the original file
+    only if the contents differ. Memory usage thus does not depend on the
+    size of the file.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to write.
+    chunks : Iterable[str]
+        The content to write, such as the output of a template's
+        `generate()` method.
+
+    Returns
+    -------
+    Tuple[bool,int]
+        Whether the file was written, and the size of its content in bytes.
+    """
+
+    filename = Path(filename)
+    handle, tmp_name = tempfile.mkstemp(
+        dir=filename.parent, prefix=f".{filename.name}.", suffix=".tmp"
+    )
+
+    size = 0
+    try:
+        with os.fdopen(handle, "wb", buffering=WRITE_BUFFER) as handler:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                handler.write(data)
+                size += len(data)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+    return replace_if_changed(tmp_name, filename), size
+
+
+def replace_if_changed(tmp_name: Union[Path, str], filename: Union[Path, str]) -> bool:
+    """
+    Moves a temporary file over a file, unless their contents are the same.
+
+    Parameters
+    ----------
+    tmp_name : Union[Path,str]
+        The path to the temporary file, which is always removed.
+    filename : Union[Path,str]
+        The path to the file to replace.
+
+    Returns
+    -------
+    bool
+        Whether the file was replaced.
+    """
+
+    if os.path.exists(filename) and filecmp.cmp(tmp_name, filename, shallow=False):
+        os.unlink(tmp_name)
+        return False
+
+    # Keep the usual permissions of new files, as `mkstemp()` only allows the
+    # owner to read the temporary file
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp_name, 0o666 & ~umask)
+    os.replace(tmp_name, filename)
+
+    return True
+
+
+class BuildManifest:
+    """
+    A record of the inputs used for building each output file.
+
+    The manifest maps each output file to the hash of its inputs (source
+    tables, templates and replacement values); outputs whose inputs did
+    not change since the last build can be skipped. The build time is
+    only part of the inputs, and shown in the pages, if `timestamp` is set,
+    as otherwise no output would ever be current.
+    """
+
+    def __init__(
+        self,
+        filename: Union[Path, str] = MANIFEST_FILE,
+        timestamp: bool = False,
+        force: bool = False,
+    ):
+        """
+        Parameters
+        ----------
+        filename : Union[Path,str]
+            The path to the manifest file, by default `MANIFEST_FILE`.
+        timestamp : bool, optional
+            Whether the build time is part of the inputs, by default False.
+        force : bool, optional
+            Whether to consider all outputs as outdated, by default False.
+        """
+
+        self.filename = Path(filename)
+        self.timestamp = timestamp
+        self.force = force
+
+        self.entries: Dict[str, str] = {}
+        if self.filename.exists():
+            with open(self.filename, encoding="utf-8") as handler:
+                self.entries = json.load(handler)
+
+    def is_current(self, output_file: Union[Path, str], digest: str) -> bool:
+        """
+        Checks whether an output file was built from the given inputs.
+        """
+
+        if self.force or not Path(output_file).exists():
+            return False
+
+        return self.entries.get(str(output_file)) == digest
+
+    def record(self, output_file: Union[Path, str], digest: str):
+        """
+        Records the hash of the inputs an output file was built from.
+        """
+
+        self.entries[str(output_file)] = digest
+
+    def forget(self, output_file: Union[Path, str]):
+        """
+        Removes the record of an output file, e.g., after deleting it.
+        """
+
+        self.entries.pop(str(output_file), None)
+
+    def save(self):
+        """
+        Writes the manifest to disk.
+        """
+
+        logging.info("Writing build manifest to `%s`", self.filename)
+        write_if_changed(
+            self.filename, json.dumps(self.entries, indent=2, sort_keys=True)
+        )
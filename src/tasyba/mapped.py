@@ -0,0 +1,422 @@
+"""
+Module for random access to the rows of large tabular files.
+
+Tabular files are memory-mapped, and the boundaries of their rows are found
+once, in bulk, into a sparse index of row offsets. Any row, or range of
+rows, can then be parsed without reading the rest of the file, so that
+files larger than the available memory can be sampled, paged through, or
+split into chunks for parsing in parallel.
+
+Row boundaries are found line by line; only lines holding the quote
+character are scanned field by field, to skip newlines within quoted
+values, as the `csv` module does.
+"""
+
+# Import Python standard libraries
+from array import array
+from pathlib import Path
+from typing import *
+import csv
+import io
+import logging
+import mmap
+import re
+
+# Import other modules
+from tasyba.common import SAMPLE_SIZE, detect_sample_format
+from tasyba.instrument import stage
+
+# Number of rows between the offsets stored in the index
+INDEX_STRIDE = 32
+
+# Number of bytes scanned for row boundaries at a time, starting from the
+# smallest and doubling up to the largest, so that finding a few rows only
+# reads their bytes
+SCAN_BLOCK_MIN = 64 * 1024
+SCAN_BLOCK = 16 * 1024 * 1024
+
+# Number of bytes parsed at a time when iterating over rows
+PARSE_BLOCK = 1024 * 1024
+
+# States of the scanning of quoted values
+_START, _FIELD, _QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+
+class MappedTabular:
+    """
+    A memory-mapped tabular file, indexed by row.
+
+    The encoding and dialect are detected from a sample of the mapped file
+    (see `detect_sample_format()`); encodings in which newlines and quotes
+    are not single bytes, such as UTF-16, are not supported, nor are files
+    with lines terminated by carriage returns only. Rows are
+    returned as dictionaries, as by `iter_tabular()`, and blank lines are
+    skipped.
+
+    Rows can be accessed by index (`mapped[k]`), by slice (`mapped[a:b]`),
+    or iterated over in ranges (see `iter_rows()`). The index stores the
+    offset of every `stride`-th row only, so that its size is a fraction of
+    the number of rows; the rows in between are found by scanning at most
+    `stride - 1` rows.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the tabular file.
+    sample_size : int, optional
+        The size of the sample, in bytes, used to detect the format of the
+        file, by default `SAMPLE_SIZE`.
+    stride : int, optional
+        The number of rows between the offsets stored in the index, by
+        default `INDEX_STRIDE`.
+    """
+
+    def __init__(
+        self,
+        filename: Union[Path, str],
+        sample_size: int = SAMPLE_SIZE,
+        stride: int = INDEX_STRIDE,
+    ):
+        self.filename = Path(filename)
+        self.stride = max(1, stride)
+
+        self._handle = open(self.filename, "rb")
+        try:
+            self._open(sample_size)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, sample_size: int):
+        # Map the file, detect its format, and read its header
+        try:
+            self._map = mmap.mmap(self._handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            self._map = b""
+        size = len(self._map)
+
+        self.encoding, self.dialect = detect_sample_format(
+            self._map[:sample_size], size > sample_size
+        )
+        if "\n".encode(self.encoding) != b"\n":
+            raise ValueError(f"Unsupported encoding for mapping: {self.encoding}")
+        sample = self._map[:sample_size]
+        if b"\r" in sample and b"\n" not in sample:
+            raise ValueError("Unsupported line terminator for mapping: CR")
+
+        # Build the pattern of the tokens relevant to finding the end of
+        # quoted values
+        self._quote = None
+        if self.dialect.quotechar and self.dialect.quoting != csv.QUOTE_NONE:
+            self._quote = self.dialect.quotechar.encode(self.encoding)
+        self._delimiter = self.dialect.delimiter.encode(self.encoding)
+        tokens = [re.escape(self._delimiter)]
+        if self._quote:
+            tokens.append(re.escape(self._quote))
+        if self.dialect.escapechar:
+            escape = self.dialect.escapechar.encode(self.encoding)
+            tokens.insert(0, re.escape(escape) + b".")
+        self._tokens = re.compile(b"|".join(tokens), re.DOTALL)
+
+        # Read the header; the rows following it are indexed when first
+        # needed (see `_index()`)
+        header = next(self._records(0), (0, 0))
+        self.fields = next(csv.reader([self._decode(*header)], self.dialect), [])
+        self.data_start = header[1]
+        self._end = size
+        self._offsets = None
+
+    def _index(self) -> Tuple[array, int]:
+        # Index the rows on first use, so that files only split by the
+        # parity of quotes (see `split()`) are never scanned row by row
+        if self._offsets is None:
+            with stage("index_rows", file=str(self.filename)) as record:
+                self._offsets, self._nrows = self._build_index(self.data_start)
+                record.update(rows=self._nrows, bytes_read=self._end)
+
+            logging.debug(
+                "Indexed %i rows of `%s` (%i offsets).",
+                self._nrows,
+                self.filename,
+                len(self._offsets),
+            )
+
+        return self._offsets, self._nrows
+
+    def __len__(self) -> int:
+        return self._index()[1]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        Closes the mapping and the underlying file.
+        """
+
+        if isinstance(getattr(self, "_map", None), mmap.mmap):
+            self._map.close()
+        self._handle.close()
+
+    def __getitem__(self, key: Union[int, slice]):
+        nrows = len(self)
+        if isinstance(key, slice):
+            start, stop, step = key.indices(nrows)
+            if step == 1:
+                return list(self.iter_rows(start, stop))
+            return [self[k] for k in range(start, stop, step)]
+
+        if key < 0:
+            key += nrows
+        if not 0 <= key < nrows:
+            raise IndexError("row index out of range")
+
+        return next(self.iter_rows(key, key + 1))
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return self.iter_rows()
+
+    def _decode(self, start: int, end: int) -> str:
+        return self._map[start:end].decode(self.encoding)
+
+    def _quoted(self, line: bytes, in_quotes: bool) -> bool:
+        # Scan a line field by field, following the states of the `csv`
+        # parser, and return whether it ends within a quoted value; quotes
+        # only start quoted values at the start of fields
+        state = _QUOTED if in_quotes else _START
+        last = 0
+        for match in self._tokens.finditer(line):
+            token = match.group()
+            if match.start() > last and state != _QUOTED:
+                gap = line[last : match.start()]
+                if state != _START or not (
+                    self.dialect.skipinitialspace and not gap.strip(b" ")
+                ):
+                    state = _FIELD
+            last = match.end()
+
+            if token == self._delimiter:
+                if state != _QUOTED:
+                    state = _START
+            elif token == self._quote:
+                if state == _START:
+                    state = _QUOTED
+                elif state == _QUOTED:
+                    state = _QUOTE_IN_QUOTED
+                elif state == _QUOTE_IN_QUOTED:
+                    # Doubled quotes are literal quotes within quoted values
+                    state = _QUOTED if self.dialect.doublequote else _FIELD
+            elif state != _QUOTED:
+                # Escaped characters
+                state = _FIELD
+
+        return state == _QUOTED
+
+    def _records(self, start: int) -> Iterator[Tuple[int, int]]:
+        # Yield the start and end offsets of the rows from `start`, which
+        # must be the start of a row
+        size = len(self._map)
+        pos = start
+        record_start, in_quotes = start, False
+        block = min(SCAN_BLOCK_MIN, SCAN_BLOCK)
+        while pos < size:
+            # Scan whole lines only, extending the block to the end of the
+            # first line if longer than the block
+            end = min(pos + block, size)
+            block = min(block * 2, SCAN_BLOCK)
+            if end < size:
+                newline = self._map.rfind(b"\n", pos, end)
+                if newline == -1:
+                    newline = self._map.find(b"\n", end)
+                end = size if newline == -1 else newline + 1
+            lines = self._map[pos:end].split(b"\n")
+            if lines[-1] == b"":
+                lines.pop()
+
+            for line in lines:
+                line_start, pos = pos, pos + len(line) + 1
+                if self._quote and self._quote in line:
+                    in_quotes = self._quoted(line, in_quotes)
+                if in_quotes:
+                    continue
+                if record_start == line_start and line in (b"", b"\r"):
+                    # Skip blank lines, as `csv.DictReader` does
+                    record_start = pos
+                    continue
+                yield record_start, min(pos, size)
+                record_start = pos
+
+        # Yield the last row, if within an unterminated quoted value
+        if record_start < size:
+            yield record_start, size
+
+    def _build_index(self, start: int) -> Tuple[array, int]:
+        # Store the offset of every `stride`-th row
+        offsets = array("Q")
+        nrows = 0
+        for nrows, (record_start, _) in enumerate(self._records(start), 1):
+            if (nrows - 1) % self.stride == 0:
+                offsets.append(record_start)
+
+        return offsets, nrows
+
+    def offset(self, k: int) -> int:
+        """
+        Returns the offset in bytes of the start of a row.
+
+        Parameters
+        ----------
+        k : int
+            The index of the row, from zero; the number of rows gives the
+            end of the last row.
+
+        Returns
+        -------
+        int
+            The offset of the row.
+        """
+
+        offsets, nrows = self._index()
+        if k >= nrows:
+            return self._end
+
+        start = offsets[k // self.stride]
+        skip = k % self.stride
+        if skip:
+            for skipped, (_, end) in enumerate(self._records(start), 1):
+                if skipped == skip:
+                    return next(self._records(end))[0]
+
+        return start
+
+    def iter_rows(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Dict[str, str]]:
+        """
+        Iterates over a range of rows, parsing only their bytes.
+
+        Rows are parsed in blocks of about `PARSE_BLOCK` bytes, so that the
+        memory used does not depend on the size of the range.
+
+        Parameters
+        ----------
+        start : int, optional
+            The index of the first row, by default 0.
+        stop : Optional[int]
+            The index after the last row, by default the number of rows.
+
+        Yields
+        ------
+        Dict[str,str]
+            The rows, as dictionaries from fields to values.
+        """
+
+        for block_start, block_end in self.chunks(PARSE_BLOCK, start, stop):
+            text = io.StringIO(self._decode(block_start, block_end), newline="")
+            yield from csv.DictReader(text, self.fields, dialect=self.dialect)
+
+    def chunks(
+        self, chunk_size: int, start: int = 0, stop: Optional[int] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        Splits a range of rows into chunks of bytes aligned to rows.
+
+        Chunks are split at indexed rows only, so that splitting scans no
+        rows; each chunk holds at least `chunk_size` bytes, except for the
+        last one, or the rows of a single stride of the index.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The minimum size of the chunks, in bytes.
+        start : int, optional
+            The index of the first row, by default 0.
+        stop : Optional[int]
+            The index after the last row, by default the number of rows.
+
+        Returns
+        -------
+        List[Tuple[int,int]]
+            The offsets of the start and of the end of each chunk, in order.
+        """
+
+        offsets, nrows = self._index()
+        stop = nrows if stop is None else min(stop, nrows)
+        if start >= stop:
+            return []
+
+        bounds = [self.offset(start)]
+        first = -(-start // self.stride)
+        for entry in range(first, -(-stop // self.stride)):
+            if offsets[entry] - bounds[-1] >= chunk_size:
+                bounds.append(offsets[entry])
+        bounds.append(self.offset(stop))
+
+        return list(zip(bounds, bounds[1:]))
+
+    def _count_quotes(self, start: int, end: int) -> int:
+        # Count the quotes in a range of bytes, a block at a time
+        return sum(
+            self._map[pos : min(pos + SCAN_BLOCK, end)].count(self._quote)
+            for pos in range(start, end, SCAN_BLOCK)
+        )
+
+    def split(self, chunk_size: int) -> List[Tuple[int, int]]:
+        """
+        Splits the rows into chunks of bytes, without indexing them.
+
+        Chunks end at the first newline, after the required size, that
+        follows an even number of quotes, which are counted in bulk, much
+        faster than scanning rows. In well-formed rows, where quotes only
+        enclose values or are doubled within them, such newlines always end
+        a row; as other rows might be split anywhere, each chunk must be
+        checked to end outside quoted values when parsed, such as by a
+        strict `csv.reader`, and the rows split by `chunks()` instead if any
+        does not.
+
+        Parameters
+        ----------
+        chunk_size : int
+            The minimum size of the chunks, in bytes.
+
+        Returns
+        -------
+        List[Tuple[int,int]]
+            The offsets of the start and of the end of each chunk, in order.
+        """
+
+        size = len(self._map)
+        bounds = [self.data_start]
+        while bounds[-1] + chunk_size < size:
+            # Find the first newline after the target size that follows an
+            # even number of quotes since the start of the chunk
+            pos = bounds[-1] + chunk_size
+            quotes = self._count_quotes(bounds[-1], pos) if self._quote else 0
+            while True:
+                newline = self._map.find(b"\n", pos)
+                if newline == -1:
+                    pos = size
+                    break
+                if self._quote:
+                    quotes += self._count_quotes(pos, newline)
+                pos = newline + 1
+                if quotes % 2 == 0:
+                    break
+            if pos >= size:
+                break
+            bounds.append(pos)
+        if bounds[-1] < size:
+            bounds.append(size)
+
+        return list(zip(bounds, bounds[1:]))
+
+    def sample(self, size: int = SAMPLE_SIZE) -> bytes:
+        """
+        Returns the first bytes of the file, as read for sniffing.
+        """
+
+        return self._map[:size]
@@ -0,0 +1,204 @@
+"""
+Module for parsing large tabular files in parallel.
+
+Tabular files are memory-mapped (see `MappedTabular`) and split into
+chunks of rows, aligned to the boundaries of records, so that newlines
+within quoted values never split a row. Chunks are first split by the
+parity of quotes, counted in bulk, and checked by the workers parsing them
+strictly, so that a chunk not ending outside quoted values fails; as the
+first chunk starts at a row, every chunk then starts at one. If any check
+fails, as when quotes appear within unquoted values, the file is split
+again by a full scan of its rows, following the detected dialect.
+
+Each chunk is parsed and dictionary-encoded by a pool of worker processes,
+and the columns of the chunks are merged, in order, into a single table,
+identical to the one parsed serially. Chunks are merged as soon as they
+are parsed, while the workers parse the following ones, so that only the
+merge of the last chunks adds to the time of parsing.
+"""
+
+# Import Python standard libraries
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import *
+import csv
+import io
+import logging
+import os
+
+# Import other modules
+from tasyba.common import SAMPLE_SIZE
+from tasyba.instrument import stage
+from tasyba.mapped import MappedTabular
+from tasyba.table import Column, Table
+
+# Minimum size of the files parsed in parallel, in bytes; smaller files are
+# parsed faster serially than the workers can be started
+PARALLEL_MIN = 32 * 1024 * 1024
+
+# Minimum size of the chunks parsed by each worker, in bytes
+CHUNK_MIN = 4 * 1024 * 1024
+
+# Number of chunks per worker, so that workers finish together even if the
+# rows of some chunks are slower to parse
+CHUNKS_PER_JOB = 4
+
+# Attributes of a dialect passed to the workers, as the dialects detected by
+# `csv.Sniffer` are classes that cannot be pickled, and lack some attributes
+_DIALECT_ATTRS = (
+    "delimiter",
+    "doublequote",
+    "escapechar",
+    "lineterminator",
+    "quotechar",
+    "quoting",
+    "skipinitialspace",
+    "strict",
+)
+
+
+def _parse_chunk(
+    filename: str,
+    start: int,
+    end: int,
+    encoding: str,
+    fmtparams: Dict[str, Any],
+    fieldnames: List[str],
+    fields: List[str],
+    strict: bool = False,
+) -> Optional[List[Column]]:
+    # Parse the rows of a chunk of bytes into dictionary-encoded columns; if
+    # strict, chunks not ending outside quoted values, or not well-formed,
+    # are not parsed
+    with open(filename, "rb") as handler:
+        handler.seek(start)
+        text = io.StringIO(handler.read(end - start).decode(encoding), newline="")
+
+    table = Table(fields)
+    if strict:
+        fmtparams = dict(fmtparams, strict=True)
+    try:
+        for row in csv.DictReader(text, fieldnames, **fmtparams):
+            table.append(row)
+    except csv.Error:
+        if not strict:
+            raise
+        return None
+
+    return [table.column(field) for field in fields]
+
+
+def _parse_chunks(tasks: List[tuple], jobs: int) -> Optional[List[Column]]:
+    # Parse chunks in a pool of processes, or in the current one, merging
+    # their columns in order as they are parsed; as soon as a chunk fails,
+    # the others are cancelled
+    futures = []
+    if jobs <= 1 or len(tasks) <= 1:
+        results = (_parse_chunk(*task) for task in tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(jobs, len(tasks)))
+        futures = [executor.submit(_parse_chunk, *task) for task in tasks]
+        results = (future.result() for future in futures)
+
+    try:
+        columns = next(results)
+        for chunk_columns in results:
+            if columns is None or chunk_columns is None:
+                return None
+            for column, chunk_column in zip(columns, chunk_columns):
+                column.extend(chunk_column)
+    finally:
+        # Futures are cancelled one by one, as `cancel_futures` requires
+        # Python 3.9
+        for future in futures:
+            future.cancel()
+        if executor:
+            executor.shutdown()
+
+    return columns
+
+
+def read_table_parallel(
+    filename: Union[Path, str],
+    sample_size: int = SAMPLE_SIZE,
+    exclude: Iterable[str] = (),
+    jobs: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+) -> Optional[Table]:
+    """
+    Reads a tabular file into a `Table`, parsing chunks of rows in parallel.
+
+    The fields are those of the header; as with `Table.from_rows()`, rows
+    shorter than the header are padded with `None`, and values beyond it
+    are ignored. Files that cannot be memory-mapped, such as those in
+    UTF-16, are not read.
+
+    Parameters
+    ----------
+    filename : Union[Path,str]
+        The path to the file to read.
+    sample_size : int, optional
+        The number of bytes used for detecting encoding and dialect, by
+        default `SAMPLE_SIZE`.
+    exclude : Iterable[str], optional
+        The fields not to store, by default none.
+    jobs : Optional[int]
+        The number of worker processes, by default the number of CPUs.
+    chunk_size : Optional[int]
+        The minimum size of the chunks, in bytes, by default split so that
+        each worker parses `CHUNKS_PER_JOB` chunks of at least `CHUNK_MIN`
+        bytes.
+
+    Returns
+    -------
+    Optional[Table]
+        The contents of the tabular file, without inferred types, or `None`
+        if the file cannot be mapped.
+    """
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    exclude = set(exclude)
+
+    with stage("read_table_parallel", file=str(filename), jobs=jobs) as record:
+        try:
+            mapped = MappedTabular(filename, sample_size)
+        except ValueError as exception:
+            logging.debug("Not parsing `%s` in parallel: %s", filename, exception)
+            return None
+
+        with mapped:
+            if chunk_size is None:
+                size = os.path.getsize(filename)
+                chunk_size = max(CHUNK_MIN, size // (jobs * CHUNKS_PER_JOB))
+
+            # Repeated fields are only stored once, as in row dictionaries
+            fieldnames = mapped.fields
+            fields = [
+                field for field in dict.fromkeys(fieldnames) if field not in exclude
+            ]
+            dialect = csv.reader([], mapped.dialect).dialect
+            fmtparams = {attr: getattr(dialect, attr) for attr in _DIALECT_ATTRS}
+            args = (mapped.encoding, fmtparams, fieldnames, fields)
+
+            # Split by the parity of quotes, checking the chunks, and by
+            # scanning the rows if the check fails
+            chunks = mapped.split(chunk_size)
+            columns = None
+            if chunks:
+                tasks = [(str(filename), *chunk, *args, True) for chunk in chunks]
+                columns = _parse_chunks(tasks, jobs)
+                if columns is None:
+                    logging.debug("Scanning the rows of `%s` to split them.", filename)
+                    chunks = mapped.chunks(chunk_size)
+                    tasks = [(str(filename), *chunk, *args) for chunk in chunks]
+                    columns = _parse_chunks(tasks, jobs)
+
+        # Files with no rows hold no columns, as when parsed serially
+        table = Table.from_columns(dict(zip(fields, columns or [])))
+        record.update(rows=len(table), chunks=len(chunks))
+
+    logging.debug("Parsed `%s` in %i chunks.", filename, len(chunks))
+
+    return table
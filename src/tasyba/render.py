@@ -3,22 +3,85 @@ Module with functions to render database contents to HTML.
 """
 
 # Import Python standard libraries
+from concurrent.futures import ProcessPoolExecutor
 from typing import *
 from pathlib import Path
 import datetime
+import functools
+import glob
+import hashlib
+import html
+import json
 import logging
+import math
+import re
 
 # Import 3rd-party libraries
-from jinja2 import Environment, FileSystemLoader
-
-# TODO: accept Path objects
-# TODO: have a default template directory?
-def load_template_env(template_path: str) -> Environment:
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, meta
+from markupsafe import Markup, escape
+
+# Import other modules
+from tasyba.compress import FORMATS
+from tasyba.database import build_sqlite, table_schema
+from tasyba.instrument import stage
+from tasyba.manifest import hash_inputs, stream_if_changed, write_if_changed
+from tasyba.search import build_search_index
+from tasyba.table import Table
+
+# Default directory of the persistent cache of compiled templates, relative
+# to the output directory
+BYTECODE_CACHE_DIR = Path(".tasyba-cache") / "jinja"
+
+# Extensions of the templates of static assets, the length of the content
+# hash in their names, and the file mapping them to their fingerprinted names
+ASSET_EXTENSIONS = ["css", "js"]
+ASSET_HASH_LENGTH = 8
+ASSETS_MANIFEST = "assets.json"
+
+# Number of rows of the body of a data table rendered at a time
+BODY_BATCH = 1024
+
+# Markup around the rows and the cells of the body of a data table, with the
+# same whitespace as the loops of the default template
+_ROW_START = "\n    <tr>\n        "
+_ROW_END = "\n    </tr>\n    "
+_CELL_START = "\n        \n        "
+_CELL_END = "\n        \n        "
+
+# Template environments already loaded, by template path and options
+_TEMPLATE_ENVS: Dict[Tuple[str, Optional[str], bool], Environment] = {}
+
+
+def load_template_env(
+    template_path: Union[Path, str],
+    cache_dir: Optional[Union[Path, str]] = None,
+    auto_reload: bool = False,
+) -> Environment:
     """
     Load a Jinja2 template environment.
-    """
 
-    logging.info("Loading Jinja2 template environment")
+    A single environment is shared by all calls with the same template
+    directory and options, so that each template is compiled at most once
+    per run. If `cache_dir` is given, compiled templates are also stored
+    there, so that they are not compiled again in later runs unless their
+    sources change.
+
+    Parameters
+    ----------
+    template_path : Union[Path,str]
+        The path to the directory holding the templates.
+    cache_dir : Optional[Union[Path,str]]
+        The directory of the persistent cache of compiled templates, if any.
+    auto_reload : bool, optional
+        Whether to check if templates changed on disk every time they are
+        used, which is only needed when templates are edited during a run,
+        by default False.
+
+    Returns
+    -------
+    Environment
+        The template environment.
+    """
 
     # Build template_file and layout path; note that Jinja2 documentation says
     # that template names are not filesystem paths (even though
@@ -26,65 +89,274 @@ def load_template_env(template_path: str) -> Environment:
     # even under Windows.
     template_path = Path(template_path).resolve()
     template_path = template_path.as_posix().replace("\\", "/")
+    if cache_dir is not None:
+        cache_dir = Path(cache_dir).resolve().as_posix()
+
+    key = (template_path, cache_dir, auto_reload)
+    if key in _TEMPLATE_ENVS:
+        return _TEMPLATE_ENVS[key]
+
+    logging.info("Loading Jinja2 template environment from `%s`", template_path)
 
-    print("----", template_path)
+    bytecode_cache = None
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
 
-    template_env = Environment(loader=FileSystemLoader(template_path))
+    template_env = Environment(
+        loader=FileSystemLoader(template_path),
+        bytecode_cache=bytecode_cache,
+        auto_reload=auto_reload,
+    )
+    _TEMPLATE_ENVS[key] = template_env
 
     return template_env
 
 
-def build_html(template_env, replaces, tables, output_file, template=None):
+def template_sources(template_env: Environment, name: str) -> Dict[str, str]:
+    """
+    Collect the sources of a template and of all the templates it references.
+
+    Unless the environment reloads templates that change on disk, sources
+    are only collected once per template, as templates are then fixed for
+    the whole run.
+
+    Parameters
+    ----------
+    template_env : Environment
+        The Jinja2 template environment.
+    name : str
+        The name of the template.
+
+    Returns
+    -------
+    Dict[str,str]
+        A dictionary mapping template names to their sources.
+    """
+
+    if not template_env.auto_reload:
+        return _cached_template_sources(template_env, name)
+
+    return _collect_template_sources(template_env, name)
+
+
+def _collect_template_sources(template_env: Environment, name: str) -> Dict[str, str]:
+    sources = {}
+    pending = [name]
+    while pending:
+        name = pending.pop()
+        if name in sources:
+            continue
+
+        source, _, _ = template_env.loader.get_source(template_env, name)
+        sources[name] = source
+
+        # Follow `extends`, `include`, and `import` statements; dynamic
+        # references are reported as `None` and cannot be followed
+        references = meta.find_referenced_templates(template_env.parse(source))
+        pending += [reference for reference in references if reference]
+
+    return sources
+
+
+_cached_template_sources = functools.lru_cache(maxsize=None)(_collect_template_sources)
+
+
+def build_navigation(tables) -> List[Dict[str, str]]:
+    """
+    Build the list of tables linked from every page, with names and urls.
+    """
+
+    return [
+        {
+            "name": table_name,
+            "url": "http://",  # TODO: fix
+        }
+        for table_name in tables
+    ]
+
+
+def build_html(
+    template_env,
+    replaces,
+    tables,
+    output_file,
+    template=None,
+    manifest=None,
+    inputs=None,
+    navigation=None,
+    current_time=None,
+):
     """
     Build and write an HTML file from template and replacements.
+
+    If a build manifest is provided, the page is only rendered if its inputs
+    (templates, replacements, and tables) changed since the last build.
+    Replacements that are expensive to hash, such as table data, can be
+    represented in `inputs` by a smaller value (e.g., a content hash).
+    In any case, the file is only written if its contents changed.
+
+    The list of tables linked from the page (see `build_navigation()`) and
+    the build time are computed from `tables` and the current time, unless
+    provided in `navigation` and `current_time`, which allows sharing them
+    between all the pages of a build. In incremental builds, the build time
+    is only shown in the page if the manifest makes it one of the inputs
+    (see `BuildManifest`), as otherwise the page would never be identical
+    to the one already on disk.
     """
 
     # Load proper template and apply replacements, also setting current date
     logging.info("Applying replacements to generate `%s`...", output_file)
-    if template:
-        template = template_env.get_template(template)
-    else:
+    if not template:
         if output_file == "index.html":
-            template = template_env.get_template("index.html")
+            template = "index.html"
         elif output_file == "sql.html":
-            template = template_env.get_template("sql.html")
+            template = "sql.html"
         else:
-            template = template_env.get_template("datatable.html")
+            template = "datatable.html"
+    template_name = template
+    template = template_env.get_template(template_name)
 
     # Build the object for table representation with data, names, and urls
-    output_tables = [
-        {
-            "name": table_name,
-            "url": "http://",  # TODO: fix
-        }
-        for table_name, table in tables.items()
-    ]
+    output_tables = navigation
+    if output_tables is None:
+        output_tables = build_navigation(tables)
+
+    if current_time is None:
+        current_time = datetime.datetime.now().ctime()
+
+    # Skip the page if it was already built from the same inputs; unless it
+    # is one of them, the build time is left out of the page
+    if manifest:
+        if not manifest.timestamp:
+            current_time = None
+        digest = hash_inputs(
+            {
+                "file": output_file,
+                "templates": template_sources(template_env, template_name),
+                "tables": output_tables,
+                "replaces": dict(replaces, **(inputs or {})),
+                "current_time": current_time,
+            }
+        )
+        if manifest.is_current(output_file, digest):
+            logging.info("`%s` is up to date, skipping.", output_file)
+            return
 
-    source = template.render(
+    # Render the template as a stream, writing it directly to disk, so that
+    # the page is never held in memory as a whole
+    source = template.generate(
         tables=output_tables,
         file=output_file,
-        current_time=datetime.datetime.now().ctime(),
+        current_time=current_time,
         **replaces,
     )
 
     # Write
-    with open(output_file, "w", encoding="utf-8") as handler:
-        handler.write(source)
+    with stage("build_html", file=str(output_file)) as record:
+        written, size = stream_if_changed(output_file, source)
+        record["bytes_written"] = size
+    if written:
+        logging.info("`%s` wrote with %i bytes.", output_file, size)
+    else:
+        logging.info("`%s` is unchanged (%i bytes), not written.", output_file, size)
 
-    logging.info("`%s` wrote with %i bytes.", output_file, len(source))
+    if manifest:
+        manifest.record(output_file, digest)
 
 
 # TODO: write properly etc. should load with other templates;
 # TODO: also copy images if needed
-def build_css(template_env, replaces, config):
+def build_css(template_env, replaces, config, manifest=None):
+    # Skip the file if it was already built from the same inputs
+    file_path = Path("main.css")
+    if manifest:
+        digest = hash_inputs(
+            {
+                "templates": template_sources(template_env, "main.css"),
+                "replaces": replaces,
+            }
+        )
+        if manifest.is_current(file_path, digest):
+            logging.info("`%s` is up to date, skipping.", file_path)
+            return
+
     template = template_env.get_template("main.css")
 
     source = template.render(**replaces)
 
     # build and write css file
-    file_path = Path("main.css")
-    with open(file_path.as_posix(), "w") as handler:
-        handler.write(source)
+    write_if_changed(file_path, source)
+
+    if manifest:
+        manifest.record(file_path, digest)
+
+
+def remove_output(filename: Union[Path, str], manifest=None):
+    """
+    Removes an output file of a previous build, with its compressed siblings.
+
+    The files are also removed from the build manifest, if provided.
+    """
+
+    for path in [str(filename)] + [
+        f"{filename}{suffix}" for suffix in FORMATS.values()
+    ]:
+        if Path(path).is_file():
+            logging.info("Removing stale output `%s`", path)
+            Path(path).unlink()
+        if manifest:
+            manifest.forget(path)
+
+
+def build_assets(template_env, replaces, manifest=None) -> Dict[str, str]:
+    """
+    Build the static assets of a site, with names fingerprinted by content.
+
+    Every CSS and JavaScript template (such as `main.css`) is rendered and
+    written to a file whose name includes a hash of its content (such as
+    `main.1a2b3c4d.css`), so that hosts can let browsers cache it
+    indefinitely: a changed asset gets a new name. The mapping from asset
+    names to fingerprinted names, which pages receive as `assets` for their
+    references, is also written to `ASSETS_MANIFEST`; fingerprinted files
+    listed in the previous mapping but not in the new one, along with their
+    compressed siblings, are removed.
+
+    Returns
+    -------
+    Dict[str,str]
+        The fingerprinted name of each asset.
+    """
+
+    assets = {}
+    for name in template_env.list_templates(extensions=ASSET_EXTENSIONS):
+        content = template_env.get_template(name).render(**replaces).encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+
+        path = Path(name)
+        assets[name] = path.with_name(
+            f"{path.stem}.{digest[:ASSET_HASH_LENGTH]}{path.suffix}"
+        ).as_posix()
+
+        Path(assets[name]).parent.mkdir(parents=True, exist_ok=True)
+        write_if_changed(assets[name], content)
+        if manifest:
+            manifest.record(assets[name], digest)
+
+    # Remove the assets of previous builds that are no longer used
+    try:
+        with open(ASSETS_MANIFEST, encoding="utf-8") as handler:
+            previous = json.load(handler)
+    except (OSError, ValueError):
+        previous = {}
+    for name in set(previous.values()) - set(assets.values()):
+        remove_output(name, manifest)
+
+    write_if_changed(ASSETS_MANIFEST, json.dumps(assets, indent=2, sort_keys=True))
+    if manifest:
+        manifest.record(ASSETS_MANIFEST, hash_inputs(assets))
+
+    return assets
 
 
 def build_tables(data, replaces, tables, template_env, config):
@@ -104,66 +376,561 @@ def build_tables(data, replaces, tables, template_env, config):
         build_html(template_env, table_replaces, tables, f"{table}.html", config)
 
 
-def build_html_table(table_name, tables, replaces, template_env, columns=None):
+def page_file(table_name: str, number: int) -> str:
+    """
+    Returns the name of the file of a page of a sharded table.
+
+    The first page keeps the name of the unsharded output, so that links to
+    a table do not depend on whether it is sharded.
+    """
+
+    if number == 1:
+        return f"{table_name}.html"
+
+    return f"{table_name}-{number}.html"
+
+
+def build_pagination(table_name: str, number: int, num_pages: int) -> Dict[str, Any]:
+    """
+    Build the navigation between the pages of a sharded table.
+
+    Besides the previous and next pages, only the first and last pages and
+    those close to the current one are listed, so that the navigation does
+    not grow with the number of pages.
+    """
+
+    numbers = {1, num_pages} | set(range(number - 2, number + 3))
+    numbers = sorted(idx for idx in numbers if 1 <= idx <= num_pages)
+
+    pages = [{"number": idx, "url": page_file(table_name, idx)} for idx in numbers]
+
+    return {
+        "current": number,
+        "pages": pages,
+        "previous": page_file(table_name, number - 1) if number > 1 else None,
+        "next": page_file(table_name, number + 1) if number < num_pages else None,
+    }
+
+
+def build_json_shards(
+    table_name, table_data, columns, page_size, manifest=None, table_hash=None
+) -> List[str]:
+    """
+    Write the rows of a table as a sequence of JSON files.
+
+    Each file holds an array with up to `page_size` rows, each an array of
+    HTML-escaped values, as expected by the DataTables frontend.
+
+    Returns
+    -------
+    List[str]
+        The paths to the JSON files, relative to the table page.
+    """
+
+    data_path = Path(f"{table_name}-data")
+    data_path.mkdir(exist_ok=True)
+
+    urls = []
+    num_chunks = max(1, math.ceil(len(table_data) / page_size))
+    for idx in range(num_chunks):
+        chunk_file = data_path / f"{idx + 1}.json"
+        urls.append(chunk_file.as_posix())
+
+        # Skip the chunk if it was already built from the same inputs
+        if manifest:
+            digest = hash_inputs([table_hash, columns, page_size, idx])
+            if manifest.is_current(chunk_file, digest):
+                continue
+
+        rows = [
+            [html.escape(value) if value else "" for value in values]
+            for values in table_data.iter_rows(
+                columns, idx * page_size, (idx + 1) * page_size
+            )
+        ]
+        write_if_changed(
+            chunk_file, json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+        )
+
+        if manifest:
+            manifest.record(chunk_file, digest)
+
+    logging.info("`%s` data written in %i chunks.", table_name, num_chunks)
+
+    return urls
+
+
+def remove_stale_shards(
+    table_name: str,
+    num_pages: int,
+    num_chunks: int,
+    manifest=None,
+    keep: Iterable[str] = (),
+):
+    """
+    Removes the pages and JSON chunks of a table left by previous builds.
+
+    Pages numbered above `num_pages` and chunks numbered above `num_chunks`
+    are removed (see `remove_output()`), so that a table that shrank, or
+    whose shard format changed, leaves no orphaned files reachable by url.
+    Files in `keep`, such as the pages of other tables whose names look
+    like numbered pages, are kept.
+    """
+
+    keep = set(keep)
+    pattern = re.compile(rf"{re.escape(table_name)}-(\d+)\.html")
+    for path in Path(".").glob(f"{glob.escape(table_name)}-*.html"):
+        match = pattern.fullmatch(path.name)
+        if match and int(match.group(1)) > num_pages and path.name not in keep:
+            remove_output(path, manifest)
+
+    for path in Path(f"{table_name}-data").glob("*.json"):
+        if path.stem.isdigit() and int(path.stem) > num_chunks:
+            remove_output(path, manifest)
+
+
+def _iter_cells(table_data, columns, start, stop, links, anchors):
+    # Iterate over the cells of a range of rows, with the url of each value
+    # looked up by its code, and the anchor by the index of the row
+    lookups = [
+        (
+            table_data.column(column).values,
+            (links or {}).get(column),
+            (anchors or {}).get(column),
+        )
+        for column in columns
+    ]
+    first = slice(start, stop).indices(len(table_data))[0]
+    for idx, codes in enumerate(table_data.iter_codes(columns, start, stop), first):
+        row = []
+        for (values, urls, ids), code in zip(lookups, codes):
+            cell = {"value": values[code], "url": urls[code] if urls else None}
+            if ids:
+                cell["anchor"] = ids.get(idx)
+            row.append(cell)
+        yield row
+
+
+class _CellMarkup(dict):
+    """
+    The markup of the cells of a column, by dictionary code.
+
+    The markup of each distinct value is built, and its value escaped, only
+    once, the first time it is looked up. Cells with an anchor, given by
+    row index, are built apart by `row_cell()`.
+    """
+
+    def __init__(self, values, urls=None, anchors=None):
+        super().__init__()
+        self.values = values
+        self.urls = urls
+        self.anchors = anchors
+
+    def __missing__(self, code):
+        markup = self[code] = self._markup(code)
+
+        return markup
+
+    def _markup(self, code, anchor=None):
+        value = escape(self.values[code])
+        url = self.urls[code] if self.urls else None
+
+        attrs = f' id="{escape(anchor)}"' if anchor else ""
+        if url:
+            cell = f'<td{attrs}><a href="{escape(url)}">{value}</a></td>'
+        else:
+            cell = f"<td{attrs}>{value}</td>"
+
+        return _CELL_START + cell + _CELL_END
+
+    def row_cell(self, row, code):
+        """
+        Returns the markup of the cell of a row, with its anchor, if any.
+        """
+
+        anchor = self.anchors.get(row) if self.anchors else None
+        if anchor:
+            return self._markup(code, anchor)
+
+        return self[code]
+
+
+def _iter_body(table_data, columns, start, stop, cells):
+    # Render the rows of a range as markup, in batches of `BODY_BATCH` rows,
+    # joining the markup of the cells of each column looked up by code (and
+    # by row index, in columns with anchors)
+    start, stop, _ = slice(start, stop).indices(len(table_data))
+    codes = [table_data.column(column).codes for column in columns]
+    for batch_start in range(start, stop, BODY_BATCH):
+        batch_stop = min(batch_start + BODY_BATCH, stop)
+        if codes:
+            column_cells = []
+            for column_markup, column_codes in zip(cells, codes):
+                batch_codes = column_codes[batch_start:batch_stop]
+                if column_markup.anchors:
+                    batch_rows = range(batch_start, batch_stop)
+                    column_cells.append(
+                        map(column_markup.row_cell, batch_rows, batch_codes)
+                    )
+                else:
+                    column_cells.append(map(column_markup.__getitem__, batch_codes))
+            rows = map("".join, zip(*column_cells))
+        else:
+            rows = [""] * (batch_stop - batch_start)
+        yield Markup(_ROW_START + (_ROW_END + _ROW_START).join(rows) + _ROW_END)
+
+
+def build_html_table(
+    table_name,
+    tables,
+    replaces,
+    template_env,
+    columns=None,
+    manifest=None,
+    page_size=None,
+    shard_format="html",
+    navigation=None,
+    current_time=None,
+    search=False,
+    links=None,
+    anchors=None,
+):
     """
     Build the HTML output for a single data table.
+
+    If `page_size` is provided, the table is sharded. With the "html"
+    `shard_format`, it is split in pages of at most `page_size` rows, with
+    navigation between them; with the "json" format, a single page is built
+    with no rows, which are written in chunks of `page_size` rows to JSON
+    files loaded by the page. In both cases, the cost of rendering each
+    file depends on the page size and not on the size of the table.
+
+    If `search` is set, an inverted index of the table is also written (see
+    `build_search_index()`), which the page queries from a search box, so
+    that searches cover the whole table and not only the rows loaded.
+
+    The cells of the fields in `links` link to the url of their values,
+    given by dictionary code, and those of the fields in `anchors` are
+    anchors with the identifier given for their row, if any (see
+    `resolve_links()` and `key_anchors()` in `tasyba.links`); rows loaded
+    from JSON shards hold values only.
+
+    Rows are passed to the template both as cells, in `datatable["rows"]`,
+    and as HTML-escaped markup rendered in batches, in `datatable["body"]`,
+    which the default template writes as it is. The markup of each distinct
+    value of a column is built once per table, and rows are joined from it
+    by dictionary code, so that the cost does not grow with the size of the
+    template loops.
+
+    If a build manifest is provided, pages are only rendered if the table
+    or any other input changed since the last build. The `navigation` and
+    `current_time` of all pages can be provided, as in `build_html()`.
     """
 
-    # Extract the data table we are rendering
+    # Extract the data table we are rendering, making sure it is stored in
+    # columnar form
     table_data = tables[table_name]
+    if not isinstance(table_data, Table):
+        table_data = Table.from_rows(table_data)
 
-    # If `columns` is not provided, use all the columns in the first row in the
+    # If `columns` is not provided, use all the columns in the table in the
     # order they appear.
     if not columns:
-        columns = list(table_data[0].keys())
+        columns = table_data.fields
+
+    # Identify the contents of the table, for incremental builds
+    table_hash = table_data.content_hash() if manifest else None
+
+    # Compute the range of rows in each page, and write the row data
+    # separately if requested
+    chunks = None
+    if not page_size:
+        ranges = [(None, None)]
+    elif shard_format == "json":
+        chunks = build_json_shards(
+            table_name, table_data, columns, page_size, manifest, table_hash
+        )
+        ranges = [(0, 0)]
+    elif shard_format == "html":
+        num_pages = max(1, math.ceil(len(table_data) / page_size))
+        ranges = [(idx * page_size, (idx + 1) * page_size) for idx in range(num_pages)]
+    else:
+        raise ValueError(f"Unknown shard format: {shard_format}")
+
+    # Write the search index, if requested
+    search_data = None
+    if search:
+        search_data = {
+            "url": build_search_index(
+                table_name, table_data, columns, manifest, table_hash
+            ),
+            "table": table_name,
+            "page_size": page_size,
+        }
 
-    # Collect table data as rows and columns, as expected by the template.
-    # Note that this code already has a placeholder for links, but the value is
-    # always None, so no links are generated at the moment.
-    rows = []
-    for row in table_data:
-        subrow = [{"value": row[column], "url": None} for column in columns]
-        rows.append(subrow)
+    # Share the navigation and build time between all pages
+    if navigation is None:
+        navigation = build_navigation(tables)
+    if current_time is None:
+        current_time = datetime.datetime.now().ctime()
+
+    # Remove the pages and chunks of previous builds beyond the new ones
+    remove_stale_shards(
+        table_name,
+        len(ranges) if shard_format == "html" else 1,
+        len(chunks) if chunks else 0,
+        manifest,
+        keep=[f"{item['name']}.html" for item in navigation],
+    )
 
-    table_data = {"columns": [{"name": column} for column in columns], "rows": rows}
+    # The markup of the cells, shared by all pages
+    cells = [
+        _CellMarkup(
+            table_data.column(column).values,
+            (links or {}).get(column),
+            (anchors or {}).get(column),
+        )
+        for column in columns
+    ]
 
-    # Build a new replacement dictionary for the current table, setting additional
-    # values and making sure that the original dictionary is not modified.
-    table_replaces = replaces.copy()
-    table_replaces["datatable"] = table_data
-    build_html(
-        template_env,
-        table_replaces,
-        tables,
-        f"{table_name}.html",
-        template="datatable.html",
+    for idx, (start, stop) in enumerate(ranges):
+        # Collect table data as rows and columns, as expected by the template;
+        # rows are generated while the page is rendered, so that they are
+        # never all held in memory (nor built at all, if the page is skipped).
+        # Links and anchors are looked up by the dictionary codes of values.
+        if links or anchors:
+            rows = _iter_cells(table_data, columns, start, stop, links, anchors)
+        else:
+            rows = (
+                [{"value": value, "url": None} for value in values]
+                for values in table_data.iter_rows(columns, start, stop)
+            )
+
+        page_data = {
+            "columns": [{"name": column} for column in columns],
+            "rows": rows,
+            "body": _iter_body(table_data, columns, start, stop, cells),
+            "chunks": chunks,
+            "pagination": None,
+            "search": search_data,
+        }
+        if len(ranges) > 1:
+            page_data["pagination"] = build_pagination(table_name, idx + 1, len(ranges))
+
+        # Build a new replacement dictionary for the current table, setting additional
+        # values and making sure that the original dictionary is not modified.
+        table_replaces = replaces.copy()
+        table_replaces["datatable"] = page_data
+        build_html(
+            template_env,
+            table_replaces,
+            tables,
+            page_file(table_name, idx + 1),
+            template="datatable.html",
+            manifest=manifest,
+            inputs={
+                "datatable": {
+                    "table": table_hash,
+                    "columns": columns,
+                    "rows": [start, stop],
+                    "chunks": chunks,
+                    "pagination": page_data["pagination"],
+                    "search": search_data,
+                    "links": (
+                        hash_inputs([links, anchors]) if links or anchors else None
+                    ),
+                }
+            },
+            navigation=navigation,
+            current_time=current_time,
+        )
+
+
+def _build_html_table_task(
+    table_name,
+    table,
+    replaces,
+    config,
+    navigation,
+    current_time,
+    manifest,
+    options,
+    auto_reload=False,
+):
+    # Build the output of a table, possibly in a worker process, returning
+    # the entries recorded in the build manifest, if any
+    entries = dict(manifest.entries) if manifest else {}
+    build_html_table(
+        table_name,
+        {table_name: table},
+        replaces,
+        load_template(config, auto_reload=auto_reload),
+        manifest=manifest,
+        navigation=navigation,
+        current_time=current_time,
+        **options,
     )
 
+    if not manifest:
+        return {}
+
+    # Entries of removed files are returned as `None`
+    changes = {
+        output_file: digest
+        for output_file, digest in manifest.entries.items()
+        if entries.get(output_file) != digest
+    }
+    changes.update(
+        (output_file, None) for output_file in entries.keys() - manifest.entries.keys()
+    )
 
-def build_sql_page(data, replaces, template_env, config):
-    # Compute inline data replacements
-    inline_data = {}
-    for table_name in data:
-        inline_data[table_name] = []
-        for row in data[table_name]["rows"]:
-            row_insert = ", ".join(
-                ["'%s'" % cell["value"] if cell["value"] else "NULL" for cell in row]
-            )
-            inline_data[table_name].append(row_insert)
-
-    # Build table schemata
-    # TODO: use datatypes
-    schemata = {}
-    for table_name in data:
-        schemata[table_name] = ", ".join(
-            ["%s text" % col["name"].lower() for col in data[table_name]["columns"]]
+    return changes
+
+
+def build_html_tables(
+    deploys: List[Tuple[str, Dict[str, Any], Dict[str, Any], Dict[str, Any]]],
+    tables: Dict[str, Table],
+    manifest=None,
+    navigation=None,
+    current_time=None,
+    jobs: int = 1,
+    auto_reload: bool = False,
+):
+    """
+    Build the HTML output for several data tables, in parallel.
+
+    Tables are rendered by a pool of `jobs` processes, each loading its own
+    template environment (sharing the compiled templates through the
+    bytecode cache, see `load_template()`). Tables are sent to the workers
+    in their compact, column-oriented form, while the navigation and the
+    build time are computed only once, so that the output is identical to
+    the one of a serial build.
+
+    Parameters
+    ----------
+    deploys : List[Tuple[str,Dict[str,Any],Dict[str,Any],Dict[str,Any]]]
+        The tables to render, each as a tuple of table name, replacements,
+        template configuration (as for `load_template()`), and additional
+        arguments for `build_html_table()`, such as `page_size`. Each table
+        must be listed only once, as its files would be written concurrently.
+    tables : Dict[str,Table]
+        All the tables of the site, by name.
+    manifest : Optional[BuildManifest]
+        The build manifest, if any, which is updated with the pages built.
+    navigation : Optional[List[Dict[str,str]]]
+        The list of tables linked from every page, by default built from
+        `tables` (see `build_navigation()`).
+    current_time : Optional[str]
+        The build time shown in every page, by default the current time.
+    jobs : int, optional
+        The maximum number of worker processes; with a single job, tables
+        are rendered in the current process, by default 1.
+    auto_reload : bool, optional
+        Whether templates changed on disk since they were loaded are
+        reloaded (see `load_template_env()`), by default False.
+    """
+
+    if navigation is None:
+        navigation = build_navigation(tables)
+    if current_time is None:
+        current_time = datetime.datetime.now().ctime()
+
+    tasks = [
+        (
+            table_name,
+            tables[table_name],
+            replaces,
+            config,
+            navigation,
+            current_time,
+            manifest,
+            options,
+            auto_reload,
+        )
+        for table_name, replaces, config, options in deploys
+    ]
+
+    if jobs <= 1 or len(tasks) <= 1:
+        results = [_build_html_table_task(*task) for task in tasks]
+    else:
+        # Submit the largest tables first, so that workers finish together
+        order = sorted(range(len(tasks)), key=lambda idx: -len(tasks[idx][1]))
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+            futures = {
+                idx: executor.submit(_build_html_table_task, *tasks[idx])
+                for idx in order
+            }
+            results = [futures[idx].result() for idx in range(len(tasks))]
+
+    if manifest:
+        for entries in results:
+            for output_file, digest in entries.items():
+                if digest is None:
+                    manifest.forget(output_file)
+                else:
+                    manifest.record(output_file, digest)
+
+
+def build_sql_page(
+    tables,
+    replaces,
+    template_env,
+    schemata=None,
+    manifest=None,
+    database="database.sqlite",
+    current_time=None,
+):
+    """
+    Build the SQL query page, along with the SQLite database it loads.
+
+    The tables are written to an indexed SQLite database (see
+    `build_sqlite()`), with column types taken from their frictionless
+    schemata if provided; the page loads the database file as a binary
+    blob, instead of building it from inline statements.
+    """
+
+    if schemata is None:
+        schemata = {}
+
+    # Build the database, unless it was already built from the same inputs
+    digest = None
+    if manifest:
+        digest = hash_inputs(
+            {
+                "tables": {
+                    name: table.content_hash() for name, table in tables.items()
+                },
+                "schemata": schemata,
+            }
+        )
+    if not (manifest and manifest.is_current(database, digest)):
+        with stage("build_sqlite", file=str(database)) as record:
+            build_sqlite(tables, database, schemata)
+            record["rows"] = sum(len(table) for table in tables.values())
+            record["bytes_written"] = Path(database).stat().st_size
+        if manifest:
+            manifest.record(database, digest)
+
+    # Build table schemata, for display
+    sql_schemata = {}
+    for table_name, table in tables.items():
+        sql_schemata[table_name] = ", ".join(
+            "%s %s" % column for column in table_schema(table, schemata.get(table_name))
         )
 
     # Generate page
     sql_replaces = replaces.copy()
-    sql_replaces["data"] = inline_data
-    sql_replaces["schemata"] = schemata
-    build_html(template_env, sql_replaces, "sql.html", config)
+    sql_replaces["database"] = Path(database).as_posix()
+    sql_replaces["schemata"] = sql_schemata
+    build_html(
+        template_env,
+        sql_replaces,
+        tables,
+        "sql.html",
+        manifest=manifest,
+        inputs={"database": digest},
+        current_time=current_time,
+    )
 
 
 def render_database(data, replaces, tables, config):
@@ -184,11 +951,35 @@ def render_database(data, replaces, tables, config):
     # build_sql_page(data, replaces, template_env, config)
 
 
-def load_template(config):
-    # Load Jinja2 template environment as specified in config
+def template_dir(config) -> Path:
+    """
+    Returns the directory of the templates specified in a configuration.
+
+    The templates are taken from the `template_path` of the configuration,
+    if any, or from the default templates otherwise.
+    """
+
     template_path = config.get("template_path")
     if not template_path:
-        template_path = Path(__file__).parent.parent.parent / "templates" / "default"
-    template_env = load_template_env(template_path)
+        return Path(__file__).parent.parent.parent / "templates" / "default"
+
+    return Path(template_path)
+
+
+def load_template(config, cache_dir=BYTECODE_CACHE_DIR, auto_reload=False):
+    """
+    Load the Jinja2 template environment specified in a configuration.
+
+    The templates are taken from the directory given by `template_dir()`.
+    Compiled templates are cached in `cache_dir` (by default
+    `BYTECODE_CACHE_DIR`, relative to the output directory), unless it is
+    `None`. If `auto_reload` is set, templates edited on disk are reloaded
+    (see `load_template_env()`).
+    """
+
+    # Load Jinja2 template environment as specified in config
+    template_env = load_template_env(
+        template_dir(config), cache_dir=cache_dir, auto_reload=auto_reload
+    )
 
     return template_env
@@ -0,0 +1,251 @@
+"""
+Module for scheduling the steps of a script concurrently.
+
+Steps are related by the names they read and write, either files (such
+as sources and written descriptions) or tables. Steps with no dependency
+between them can be run concurrently, while the effects of all steps are
+still applied in script order, so that results match sequential execution.
+"""
+
+# Import Python standard libraries
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+from pathlib import Path
+from typing import *
+import contextlib
+import logging
+
+# A task computes the result of a step out of its process: the function to
+# call, its arguments, and the kind of executor to use, either "process"
+# (for CPU-bound work) or "thread" (for I/O-bound work)
+Task = Tuple[Callable, Tuple, str]
+
+# Name read and written by steps that cannot be analyzed, which makes them
+# depend on every other step
+BARRIER = "*"
+
+# Names whose writes can be applied in any order, such as adding
+# different tables to the set of tables
+COMMUTATIVE = {"tables"}
+
+
+def _file(path: Union[Path, str], basepath: Optional[Path] = None) -> str:
+    if basepath is not None:
+        path = basepath / path
+    return f"file:{Path(path).resolve()}"
+
+
+def step_names(
+    command: str, args: Dict[str, Any], basepath: Optional[Union[Path, str]] = None
+) -> Tuple[Set[str], Set[str]]:
+    """
+    Returns the names read and written by a step.
+
+    Names are strings in the form `file:<path>` for files and
+    `table:<name>` for tables; the set of existing tables is itself
+    represented by the `tables` name.
+
+    Parameters
+    ----------
+    command : str
+        The command of the step.
+    args : Dict[str,Any]
+        The arguments of the step.
+    basepath : Optional[Union[Path,str]]
+        The base path for the sources of `add_resource` steps, if any.
+
+    Returns
+    -------
+    Tuple[Set[str],Set[str]]
+        The names read and the names written by the step.
+    """
+
+    if basepath is not None:
+        basepath = Path(basepath)
+
+    if command == "describe_resource":
+        reads = {_file(args["source"])}
+        writes = {_file(args["write"])} if "write" in args else set()
+    elif command == "add_resource":
+        name = args.get("name", Path(args["source"]).stem)
+        reads = {_file(args["source"], basepath)}
+        writes = {f"table:{name}", "tables"}
+    elif command == "remove_resource":
+        reads = set()
+        writes = {f"table:{args['name']}", "tables"}
+    elif command == "field_remove":
+        reads = writes = {f"table:{args['table']}"}
+    elif command in ("table_transpose", "table_pivot", "transform_resource"):
+        reads = writes = {f"table:{args['name']}"}
+    elif command == "table_print":
+        reads, writes = {f"table:{args['name']}"}, set()
+    elif command == "table_write":
+        reads, writes = {f"table:{args['table']}"}, {_file(args["path"])}
+    elif command == "table_deploy":
+        # Deployed pages list all the tables for navigation, and link to the
+        # rows of the tables referenced by their foreign keys
+        reads = {f"table:{args['table']}", "tables"}
+        if args.get("links"):
+            from tasyba.links import parse_links
+
+            if isinstance(args["links"], str):
+                reads.add(_file(args["links"]))
+            links = parse_links(args["links"], args["table"])
+            reads |= {f"table:{target}" for target, _ in links.values()}
+        writes = {_file(f"{args['table']}.html")}
+    elif command == "sql_deploy":
+        if "tables" in args:
+            reads = {f"table:{name}" for name in args["tables"]} | {"tables"}
+        else:
+            reads = {BARRIER}
+        writes = {_file("sql.html"), _file(args.get("database", "database.sqlite"))}
+    else:
+        reads = writes = {BARRIER}
+
+    return reads, writes
+
+
+def dependencies(
+    steps: List[Tuple[str, Dict[str, Any]]],
+    basepath: Optional[Union[Path, str]] = None,
+) -> List[Set[int]]:
+    """
+    Computes the dependencies between the steps of a script.
+
+    A step depends on an earlier one if it reads or writes a name written
+    by it, or if it writes a name read by it. Writes to names in
+    `COMMUTATIVE` do not conflict with each other.
+
+    Parameters
+    ----------
+    steps : List[Tuple[str,Dict[str,Any]]]
+        The steps of the script, as `(command, args)` tuples.
+    basepath : Optional[Union[Path,str]]
+        The base path for the sources of `add_resource` steps, if any.
+
+    Returns
+    -------
+    List[Set[int]]
+        For each step, the indexes of the earlier steps it depends on.
+    """
+
+    names = [step_names(command, args, basepath) for command, args in steps]
+
+    deps = []
+    for idx, (reads, writes) in enumerate(names):
+        step_deps = set()
+        for prev_idx, (prev_reads, prev_writes) in enumerate(names[:idx]):
+            if (
+                BARRIER in reads
+                or BARRIER in prev_reads
+                or prev_writes & reads
+                or (prev_writes & writes) - COMMUTATIVE
+                or prev_reads & writes
+            ):
+                step_deps.add(prev_idx)
+        deps.append(step_deps)
+
+    return deps
+
+
+def dependents(deps: List[Set[int]], indexes: Iterable[int]) -> Set[int]:
+    """
+    Collects the steps affected by a set of steps, including themselves.
+
+    Parameters
+    ----------
+    deps : List[Set[int]]
+        The dependencies between steps, as returned by `dependencies()`.
+    indexes : Iterable[int]
+        The indexes of the steps whose results changed.
+
+    Returns
+    -------
+    Set[int]
+        The indexes of the given steps and of all the steps depending on
+        them, directly or not.
+    """
+
+    affected = set(indexes)
+
+    # As dependencies always point backwards, a single pass in order is enough
+    for idx, step_deps in enumerate(deps):
+        if step_deps & affected:
+            affected.add(idx)
+
+    return affected
+
+
+def prefetch(
+    tasks: Dict[int, Task], deps: List[Set[int]], jobs: int = 1
+) -> Dict[int, Future]:
+    """
+    Runs the tasks of a script concurrently, respecting their dependencies.
+
+    Only tasks that depend exclusively on other tasks can be run ahead of
+    the script; the remaining ones, as well as the tasks depending on
+    a failed one, are left to be run in order by the caller. With a single
+    job no task is run ahead at all.
+
+    Parameters
+    ----------
+    tasks : Dict[int,Task]
+        The tasks to run, indexed by the step they compute.
+    deps : List[Set[int]]
+        The dependencies between steps, as returned by `dependencies()`.
+    jobs : int, optional
+        The maximum number of workers of each kind, by default 1.
+
+    Returns
+    -------
+    Dict[int,Future]
+        The completed futures of the tasks that were run, indexed by step.
+    """
+
+    if jobs <= 1:
+        return {}
+
+    # Collect the tasks that can be run ahead; as dependencies always point
+    # backwards, a single pass in order is enough
+    pending = {}
+    for idx in sorted(tasks):
+        if all(dep in pending for dep in deps[idx]):
+            pending[idx] = tasks[idx]
+
+    futures = {}
+    done = set()
+    running = {}
+    with contextlib.ExitStack() as stack:
+        executors: Dict[str, Executor] = {}
+
+        def submit(idx):
+            func, args, kind = pending.pop(idx)
+            if kind not in executors:
+                pool = ProcessPoolExecutor if kind == "process" else ThreadPoolExecutor
+                executors[kind] = stack.enter_context(pool(max_workers=jobs))
+            running[executors[kind].submit(func, *args)] = idx
+
+        while pending or running:
+            for idx in [idx for idx in pending if deps[idx] <= done]:
+                submit(idx)
+
+            if not running:
+                # All remaining tasks depend on a failed one
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                idx = running.pop(future)
+                futures[idx] = future
+                if future.exception() is None:
+                    done.add(idx)
+                else:
+                    logging.debug("Task for step %i failed", idx)
+
+    return futures
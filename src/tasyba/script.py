@@ -5,38 +5,190 @@ Module with functions for running the script-like commands.
 # Import Python standard libraries
 from typing import *
 from pathlib import Path
+import atexit
+import functools
+import shutil
+import tempfile
 
-# Import 3rd-party libraries
-from frictionless import Package, Resource, transform, steps
+# Import 3rd-party libraries; as frictionless is slow to import, it is only
+# loaded by the functions that need it
 import yaml
 
 # Import other modules
-from tasyba.fl import describe_resource
+from tasyba.aggregate import AGGREGATES, pivot_table
+from tasyba.columnar import is_columnar, read_columnar
+from tasyba.inference import infer_types
+from tasyba.instrument import stage
+from tasyba.scheduler import dependencies, prefetch
+from tasyba.table import Table
+from tasyba.transpose import BLOCK_SIZE, transpose_rows
 
+if TYPE_CHECKING:
+    from frictionless import Package, Step
 
-def run_makefile(config: Dict[str, Any], basepath: Union[Path, str]) -> Package:
+# Commands that transform the rows of a single resource; instead of being
+# run immediately, they are collected and fused into a single transformation
+# of the resource, performed only when its data is needed
+TABLE_COMMANDS = ("table_transpose", "table_pivot")
+
+
+def _table_step(command: str, args: Dict[str, Any]) -> "Step":
     """
-    Runs a database configuration script.
+    Builds the frictionless step corresponding to a table command.
+    """
+
+    if command == "table_transpose":
+        # Transpose out of core, through temporary files, instead of holding
+        # all the values in memory
+        return _native_steps()["table_transpose"](
+            block_size=args.get("block_size", BLOCK_SIZE)
+        )
+    elif command == "table_pivot":
+        # Pivot with the native engine, using the aggregation function of the
+        # script, instead of the row-by-row `pivot` of petl
+        index, columns, values = args["columns"]
+        aggfun = args.get("aggfun", "sum")
+        if aggfun not in AGGREGATES:
+            raise ValueError(f"Unknown aggregation function: {aggfun}")
+        return _native_steps()["table_pivot"](
+            index=index, columns=columns, values=values, aggfun=aggfun
+        )
+
+    raise ValueError(f"Unknown table command: {command}")
+
+
+def _string_rows(resource) -> Iterator[List[str]]:
+    # Iterate over the header and rows of a resource, as strings
+    for row in resource.to_petl():
+        yield ["" if value is None else str(value) for value in row]
+
+
+def _cast_row(fields: Dict[str, Any], row: Sequence[str]) -> List[Any]:
+    # Cast the values of a transposed row, whose first value names the field
+    # they were read from, back to the type of that field, keeping those that
+    # cannot be cast as strings
+    row = list(row)
+    field = fields.get(row[0])
+    if field is None:
+        return row
+
+    values = row[:1]
+    for value in row[1:]:
+        cast, notes = field.read_cell(value)
+        values.append(value if notes else cast)
+
+    return values
+
+
+@functools.lru_cache(maxsize=None)
+def _scratch_dir() -> Path:
+    # Create a directory for the intermediate files of the run, removed when
+    # the interpreter exits
+    path = Path(tempfile.mkdtemp(prefix="tasyba-"))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def _native_steps() -> Dict[str, Type["Step"]]:
+    # Build the classes of the frictionless steps run with the native
+    # engines, only when needed, as frictionless is slow to import
+
+    from frictionless import Step
+
+    class table_pivot(Step):
+        """Pivot table, with the native engine (see `pivot_table()`)"""
+
+        code = "table-pivot"
+
+        def __init__(self, descriptor=None, **options):
+            self.setinitial("options", options)
+            super().__init__(descriptor)
+
+        def transform_resource(self, resource):
+            rows = _string_rows(resource)
+            header = next(rows, [])
+            table = Table.from_rows(dict(zip(header, row)) for row in rows)
+            infer_types(table)
+
+            pivoted = pivot_table(table, **self.get("options"))
+            resource.pop("schema", None)
+            resource.data = [pivoted.fields] + [
+                list(row) for row in pivoted.iter_rows()
+            ]
+            resource.infer()
+
+        metadata_profile = {"type": "object", "required": [], "properties": {}}
+
+    class table_transpose(Step):
+        """Transpose table, out of core (see `transpose_rows()`)"""
+
+        code = "table-transpose"
+
+        def __init__(self, descriptor=None, **options):
+            self.setinitial("options", options)
+            super().__init__(descriptor)
+
+        def transform_resource(self, resource):
+            import petl
+
+            # The transposed rows are read lazily from their file, with their
+            # values cast back to the types of the fields they come from, so
+            # that types are inferred as when transposing the typed values
+            with tempfile.NamedTemporaryFile(
+                suffix=".csv", dir=_scratch_dir(), delete=False
+            ) as output:
+                transpose_rows(_string_rows(resource), output, **self.get("options"))
+            fields = {field.name: field for field in resource.schema.fields}
+            rows = petl.fromcsv(output.name, encoding="utf-8")
+            resource.pop("schema", None)
+            resource.data = petl.rowmap(
+                rows,
+                functools.partial(_cast_row, fields),
+                header=petl.header(rows),
+                failonerror=True,
+            )
+            resource.infer()
+
+        metadata_profile = {"type": "object", "required": [], "properties": {}}
+
+    return {"table_pivot": table_pivot, "table_transpose": table_transpose}
+
+
+def compile_makefile(config: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Compiles a database configuration script into a lazy execution plan.
+
+    Table commands (see `TABLE_COMMANDS`) are not run where they appear,
+    but collected per resource and fused into a single `transform_resource`
+    operation, emitted only before a command that needs the data of the
+    resource (such as `table_print`) or at the end of the script.
+    Resources that are removed before their data is ever needed are
+    neither added nor transformed.
 
     Parameters
     ----------
     config : Dict[str,Any]
         The contents of the configuration file as a dictionary.
-    basepath : Union[Path,str]
-        The base path to use for relative paths in the configuration file.
 
     Returns
     -------
-    Package
-        The package containing the resources created by the script.
+    List[Tuple[str,Dict[str,Any]]]
+        The plan, as a list of `(command, args)` operations.
     """
 
-    # Have `basepath` as a Path object, to properly iterate with other resourcess
-    if isinstance(basepath, str):
-        basepath = Path(basepath)
+    plan = []
+    pending = {}  # resource name -> table commands not yet applied
+    unused = {}  # resource name -> plan index of its `add_resource`
 
-    # Instantiate a frictionless package to hold the resources
-    package = Package(resources=[], basepath=str(basepath))
+    def flush(name):
+        # Emit the pending table commands of a resource, if any
+        if name in pending:
+            plan.append(
+                ("transform_resource", {"name": name, "steps": pending.pop(name)})
+            )
+        unused.pop(name, None)
 
     for entry in config["steps"]:
         # Obtain a tuple representation of the entry, from where we draw the command and
@@ -45,84 +197,140 @@ def run_makefile(config: Dict[str, Any], basepath: Union[Path, str]) -> Package:
         command, args = tuple(entry.items())[0]
 
         if command == "describe_resource":
-            # Describe a resource
-            resource = describe_resource(args["source"])
-
-            # Store the resource if requested
-            # TODO: check if the name is already taken, have a flag to overwrite
-            if "write" in args:
-                resource.to_yaml(args["write"])
+            plan.append((command, args))
         elif command == "add_resource":
-            # Add a resource to the package; if we point to a YAML file,
-            # we assume it is a frictionless resource description; otherwise,
-            # we assume it is a path to a raw data file (tabular, Excel,
-            # JSON, etc.), which must be loaded via a frictionless resource
-            # description.
-            # TODO: derive name if missing, or leave to frictionless?
-            if Path(args["source"]).suffix == ".yaml":
-                package = transform(
-                    package,
-                    steps=[
-                        steps.resource_add(Resource(str(basepath / args["source"])))
-                    ],
-                )
-            else:
-                package = transform(
-                    package,
-                    steps=[steps.resource_add(name=args["name"], path=args["source"])],
-                )
+            unused[args.get("name", Path(args["source"]).stem)] = len(plan)
+            plan.append((command, args))
         elif command == "remove_resource":
-            # Remove a resource from the package
-            package = transform(
-                package, steps=[steps.resource_remove(name=args["name"])]
-            )
+            # Drop pending work, as well as the resource itself if it was
+            # never used
+            pending.pop(args["name"], None)
+            if args["name"] in unused:
+                plan[unused.pop(args["name"])] = None
+            else:
+                plan.append((command, args))
+        elif command in TABLE_COMMANDS:
+            pending.setdefault(args["name"], []).append((command, args))
         elif command == "table_print":  # TODO: rename to resource print?
-            resource = package.get_resource(args["name"])
-            transform(resource, steps=[steps.table_print()])
-        elif command == "table_transpose":
-            # Transpose a table: obtain the transposed table and replace the original,
-            # by deleting the original and adding the transposed one
-            resource = package.get_resource(args["name"])
-            transposed = transform(
-                resource, steps=[steps.table_normalize(), steps.table_transpose()]
-            )
-
-            package = transform(
-                package,
-                steps=[
-                    steps.resource_remove(name=args["name"]),
-                    steps.resource_add(transposed),
-                ],
-            )
-        elif command == "table_pivot":
-            # Get all columns in the pivoted table, building the
-            # arguments for the `table_pivot` step
-            columns = {
-                f"f{idx+1}": column for idx, column in enumerate(args["columns"])
-            }
-
-            resource = package.get_resource(args["name"])
-            pivoted = transform(
-                resource,
-                steps=[
-                    steps.table_normalize(),
-                    steps.table_pivot(aggfun=sum, **columns),
-                ],
-            )
-
-            # TODO: move to a single "replace"
-            package = transform(
-                package,
-                steps=[
-                    steps.resource_remove(name=args["name"]),
-                    steps.resource_add(pivoted),
-                ],
-            )
-
+            flush(args["name"])
+            plan.append((command, args))
         else:
             # Fallback
             raise ValueError(f"Unknown command: {command}")
 
+    # Apply all transformations still pending at the end of the script
+    for name in list(pending):
+        flush(name)
+
+    return [operation for operation in plan if operation]
+
+
+def run_makefile(
+    config: Dict[str, Any], basepath: Union[Path, str], jobs: int = 1
+) -> "Package":
+    """
+    Runs a database configuration script.
+
+    The script is first compiled into a lazy plan (see `compile_makefile()`),
+    so that the table commands on each resource are fused into a single
+    transformation. Resources are described concurrently when `jobs` is
+    greater than one and no other step depends on them.
+
+    Parameters
+    ----------
+    config : Dict[str,Any]
+        The contents of the configuration file as a dictionary.
+    basepath : Union[Path,str]
+        The base path to use for relative paths in the configuration file.
+    jobs : int, optional
+        The maximum number of steps run concurrently, by default 1.
+
+    Returns
+    -------
+    Package
+        The package containing the resources created by the script.
+    """
+
+    from frictionless import Package, Resource, transform, steps
+    from tasyba.fl import describe_resource_descriptor, resource_detector
+
+    # Have `basepath` as a Path object, to properly iterate with other resourcess
+    if isinstance(basepath, str):
+        basepath = Path(basepath)
+
+    # Instantiate a frictionless package to hold the resources; as the
+    # package is owned by this function, it is modified in place instead of
+    # being copied by frictionless at every step
+    package = Package(resources=[], basepath=str(basepath))
+
+    # Resources whose data has already been normalized, so that it is not
+    # normalized again by later transformations
+    normalized = set()
+
+    # Describe resources ahead of time, concurrently, where possible
+    plan = compile_makefile(config)
+    tasks = {
+        idx: (
+            describe_resource_descriptor,
+            (args["source"], args.get("write")),
+            "process",
+        )
+        for idx, (command, args) in enumerate(plan)
+        if command == "describe_resource"
+    }
+    futures = prefetch(tasks, dependencies(plan, basepath), jobs)
+
+    for idx, (command, args) in enumerate(plan):
+        with stage(command, step=idx):
+            if command == "describe_resource":
+                # Describe a resource, storing it if requested
+                if idx in futures:
+                    futures[idx].result()
+                else:
+                    describe_resource_descriptor(args["source"], args.get("write"))
+            elif command == "add_resource":
+                # Add a resource to the package; if we point to a YAML file,
+                # we assume it is a frictionless resource description; otherwise,
+                # we assume it is a path to a raw data file (tabular, Excel,
+                # JSON, etc.), which must be loaded via a frictionless resource
+                # description. No data is read at this point.
+                # TODO: derive name if missing, or leave to frictionless?
+                options = {}
+                if Path(args["source"]).suffix == ".yaml":
+                    descriptor = Resource(str(basepath / args["source"])).to_dict()
+                elif is_columnar(args["source"]):
+                    # Columnar formats are read directly, as inline data
+                    table = read_columnar(basepath / args["source"])
+                    descriptor = {
+                        "name": args["name"],
+                        "data": [table.fields] + list(map(list, table.iter_rows())),
+                    }
+                else:
+                    # Raw files are read with the encoding detected by tasyba
+                    descriptor = {"name": args["name"], "path": args["source"]}
+                    options["detector"] = resource_detector()
+                package.add_resource(
+                    Resource(descriptor, basepath=package.basepath, **options)
+                )
+            elif command == "remove_resource":
+                # Remove a resource from the package
+                package.remove_resource(args["name"])
+                normalized.discard(args["name"])
+            elif command == "table_print":
+                resource = package.get_resource(args["name"])
+                transform(resource, steps=[steps.table_print()])
+            elif command == "transform_resource":
+                # Apply all the fused table commands in a single transformation,
+                # normalizing the data only once, and replace the resource in place
+                fused = [_table_step(*table_command) for table_command in args["steps"]]
+                if args["name"] not in normalized:
+                    fused.insert(0, steps.table_normalize())
+                    normalized.add(args["name"])
+
+                resource = package.get_resource(args["name"])
+                index = package.resources.index(resource)
+                package.resources[index] = transform(resource, steps=fused)
+
     return package
 
 
@@ -0,0 +1,186 @@
+"""
+Module for building client-side search indexes of tables.
+
+An index maps each token found in a table to the (zero-based) indexes of
+the rows holding it. It is written as a set of static JSON files, one per
+token prefix, so that a page only fetches the shards of the tokens being
+searched, no matter the size of the table.
+"""
+
+# Import Python standard libraries
+from array import array
+from pathlib import Path
+from typing import *
+import json
+import logging
+import re
+
+# Import other modules
+from tasyba.manifest import hash_inputs, write_if_changed
+from tasyba.table import Table
+
+# Pattern of the tokens of a value, which are indexed in lowercase
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Number of leading characters of a token determining its shard
+PREFIX_LENGTH = 2
+
+# Name of the file describing an index, stored along with its shards
+INDEX_FILE = "index.json"
+
+
+def tokenize(value: Optional[str]) -> Set[str]:
+    """
+    Returns the distinct lowercase tokens of a value.
+    """
+
+    if not value:
+        return set()
+
+    return set(TOKEN_PATTERN.findall(value.lower()))
+
+
+def shard_name(token: str) -> str:
+    """
+    Returns the name of the shard of a token.
+
+    Names are the hexadecimal UTF-8 encoding of the prefix of the token, so
+    that they are safe as file names and in URLs.
+    """
+
+    return token[:PREFIX_LENGTH].encode("utf-8").hex()
+
+
+def build_postings(table: Table, columns: List[str]) -> Dict[str, array]:
+    """
+    Computes the rows holding each token of a table.
+
+    As columns are dictionary-encoded, each distinct value is tokenized
+    only once, and the rows of a token are collected from the rows of the
+    values holding it.
+
+    Parameters
+    ----------
+    table : Table
+        The table to index.
+    columns : List[str]
+        The fields to index.
+
+    Returns
+    -------
+    Dict[str,array]
+        The sorted indexes of the rows holding each token.
+    """
+
+    postings: Dict[str, List[array]] = {}
+    for field in columns:
+        column = table.column(field)
+
+        rows_by_code = [array("I") for _ in column.values]
+        for row, code in enumerate(column.codes):
+            rows_by_code[code].append(row)
+
+        for code, value in enumerate(column.values):
+            for token in tokenize(value):
+                postings.setdefault(token, []).append(rows_by_code[code])
+
+    # Merge the rows of tokens found in more than one value
+    return {
+        token: rows[0] if len(rows) == 1 else array("I", sorted(set().union(*rows)))
+        for token, rows in postings.items()
+    }
+
+
+def encode_rows(rows: Iterable[int]) -> List[int]:
+    """
+    Delta-encodes a sorted list of row indexes, for compact storage.
+    """
+
+    encoded = []
+    previous = 0
+    for row in rows:
+        encoded.append(row - previous)
+        previous = row
+
+    return encoded
+
+
+def build_search_index(
+    table_name: str,
+    table: Table,
+    columns: Optional[List[str]] = None,
+    manifest=None,
+    table_hash: Optional[str] = None,
+) -> str:
+    """
+    Writes the search index of a table as static JSON files.
+
+    The index is stored in the `{table_name}-search` directory, with one
+    file per shard (see `shard_name()`), mapping each token to its
+    delta-encoded rows (see `encode_rows()`), and an `INDEX_FILE` listing
+    the shards. Shards left from previous builds are removed.
+
+    Parameters
+    ----------
+    table_name : str
+        The name of the table.
+    table : Table
+        The table to index.
+    columns : Optional[List[str]]
+        The fields to index, by default all the fields of the table.
+    manifest : Optional[BuildManifest]
+        The build manifest, if any, so that the index is only built if the
+        table changed since the last build.
+    table_hash : Optional[str]
+        The content hash of the table, if already computed.
+
+    Returns
+    -------
+    str
+        The path to the index directory, relative to the table page.
+    """
+
+    if columns is None:
+        columns = table.fields
+
+    index_path = Path(f"{table_name}-search")
+    index_file = index_path / INDEX_FILE
+
+    # Skip the index if it was already built from the same inputs
+    if manifest:
+        if table_hash is None:
+            table_hash = table.content_hash()
+        digest = hash_inputs([table_hash, columns, PREFIX_LENGTH])
+        if manifest.is_current(index_file, digest):
+            logging.info("`%s` is up to date, skipping.", index_file)
+            return index_path.as_posix()
+
+    # Group the tokens by shard, in a stable order
+    shards: Dict[str, Dict[str, List[int]]] = {}
+    for token, rows in sorted(build_postings(table, columns).items()):
+        shards.setdefault(shard_name(token), {})[token] = encode_rows(rows)
+
+    index_path.mkdir(exist_ok=True)
+    for name, shard in shards.items():
+        write_if_changed(
+            index_path / f"{name}.json",
+            json.dumps(shard, ensure_ascii=False, separators=(",", ":")),
+        )
+
+    # Remove shards of tokens no longer in the table
+    for path in index_path.glob("*.json"):
+        if path.stem not in shards and path.name != INDEX_FILE:
+            path.unlink()
+
+    index = {
+        "rows": len(table),
+        "prefix_length": PREFIX_LENGTH,
+        "shards": sorted(shards),
+    }
+    write_if_changed(index_file, json.dumps(index, separators=(",", ":")))
+    if manifest:
+        manifest.record(index_file, digest)
+
+    logging.info("`%s` search index written in %i shards.", table_name, len(shards))
+
+    return index_path.as_posix()
@@ -0,0 +1,469 @@
+"""
+Module with a compact, column-oriented table representation.
+"""
+
+# Import Python standard libraries
+from array import array
+from typing import *
+import hashlib
+import json
+import sys
+
+# Array typecodes used for storing dictionary codes, with the number of
+# distinct values each one can address; columns start with the smallest
+# typecode and are widened when needed
+_CODE_TYPES = [("B", 2**8), ("H", 2**16), ("I", 2**32)]
+
+
+class TypedValues:
+    """
+    The distinct values of a numeric column, stored in a typed array.
+
+    Values are returned as strings, as those of any other column, but take
+    a fraction of the memory of Python strings. Only values whose string
+    representation is restored exactly by `str()` can be stored (see
+    `tasyba.inference.typed_values()`), except for a single missing value,
+    such as an empty string, which is stored aside.
+    """
+
+    __slots__ = ("array", "missing", "missing_value")
+
+    def __init__(
+        self,
+        values: array,
+        missing: Optional[int] = None,
+        missing_value: Optional[str] = None,
+    ):
+        """
+        Parameters
+        ----------
+        values : array
+            The distinct values, in a typed array; the item at the index of
+            the missing value, if any, is ignored.
+        missing : Optional[int]
+            The index of the missing value, if any.
+        missing_value : Optional[str]
+            The missing value, returned for index `missing`.
+        """
+
+        self.array = values
+        self.missing = missing
+        self.missing_value = missing_value
+
+    def tolist(self) -> List[Optional[Union[int, float]]]:
+        """
+        Returns the values as numbers, with `None` for the missing value.
+        """
+
+        values = self.array.tolist()
+        if self.missing is not None:
+            values[self.missing] = None
+
+        return values
+
+    def __len__(self) -> int:
+        return len(self.array)
+
+    def __getitem__(self, code: int) -> Optional[str]:
+        if code == self.missing:
+            return self.missing_value
+        return str(self.array[code])
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        return (self[code] for code in range(len(self.array)))
+
+
+class Column:
+    """
+    A dictionary-encoded column of string values.
+
+    Each distinct value is stored only once in `values`, while `codes`
+    holds, for each row, the index of its value in `values`. The distinct
+    values of numeric columns can be stored as `TypedValues`, while still
+    being returned as strings.
+    """
+
+    __slots__ = ("codes", "values", "_lookup", "_limit")
+
+    def __init__(self, values: Iterable[Optional[str]] = ()):
+        self.codes = array(_CODE_TYPES[0][0])
+        self.values: Union[List[Optional[str]], TypedValues] = []
+        self._lookup: Optional[Dict[Optional[str], int]] = {}
+        self._limit = _CODE_TYPES[0][1]
+
+        for value in values:
+            self.append(value)
+
+    @classmethod
+    def from_codes(
+        cls, codes: array, values: Union[List[Optional[str]], TypedValues]
+    ) -> "Column":
+        """
+        Builds a column from its dictionary codes and distinct values.
+
+        Parameters
+        ----------
+        codes : array
+            The code of each row, in an array of one of the typecodes used
+            for codes ("B", "H", or "I").
+        values : Union[List[Optional[str]],TypedValues]
+            The distinct values, with no repetitions.
+
+        Returns
+        -------
+        Column
+            The column.
+        """
+
+        column = cls()
+        column.codes = codes
+        column._limit = dict(_CODE_TYPES)[codes.typecode]
+        column.set_values(values)
+
+        return column
+
+    def append(self, value: Optional[str]):
+        """
+        Appends a value to the end of the column.
+        """
+
+        if self._lookup is None:
+            self._build_lookup()
+
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.values)
+            if code == self._limit:
+                self._widen()
+            self._lookup[value] = code
+            self.values.append(value)
+
+        self.codes.append(code)
+
+    def extend(self, column: "Column"):
+        """
+        Appends the rows of another column to the end of the column.
+
+        Only the distinct values of the other column are looked up, and its
+        codes are then translated in bulk, so that the cost depends mostly
+        on the number of distinct values; the result is the same as if the
+        rows had been appended one by one.
+        """
+
+        if self._lookup is None:
+            self._build_lookup()
+
+        lookup = self._lookup
+        size = len(lookup)
+        remap = [lookup.setdefault(value, len(lookup)) for value in column.values]
+        if len(lookup) > size:
+            self.values.extend(
+                value for value, code in zip(column.values, remap) if code >= size
+            )
+            while len(self.values) > self._limit:
+                self._widen()
+
+        if column.codes.typecode == self.codes.typecode and all(
+            map(int.__eq__, remap, range(len(remap)))
+        ):
+            # Codes of columns whose values come first need no translation
+            self.codes.extend(column.codes)
+        else:
+            self.codes.extend(map(remap.__getitem__, column.codes))
+
+    def _build_lookup(self):
+        # Build the mapping of values to codes, which is not kept for typed
+        # values, as it takes more memory than the values themselves; values
+        # are stored as strings again, as new ones might not be numeric
+        self.values = list(self.values)
+        self._lookup = {value: code for code, value in enumerate(self.values)}
+
+    def set_values(self, values: Union[List[Optional[str]], TypedValues]):
+        """
+        Replaces the distinct values of the column, such as with typed ones.
+
+        Parameters
+        ----------
+        values : Union[List[Optional[str]],TypedValues]
+            The distinct values, in the same order, which must return the
+            same strings as the current ones.
+        """
+
+        self.values = values
+        self._lookup = None
+
+    def _widen(self):
+        # Move the codes to the next wider typecode
+        for typecode, limit in _CODE_TYPES:
+            if limit > self._limit:
+                self.codes = array(typecode, self.codes)
+                self._limit = limit
+                return
+
+        raise OverflowError("Too many distinct values in column.")
+
+    def __getstate__(self):
+        # The lookup is not pickled, as it can be rebuilt from the values
+        return self.codes, self.values, self._limit
+
+    def __setstate__(self, state):
+        self.codes, self.values, self._limit = state
+        self._lookup = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, idx: int) -> Optional[str]:
+        return self.values[self.codes[idx]]
+
+    def __iter__(self) -> Iterator[Optional[str]]:
+        values = self.values
+        return (values[code] for code in self.codes)
+
+
+class Table:
+    """
+    A column-oriented table, holding one dictionary-encoded column per field.
+
+    Tables can be iterated as a sequence of row dictionaries, as expected by
+    templates, but store their data in a much more compact way than a list
+    of dictionaries, with each field name and each distinct value of a
+    column stored only once.
+    """
+
+    def __init__(self, fields: Iterable[str] = ()):
+        self.columns: Dict[str, Column] = {
+            sys.intern(field): Column() for field in fields
+        }
+        self._nrows = 0
+
+        # The types of the fields, if inferred (see `tasyba.inference`)
+        self.types: Dict[str, str] = {}
+
+    @classmethod
+    def from_rows(
+        cls, rows: Iterable[Dict[str, str]], exclude: Iterable[str] = ()
+    ) -> "Table":
+        """
+        Builds a table from an iterable of row dictionaries.
+
+        The fields are taken from the keys of the first row, in the order
+        they appear.
+
+        Parameters
+        ----------
+        rows : Iterable[Dict[str,str]]
+            The rows to store, such as those returned by `iter_tabular()`.
+        exclude : Iterable[str], optional
+            The fields not to store, by default none.
+
+        Returns
+        -------
+        Table
+            The table holding the rows.
+        """
+
+        exclude = set(exclude)
+
+        table = None
+        for row in rows:
+            if table is None:
+                table = cls(field for field in row if field not in exclude)
+            table.append(row)
+
+        if table is None:
+            table = cls()
+
+        return table
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Column]) -> "Table":
+        """
+        Builds a table from its columns, which must have the same length.
+
+        Parameters
+        ----------
+        columns : Dict[str,Column]
+            The columns, by field name, in order.
+
+        Returns
+        -------
+        Table
+            The table holding the columns.
+        """
+
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("Columns of different lengths.")
+
+        table = cls()
+        table.columns = {sys.intern(field): column for field, column in columns.items()}
+        table._nrows = lengths.pop() if lengths else 0
+
+        return table
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        The names of the fields of the table, in order.
+        """
+
+        return list(self.columns)
+
+    def append(self, row: Dict[str, str]):
+        """
+        Appends a row dictionary to the end of the table.
+
+        Fields missing from the row are stored as `None`, while keys that
+        are not fields of the table are ignored.
+        """
+
+        for field, column in self.columns.items():
+            column.append(row.get(field))
+        self._nrows += 1
+
+    def column(self, field: str) -> Column:
+        """
+        Returns the column of a field.
+        """
+
+        return self.columns[field]
+
+    def remove_fields(self, fields: Iterable[str]):
+        """
+        Removes fields from the table.
+
+        As data is stored by column, the cost does not depend on the number
+        of rows.
+        """
+
+        for field in fields:
+            del self.columns[field]
+            self.types.pop(field, None)
+
+    def content_hash(self) -> str:
+        """
+        Computes a hash of the fields and contents of the table.
+
+        As dictionary codes are assigned in order of appearance, tables
+        holding the same data always have the same hash.
+
+        Returns
+        -------
+        str
+            The hexadecimal digest of the table.
+        """
+
+        digest = hashlib.sha256()
+        for field, column in self.columns.items():
+            values = column.values
+            if isinstance(values, TypedValues):
+                digest.update(
+                    json.dumps([field, values.missing, values.missing_value]).encode()
+                )
+                digest.update(values.array.typecode.encode())
+                digest.update(values.array.tobytes())
+            else:
+                digest.update(json.dumps([field, values], default=str).encode())
+            digest.update(column.codes.typecode.encode())
+            digest.update(column.codes.tobytes())
+
+        return digest.hexdigest()
+
+    def iter_rows(
+        self,
+        fields: Optional[List[str]] = None,
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ) -> Iterator[Tuple]:
+        """
+        Iterates over the rows of the table as tuples of values.
+
+        Parameters
+        ----------
+        fields : Optional[List[str]]
+            The fields to include in each tuple, in order; by default, all
+            the fields of the table.
+        start : Optional[int]
+            The index of the first row to include, by default the first row
+            of the table.
+        stop : Optional[int]
+            The index after the last row to include, by default the end of
+            the table. As columns are sliced directly, iterating over a
+            range of rows does not depend on the rows before it.
+
+        Returns
+        -------
+        Iterator[Tuple]
+            An iterator over the rows of the table.
+        """
+
+        if fields is None:
+            fields = self.fields
+
+        if not fields:
+            return iter([()] * len(range(self._nrows)[start:stop]))
+
+        columns = [self.columns[field] for field in fields]
+        if start is None and stop is None:
+            return zip(*columns)
+
+        return zip(
+            *[
+                map(column.values.__getitem__, column.codes[start:stop])
+                for column in columns
+            ]
+        )
+
+    def iter_codes(
+        self,
+        fields: List[str],
+        start: Optional[int] = None,
+        stop: Optional[int] = None,
+    ) -> Iterator[Tuple[int, ...]]:
+        """
+        Iterates over the rows of the table as tuples of dictionary codes.
+
+        Codes index the `values` of the column of each field, so that data
+        computed once per distinct value can be looked up for every row.
+
+        Parameters
+        ----------
+        fields : List[str]
+            The fields to include in each tuple, in order.
+        start : Optional[int]
+            The index of the first row to include, by default the first row
+            of the table.
+        stop : Optional[int]
+            The index after the last row to include, by default the end of
+            the table.
+
+        Returns
+        -------
+        Iterator[Tuple[int,...]]
+            An iterator over the codes of the rows of the table.
+        """
+
+        if not fields:
+            return iter([()] * len(range(self._nrows)[start:stop]))
+
+        return zip(*[self.columns[field].codes[start:stop] for field in fields])
+
+    def __len__(self) -> int:
+        return self._nrows
+
+    def __getitem__(self, idx: int) -> Dict[str, str]:
+        if idx < 0:
+            idx += self._nrows
+        if not 0 <= idx < self._nrows:
+            raise IndexError("Table index out of range.")
+
+        return {field: column[idx] for field, column in self.columns.items()}
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        fields = self.fields
+        for values in self.iter_rows(fields):
+            yield dict(zip(fields, values))
+
+    def __repr__(self) -> str:
+        return f"<Table rows={self._nrows} fields={self.fields}>"
@@ -0,0 +1,206 @@
+"""
+Module for transposing tables larger than the available memory.
+
+Every value of a table must be read before the first transposed row can be
+written, which makes transposing tall tables in memory the most expensive
+of the table commands. Here, rows are read in blocks, whose columns are
+written to a temporary file as segments of CSV-encoded values; each
+transposed row is then written by copying the segments of its column from
+every block, in order. Only a block of rows is held in memory at a time,
+and transposed rows, which can be arbitrarily long, are never held whole.
+"""
+
+# Import Python standard libraries
+from array import array
+from collections import Counter
+from itertools import chain, repeat
+from pathlib import Path
+from typing import *
+import csv
+import io
+import logging
+import tempfile
+
+# Import other modules
+from tasyba.instrument import stage
+from tasyba.table import Column, Table
+
+# Number of rows read at a time
+BLOCK_SIZE = 64 * 1024
+
+# Size of the buffer for copying segments
+COPY_BUFFER = 1024 * 1024
+
+
+def _encode(values: Sequence[str]) -> bytes:
+    # Encode a segment of values as a CSV line, with no line terminator; the
+    # terminator is only stripped after writing, so that values holding
+    # newlines are quoted, and a single empty value is not quoted, as it is
+    # joined to other segments
+    if values == [""]:
+        return b""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\r\n").writerow(values)
+
+    return buffer.getvalue()[:-2].encode("utf-8")
+
+
+def _unique_names(names: Sequence[str]) -> List[str]:
+    # Name empty fields by position, and number repeated names, as frictionless
+    # does when inferring schemata
+    names = [name or f"field{index}" for index, name in enumerate(names, 1)]
+    seen = Counter()
+    unique = []
+    for name in names:
+        seen[name] += 1
+        unique.append(f"{name}{seen[name]}" if seen[name] > 1 else name)
+
+    return unique
+
+
+def transpose_rows(
+    rows: Iterable[Sequence[Optional[str]]],
+    output: BinaryIO,
+    block_size: int = BLOCK_SIZE,
+) -> Tuple[int, int]:
+    """
+    Transposes rows, writing them to a CSV file.
+
+    The first row, usually the header, becomes the first column, as with
+    the `transpose` of `petl`, used by frictionless. Rows shorter than the
+    first one are padded with missing values, and longer ones are cut.
+
+    Parameters
+    ----------
+    rows : Iterable[Sequence[Optional[str]]]
+        The rows to transpose, starting with the header.
+    output : BinaryIO
+        The binary file where the transposed rows are written, in UTF-8.
+    block_size : int, optional
+        The number of rows held in memory at a time, by default
+        `BLOCK_SIZE`.
+
+    Returns
+    -------
+    Tuple[int,int]
+        The number of rows and of columns of the transposed table.
+    """
+
+    rows = iter(rows)
+    width = None
+    nrows = 0
+
+    # Write the columns of each block of rows as segments, recording their
+    # offsets, by block and column, in the temporary file
+    offsets = array("Q", [0])
+    with tempfile.TemporaryFile() as segments:
+        while True:
+            block = [row for _, row in zip(range(block_size), rows)]
+            if not block:
+                break
+            if width is None:
+                width = len(block[0])
+            nrows += len(block)
+
+            for column in range(width):
+                values = [row[column] if column < len(row) else None for row in block]
+                segments.write(
+                    _encode(["" if value is None else value for value in values])
+                )
+                offsets.append(segments.tell())
+
+        # Write each transposed row by copying the segments of its column
+        width = width or 0
+        nblocks = (len(offsets) - 1) // max(1, width)
+        for column in range(width):
+            for block in range(nblocks):
+                start = offsets[block * width + column]
+                end = offsets[block * width + column + 1]
+                segments.seek(start)
+                if block:
+                    output.write(b",")
+                remaining = end - start
+                while remaining:
+                    chunk = segments.read(min(remaining, COPY_BUFFER))
+                    output.write(chunk)
+                    remaining -= len(chunk)
+            output.write(b"\r\n")
+
+    logging.debug("Transposed %i rows in %i blocks.", nrows, nblocks if width else 0)
+
+    return width, nrows
+
+
+def transpose_table(
+    table: Table,
+    block_size: int = BLOCK_SIZE,
+    directory: Optional[Union[Path, str]] = None,
+) -> Table:
+    """
+    Transposes a table.
+
+    The rows of the table are transposed to a temporary file (see
+    `transpose_rows()`), from which the transposed table is read back,
+    dictionary-encoded and one row at a time, so that transposing never
+    holds the values as rows. Unlike the transposition itself, the
+    transposed table is held in memory, as any other table, with one column
+    for every row of the original one; memory thus grows with the number of
+    rows, by about half a kilobyte per row for tables of a few fields.
+    Scripts (see `run_makefile()`) read the transposed rows from disk
+    instead.
+    As with frictionless, the values of the first field become the fields
+    of the transposed table, and the other fields its first column; empty
+    and repeated values are renamed as frictionless does (so that a second
+    "east" becomes "east2").
+
+    Parameters
+    ----------
+    table : Table
+        The table to transpose.
+    block_size : int, optional
+        The number of rows held in memory at a time, by default
+        `BLOCK_SIZE`.
+    directory : Optional[Union[Path,str]]
+        The directory for the temporary file, by default the system one.
+
+    Returns
+    -------
+    Table
+        The transposed table.
+    """
+
+    with stage("transpose_table", block_size=block_size) as record:
+        with tempfile.NamedTemporaryFile(
+            "w+b", suffix=".csv", dir=directory, delete=False
+        ) as handler:
+            transpose_rows(
+                chain([table.fields], table.iter_rows()), handler, block_size
+            )
+
+        # Gather the values of each column as the transposed rows are read, so
+        # that rows are never held, and encode one column at a time, dropping
+        # its mapping of values to codes, as a transposed table has one
+        # column for every row of the original one
+        try:
+            with open(handler.name, encoding="utf-8", newline="") as source:
+                reader = csv.reader(source)
+                header = _unique_names(next(reader, []))
+                values = [[] for _ in header]
+                nrows = 0
+                for row in reader:
+                    for column, value in zip(values, chain(row, repeat(None))):
+                        column.append(value)
+                    nrows += 1
+        finally:
+            Path(handler.name).unlink()
+
+        columns = {}
+        for idx, field in enumerate(header):
+            column = Column(values[idx])
+            column.set_values(column.values)
+            columns[field] = column
+            values[idx] = None
+        transposed = Table.from_columns(columns) if nrows else Table()
+        record["rows"] = len(transposed)
+
+    return transposed
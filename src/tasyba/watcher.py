@@ -0,0 +1,180 @@
+"""
+Module for rebuilding a site as the files it is built from change.
+
+The files read by a deployment script (its sources and templates) are
+polled for changes, and only the steps affected by the files that changed
+are run again, on tables and templates kept in memory since the last run.
+Changes to the script itself run it again from scratch.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+from typing import *
+import logging
+import time
+
+# Import other modules
+from tasyba.deploy import Deployment
+
+# Default number of seconds between checks for changes
+POLL_INTERVAL = 0.25
+
+# The state of a file, as its modification time and size, or `None` if
+# the file does not exist
+FileState = Optional[Tuple[int, int]]
+
+
+def file_state(filename: Union[Path, str]) -> FileState:
+    """
+    Returns the state of a file, used for detecting changes.
+    """
+
+    try:
+        stats = Path(filename).stat()
+    except FileNotFoundError:
+        return None
+
+    return stats.st_mtime_ns, stats.st_size
+
+
+class Watcher:
+    """
+    Keeps a site up to date with the files it is built from.
+
+    Each call to `poll()` runs the steps affected by the files that changed
+    since the previous call; the first call runs the whole script.
+    """
+
+    def __init__(self, filepath: Union[Path, str], **options):
+        """
+        Parameters
+        ----------
+        filepath : Union[Path,str]
+            The path to the script, in YAML format.
+        options
+            Additional arguments for the `Deployment`, such as `jobs`.
+        """
+
+        self.filepath = Path(filepath).resolve()
+        self.options = options
+
+        # The script with the state of its last run, if it could be loaded
+        self.deployment: Optional[Deployment] = None
+
+        # The state of each watched file, and the steps whose last run
+        # failed, which are run again on the next change
+        self.states: Dict[Path, FileState] = {}
+        self.failed: Set[int] = set()
+
+    def changed_files(self) -> List[Path]:
+        """
+        Returns the files that changed since the last check.
+
+        New files in template directories are included as well.
+        """
+
+        filenames = [self.filepath]
+        if self.deployment:
+            filenames += list(self.deployment.watched_files())
+
+        changed = []
+        for filename in filenames:
+            state = file_state(filename)
+            if self.states.get(filename) != state:
+                self.states[filename] = state
+                changed.append(filename)
+
+        return changed
+
+    def _run(self, changed: List[Path]) -> Set[int]:
+        # Run the steps affected by a set of changes, returning their indexes
+        if self.filepath in changed:
+            logging.info("Running `%s`.", self.filepath)
+            self.deployment = None
+            self.failed = set()
+            deployment = Deployment(self.filepath, auto_reload=True, **self.options)
+            self.deployment = deployment
+
+            # Record the state of the files read, so that they are only
+            # reported as changed if modified from now on
+            self.changed_files()
+
+            indexes = set(range(len(deployment.steps)))
+        elif self.deployment:
+            indexes = self.deployment.affected_steps(changed) | self.failed
+            logging.info(
+                "%i files changed, running steps %s.",
+                len(changed),
+                ", ".join(str(idx) for idx in sorted(indexes)),
+            )
+        else:
+            # Wait for the script to be fixed
+            return set()
+
+        self.failed = indexes
+        self.deployment.run(indexes)
+        self.failed = set()
+
+        return indexes
+
+    def poll(self) -> Set[int]:
+        """
+        Runs the steps affected by the files that changed.
+
+        Errors are logged rather than raised, so that they can be fixed
+        while watching; the steps that failed are run again on the next
+        change.
+
+        Returns
+        -------
+        Set[int]
+            The indexes of the steps run.
+        """
+
+        changed = self.changed_files()
+        if not changed:
+            return set()
+
+        start = time.perf_counter()
+        try:
+            indexes = self._run(changed)
+        except Exception:
+            logging.exception("Build failed, waiting for changes.")
+            return set()
+
+        if indexes:
+            logging.info("Build finished in %.2f seconds.", time.perf_counter() - start)
+
+        return indexes
+
+
+def watch(
+    filepath: Union[Path, str], interval: float = POLL_INTERVAL, **options
+) -> None:
+    """
+    Runs a deployment script, and again every time its files change.
+
+    Sources and templates are checked for changes every `interval` seconds;
+    only the steps affected by a change are run again (see `Watcher`). The
+    function only returns when interrupted (e.g., with Ctrl+C).
+
+    Parameters
+    ----------
+    filepath : Union[Path,str]
+        The path to the script, in YAML format.
+    interval : float, optional
+        The number of seconds between checks, by default `POLL_INTERVAL`.
+    options
+        Additional arguments for the `Deployment`, such as `jobs`.
+    """
+
+    watcher = Watcher(filepath, **options)
+    watcher.poll()
+    logging.info("Watching %i files for changes.", len(watcher.states))
+
+    try:
+        while True:
+            time.sleep(interval)
+            watcher.poll()
+    except KeyboardInterrupt:
+        pass
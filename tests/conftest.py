@@ -0,0 +1,66 @@
+"""
+conftest
+========
+
+Shared fixtures for the tests of the `tasyba` library.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import 3rd-party libraries
+import pytest
+import yaml
+
+# Import the library
+import tasyba.fl
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keep the default resource cache of each test in a temporary directory."""
+
+    monkeypatch.setenv("TASYBA_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(tasyba.fl, "_DEFAULT_CACHE", None)
+
+    return tmp_path / "cache"
+
+
+@pytest.fixture
+def deploy_script(tmp_path):
+    """Return a function writing a deployment script for the test tables."""
+
+    def write(title="Test"):
+        script = {
+            "steps": [
+                {"add_resource": {"name": name, "source": str(TEST_DATA_PATH / source)}}
+                for name, source in [
+                    ("countries", "countries.csv"),
+                    ("pivot", "transform-pivot.csv"),
+                ]
+            ]
+            + [{"field_remove": {"table": "pivot", "fields": ["style"]}}]
+            + [
+                {
+                    "table_deploy": {
+                        "table": name,
+                        "title": title,
+                        "description": "Test site",
+                        "author": "Test",
+                        "favicon": "favicon.ico",
+                        "mainlink": "index.html",
+                        "citation": "Test",
+                    }
+                }
+                for name in ["countries", "pivot"]
+            ]
+        }
+        script_path = tmp_path / "script.yaml"
+        script_path.write_text(yaml.dump(script))
+
+        return script_path
+
+    return write
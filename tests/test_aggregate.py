@@ -0,0 +1,171 @@
+"""
+test_aggregate
+==============
+
+Tests for grouping and pivoting tables.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import 3rd-party libraries
+import pytest
+import yaml
+
+# Import the library
+import tasyba
+import tasyba.aggregate
+from tasyba.aggregate import group_table, pivot_table
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+# The pivot of the test data for each aggregation function, by region and
+# gender
+PIVOTS = {
+    "sum": [["east", "33", "29"], ["west", "35", "23"]],
+    "count": [["east", "3", "3"], ["west", "3", "3"]],
+    "mean": [
+        ["east", "11.0", "9.666666666666666"],
+        ["west", "11.666666666666666", "7.666666666666667"],
+    ],
+    "min": [["east", "7", "3"], ["west", "8", "1"]],
+    "max": [["east", "14", "18"], ["west", "15", "16"]],
+    "first": [["east", "12", "3"], ["west", "12", "6"]],
+}
+
+
+@pytest.fixture(params=[False, True], ids=["python", "numpy"])
+def vectorized(request):
+    if request.param:
+        pytest.importorskip("numpy")
+    return request.param
+
+
+@pytest.mark.parametrize("aggfun", sorted(PIVOTS))
+def test_pivot_table(aggfun, vectorized, monkeypatch):
+    """Test pivoting a table, aggregating in chunks and spilling groups."""
+
+    # Aggregate in several chunks, spilling the groups of each one
+    monkeypatch.setattr(tasyba.aggregate, "CHUNK_ROWS", 5)
+    table = tasyba.read_table(TEST_DATA_PATH / "transform-pivot.csv")
+
+    pivoted = pivot_table(
+        table, "region", "gender", "units", aggfun, max_groups=1, vectorized=vectorized
+    )
+    assert pivoted.fields == ["region", "boy", "girl"]
+    assert [list(row) for row in pivoted.iter_rows()] == PIVOTS[aggfun]
+
+
+def test_group_table(vectorized):
+    """Test grouping rows, ignoring missing values."""
+
+    table = tasyba.Table.from_rows(
+        [
+            {"key": "10", "value": "b"},
+            {"key": "9", "value": ""},
+            {"key": "10", "value": "a"},
+            {"key": "", "value": "c"},
+            {"key": "9", "value": "d"},
+        ]
+    )
+    tasyba.infer_types(table)
+
+    # Keys are sorted in numeric order, with missing values first
+    grouped = group_table(table, ["key"], "value", "min", vectorized=vectorized)
+    assert list(grouped.iter_rows()) == [("", "c"), ("9", "d"), ("10", "a")]
+    grouped = group_table(table, ["key"], "value", "count", vectorized=vectorized)
+    assert list(grouped.iter_rows()) == [("", "1"), ("9", "1"), ("10", "2")]
+
+    with pytest.raises(ValueError):
+        group_table(table, ["key"], "value", "sum", vectorized=vectorized)
+    with pytest.raises(ValueError):
+        group_table(table, ["key"], "value", "median", vectorized=vectorized)
+
+
+@pytest.mark.parametrize("aggfun", ["sum", "mean"])
+def test_pivot_parity(aggfun, monkeypatch):
+    """Test that pivots are the same with and without NumPy."""
+
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(tasyba.aggregate, "CHUNK_ROWS", 2)
+    table = tasyba.Table.from_rows(
+        [
+            {"region": "east", "gender": "boy", "units": "12"},
+            {"region": "east", "gender": "boy", "units": "14"},
+            {"region": "east", "gender": "girl", "units": "2.5"},
+            {"region": "east", "gender": "girl", "units": "3"},
+            {"region": "west", "gender": "boy", "units": "4611686018427387904"},
+            {"region": "west", "gender": "boy", "units": "4611686018427387904"},
+        ]
+    )
+
+    pivots = [
+        [
+            list(row)
+            for row in pivot_table(
+                table, "region", "gender", "units", aggfun, vectorized=vectorized
+            ).iter_rows()
+        ]
+        for vectorized in [False, True]
+    ]
+    assert pivots[0] == pivots[1]
+    if aggfun == "sum":
+        assert pivots[1] == [["east", "26", "5.5"], ["west", str(2**63), ""]]
+
+    # Sums fitting in 64 bits are still vectorized
+    monkeypatch.setattr(tasyba.aggregate, "_chunk_python", None)
+    table = tasyba.Table.from_rows(list(table)[:4])
+    pivoted = pivot_table(table, "region", "gender", "units", aggfun, vectorized=True)
+    assert [list(row) for row in pivoted.iter_rows()] == pivots[0][:1]
+
+
+def test_script_pivot():
+    """Test that scripts pivot with their aggregation function."""
+
+    config = {
+        "steps": [
+            {"add_resource": {"name": "pivot", "source": "transform-pivot.csv"}},
+            {
+                "table_pivot": {
+                    "name": "pivot",
+                    "columns": ["region", "gender", "units"],
+                    "aggfun": "max",
+                }
+            },
+        ]
+    }
+    package = tasyba.run_makefile(config, TEST_DATA_PATH)
+    rows = package.get_resource("pivot").read_rows()
+    assert rows[0] == {"region": "east", "boy": 14, "girl": 18}
+
+
+def test_caller_pivot(tmp_path, monkeypatch):
+    """Test pivoting a table in a deployment script."""
+
+    monkeypatch.chdir(tmp_path)
+    script = {
+        "steps": [
+            {
+                "add_resource": {
+                    "name": "pivot",
+                    "source": str(TEST_DATA_PATH / "transform-pivot.csv"),
+                }
+            },
+            {
+                "table_pivot": {
+                    "name": "pivot",
+                    "columns": ["gender", "region", "units"],
+                    "aggfun": "count",
+                }
+            },
+        ]
+    }
+    (tmp_path / "script.yaml").write_text(yaml.dump(script))
+    deployment = tasyba.Deployment(tmp_path / "script.yaml")
+    deployment.run()
+
+    assert list(deployment.tables["pivot"]) == [
+        {"gender": "boy", "east": "3", "west": "3"},
+        {"gender": "girl", "east": "3", "west": "3"},
+    ]
@@ -0,0 +1,60 @@
+"""
+test_cache
+==========
+
+Tests for the persistent cache of resource descriptions.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import shutil
+
+# Import 3rd-party libraries
+import frictionless
+import pytest
+
+# Import the library
+import tasyba
+from tasyba.cache import ResourceCache
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_describe_cached(tmp_path, monkeypatch):
+    """Test that unchanged resources are not described again."""
+
+    source = tmp_path / "countries.csv"
+    shutil.copy(TEST_DATA_PATH / "countries.csv", source)
+    cache = ResourceCache(tmp_path / "cache")
+
+    expected = tasyba.describe_resource(source, cache=cache)
+
+    # Make sure that any new inference or validation fails
+    def fail(*args, **kwargs):
+        raise AssertionError("resource was read again")
+
+    monkeypatch.setattr(frictionless, "describe", fail)
+    monkeypatch.setattr(frictionless, "validate", fail)
+
+    assert tasyba.describe_resource(source, cache=cache) == expected
+
+    # After invalidation, the resource must be read again
+    cache.invalidate(source)
+    with pytest.raises(AssertionError, match="resource was read again"):
+        tasyba.describe_resource(source, cache=cache)
+
+
+def test_cache_eviction(tmp_path):
+    """Test that the cache is kept under its maximum size."""
+
+    source = TEST_DATA_PATH / "countries.csv"
+    cache = ResourceCache(tmp_path, max_size=1024)
+
+    for idx in range(10):
+        key = cache.key(source, idx=idx)
+        cache.put(key, {"data": "x" * 200}, source)
+
+    entries = list((tmp_path / "entries").glob("*.json"))
+    assert 0 < len(entries) < 10
+    assert sum(entry.stat().st_size for entry in entries) <= 1024
@@ -0,0 +1,100 @@
+"""
+test_columnar
+=============
+
+Tests for reading and writing tables in columnar formats.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import 3rd-party libraries
+import pytest
+import yaml
+
+# Import the library
+import tasyba
+from tasyba.columnar import read_columnar, write_columnar
+from tasyba.table import TypedValues
+
+pa = pytest.importorskip("pyarrow")
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+def test_columnar_roundtrip(tmp_path, suffix):
+    """Test writing and reading tables in columnar formats."""
+
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    write_columnar(table, tmp_path / f"countries{suffix}")
+
+    loaded = tasyba.read_table(tmp_path / f"countries{suffix}")
+    assert list(loaded) == list(table)
+    assert loaded.types == table.types
+    assert isinstance(loaded.column("neighbor_id").values, TypedValues)
+
+    # Only the columns needed are read
+    loaded = read_columnar(tmp_path / f"countries{suffix}", exclude=["name"])
+    assert loaded.fields == ["id", "neighbor_id", "population"]
+
+
+def test_read_nulls(tmp_path):
+    """Test reading null values from columnar files."""
+
+    import pyarrow.parquet
+
+    data = pa.table({"name": ["a", None, "b"], "value": [1.5, None, 2.0]})
+    pyarrow.parquet.write_table(data, tmp_path / "nulls.parquet")
+
+    table = read_columnar(tmp_path / "nulls.parquet")
+    assert list(table) == [
+        {"name": "a", "value": "1.5"},
+        {"name": "", "value": ""},
+        {"name": "b", "value": "2.0"},
+    ]
+    assert table.types == {"value": "number"}
+
+
+def test_caller_columnar(tmp_path, monkeypatch):
+    """Test deploying tables from and to columnar files."""
+
+    monkeypatch.chdir(tmp_path)
+    write_columnar(
+        tasyba.read_table(TEST_DATA_PATH / "countries.csv"), "countries.parquet"
+    )
+
+    script = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.parquet"}},
+            {"field_remove": {"table": "countries", "fields": ["neighbor_id"]}},
+            {"table_write": {"table": "countries", "path": "output.arrow"}},
+        ]
+    }
+    (tmp_path / "script.yaml").write_text(yaml.dump(script))
+    deployment = tasyba.Deployment(tmp_path / "script.yaml")
+    assert deployment.unused_fields(0) == {"neighbor_id"}
+
+    deployment.run()
+    output = read_columnar("output.arrow")
+    assert output.fields == ["id", "name", "population"]
+    assert output[1] == {"id": "2", "name": "France", "population": "67"}
+
+
+def test_script_columnar(tmp_path):
+    """Test adding columnar resources in a script."""
+
+    write_columnar(
+        tasyba.read_table(TEST_DATA_PATH / "countries.csv"),
+        tmp_path / "countries.parquet",
+    )
+    config = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.parquet"}}
+        ]
+    }
+
+    package = tasyba.run_makefile(config, tmp_path)
+    rows = package.get_resource("countries").read_rows()
+    assert rows[1]["name"] == "France"
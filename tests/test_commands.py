@@ -46,3 +46,122 @@ def test_script():
     package = tasyba.run_makefile(config, TEST_DATA_PATH)
 
     assert True
+
+
+def test_compile_makefile():
+    """Test compiling a script into a lazy plan."""
+
+    config = tasyba.load_makefile(TEST_DATA_PATH / "script-1.yaml")
+    plan = tasyba.compile_makefile(config)
+
+    # The `cars` resource is removed before being used, so it must not be
+    # loaded at all, and table commands must be fused before the prints
+    assert [command for command, _ in plan] == [
+        "add_resource",
+        "transform_resource",
+        "table_print",
+        "add_resource",
+        "transform_resource",
+        "table_print",
+    ]
+    assert all(args.get("name") != "cars" for _, args in plan)
+
+
+def test_script_fused():
+    """Test that fused table commands are applied in order."""
+
+    config = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.yaml"}},
+            {"table_transpose": {"name": "countries"}},
+            {"table_transpose": {"name": "countries"}},
+        ]
+    }
+    plan = tasyba.compile_makefile(config)
+    assert len(plan) == 2
+
+    package = tasyba.run_makefile(config, TEST_DATA_PATH)
+    rows = package.get_resource("countries").read_rows()
+    assert rows[0] == {
+        "id": 1,
+        "neighbor_id": None,
+        "name": "Britain",
+        "population": 67,
+    }
+
+
+def test_dependencies():
+    """Test computing the dependencies between steps."""
+
+    steps = [
+        ("describe_resource", {"source": "a.csv", "write": "a.yaml"}),
+        ("add_resource", {"name": "a", "source": "a.yaml"}),
+        ("add_resource", {"name": "b", "source": "b.csv"}),
+        ("field_remove", {"table": "b", "fields": ["x"]}),
+        ("table_deploy", {"table": "a"}),
+    ]
+    deps = tasyba.dependencies(steps)
+
+    assert deps[0] == set()
+    assert deps[1] == {0}
+    assert deps[2] == set()
+    assert deps[3] == {2}
+    assert deps[4] == {1, 2}
+
+
+def test_load_kind(tmp_path, monkeypatch):
+    """Test that loads parsed out of the interpreter run on threads."""
+
+    from tasyba.deploy import load_kind
+
+    source = TEST_DATA_PATH / "countries.csv"
+    assert load_kind(source, 4) == "process"
+    assert load_kind(tmp_path / "countries.parquet", 1) == "thread"
+
+    monkeypatch.setattr(tasyba.deploy, "PARALLEL_MIN", 0)
+    assert load_kind(source, 1) == "process"
+    assert load_kind(source, 4) == "thread"
+
+
+def test_caller_jobs(tmp_path, monkeypatch, deploy_script):
+    """Test that running a script with several jobs matches a serial run."""
+
+    script_path = deploy_script()
+
+    outputs = []
+    for jobs in [1, 2]:
+        output_path = tmp_path / f"jobs{jobs}"
+        output_path.mkdir()
+        monkeypatch.chdir(output_path)
+        tasyba.caller(script_path, jobs=jobs)
+        outputs.append((output_path / "pivot.html").read_text())
+
+    # Without `timestamp`, pages do not include the compilation time
+    assert outputs[0] == outputs[1]
+    assert "<th> style </th>" not in outputs[1]
+
+
+def test_caller_incremental(tmp_path, monkeypatch, deploy_script):
+    """Test that unchanged pages are not rebuilt."""
+
+    monkeypatch.chdir(tmp_path)
+    script_path = deploy_script()
+
+    tasyba.caller(script_path)
+    page = (tmp_path / "pivot.html").read_text()
+    assert (tmp_path / tasyba.manifest.MANIFEST_FILE).exists()
+
+    # Touch the page with a marker; as no input changed, it must be kept
+    (tmp_path / "pivot.html").write_text(page + "<!-- marker -->")
+    tasyba.caller(script_path)
+    assert (tmp_path / "pivot.html").read_text().endswith("<!-- marker -->")
+
+    # Changing a replacement value must rebuild all pages
+    script_path = deploy_script(title="New title")
+    tasyba.caller(script_path)
+    assert "<title>New title</title>" in (tmp_path / "pivot.html").read_text()
+
+    # Including the build time always rebuilds
+    (tmp_path / "pivot.html").write_text(page + "<!-- marker -->")
+    tasyba.caller(script_path, timestamp=True)
+    assert "marker" not in (tmp_path / "pivot.html").read_text()
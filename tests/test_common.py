@@ -0,0 +1,65 @@
+"""
+test_common
+===========
+
+Tests for the common functions of the library.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import the library
+import tasyba
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_read_tabular():
+    """Test reading a tabular file as a list of dictionaries."""
+
+    data = tasyba.read_tabular(TEST_DATA_PATH / "countries.csv")
+
+    assert len(data) == 5
+    assert data[0] == {
+        "id": "1",
+        "neighbor_id": "",
+        "name": "Britain",
+        "population": "67",
+    }
+
+
+def test_iter_tabular_sample(tmp_path):
+    """Test streaming a file larger than the detection sample."""
+
+    # Build a tab-separated file whose non-ASCII characters only show up
+    # after the sample used for detection
+    lines = ["id\tname"] + [f"{idx}\tname{idx}" for idx in range(1000)]
+    lines.append("1000\tÅngström")
+    filename = tmp_path / "large.tsv"
+    filename.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    rows = tasyba.iter_tabular(filename, sample_size=256)
+    assert not isinstance(rows, list)
+
+    rows = list(rows)
+    assert len(rows) == 1001
+    assert rows[-1] == {"id": "1000", "name": "Ångström"}
+
+
+def test_latin1_encoding(tmp_path, monkeypatch):
+    """Test reading and describing a file whose encoding is detected poorly."""
+
+    # Few non-ASCII characters, as in names, are detected with a very low
+    # confidence, possibly as an unrelated encoding
+    names = ["Ana", "Bjørn", "Céline", "Dário", "Günther", "Iñigo"]
+    lines = ["id;name"] + [f"{idx};{names[idx % 6]} {idx}" for idx in range(3000)]
+    filename = tmp_path / "names.csv"
+    filename.write_text("\n".join(lines) + "\n", encoding="latin-1")
+
+    rows = tasyba.read_tabular(filename)
+    assert rows[1] == {"id": "1", "name": "Bjørn 1"}
+
+    monkeypatch.chdir(tmp_path)
+    resource = tasyba.describe_resource("names.csv", validate=True)
+    assert resource.read_rows()[1]["name"] == "Bjørn 1"
@@ -0,0 +1,63 @@
+"""
+test_compress
+=============
+
+Tests for precompressing output files.
+"""
+
+# Import Python standard libraries
+import gzip
+
+# Import the library
+import tasyba
+from tasyba.__main__ import main
+from tasyba.compress import compress_file, compress_outputs
+
+
+def test_compress_file(tmp_path):
+    """Test writing the compressed sibling of a file."""
+
+    page = tmp_path / "page.html"
+    page.write_text("<p>data</p>" * 1000)
+
+    assert compress_file(page, "gzip")
+    compressed = (tmp_path / "page.html.gz").read_bytes()
+    assert gzip.decompress(compressed) == page.read_bytes()
+
+    # Compressing the same content again gives the same bytes, which are
+    # not written again
+    assert not compress_file(page, "gzip")
+
+
+def test_compress_outputs(tmp_path, monkeypatch):
+    """Test compressing the outputs of a build, skipping unchanged ones."""
+
+    monkeypatch.chdir(tmp_path)
+    for name in ["a.html", "b.json", "c.txt"]:
+        (tmp_path / name).write_text(name * 100)
+
+    manifest = tasyba.BuildManifest()
+    files = ["a.html", "b.json", "c.txt", "missing.html"]
+    assert compress_outputs(files, ["gzip"], manifest) == 2
+    assert sorted(path.name for path in tmp_path.glob("*.gz")) == [
+        "a.html.gz",
+        "b.json.gz",
+    ]
+
+    # Unchanged files are not compressed again
+    assert compress_outputs(files, ["gzip"], manifest) == 0
+
+
+def test_compress_cli(tmp_path, monkeypatch, deploy_script):
+    """Test requesting compressed outputs from the command line."""
+
+    monkeypatch.chdir(tmp_path)
+    script_path = deploy_script()
+
+    main(["--compress-formats", "gzip", str(script_path)])
+    assert (tmp_path / "countries.html.gz").exists()
+    assert not (tmp_path / "countries.html.br").exists()
+
+    (tmp_path / "countries.html.gz").unlink()
+    main(["--force", "--compress", str(script_path)])
+    assert (tmp_path / "countries.html.gz").exists()
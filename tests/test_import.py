@@ -0,0 +1,50 @@
+"""
+test_import
+===========
+
+Tests for the lazy loading of the package namespace.
+"""
+
+# Import Python standard libraries
+import json
+import subprocess
+import sys
+
+# Import 3rd-party libraries
+import pytest
+
+# Import the library
+import tasyba
+
+# Dependencies that are slow to import
+SLOW_MODULES = ["chardet", "frictionless", "jinja2", "yaml"]
+
+
+def loaded_modules(code):
+    """Run code in a fresh interpreter, returning the slow modules it loaded."""
+
+    check = f"import sys, json; {code}; print(json.dumps(sorted(sys.modules)))"
+    output = subprocess.run(
+        [sys.executable, "-c", check], check=True, stdout=subprocess.PIPE
+    ).stdout
+    modules = json.loads(output)
+
+    return [module for module in SLOW_MODULES if module in modules]
+
+
+def test_import_is_lazy():
+    """Test that slow dependencies are only imported when needed."""
+
+    assert loaded_modules("import tasyba") == []
+    assert loaded_modules("import tasyba; tasyba.Table") == []
+    assert loaded_modules("import tasyba; tasyba.caller") == ["jinja2", "yaml"]
+
+
+def test_lazy_namespace():
+    """Test that the lazy namespace exposes the public functions."""
+
+    assert tasyba.read_table is tasyba.common.read_table
+    assert set(tasyba.__all__) <= set(dir(tasyba))
+
+    with pytest.raises(AttributeError):
+        tasyba.not_a_function
@@ -0,0 +1,88 @@
+"""
+test_inference
+==============
+
+Tests for inferring the types of table columns.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import pickle
+
+# Import 3rd-party libraries
+import pytest
+
+# Import the library
+import tasyba
+from tasyba import inference
+from tasyba.table import TypedValues
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize(
+    "values,expected",
+    [
+        (["1", "-2", "+3", ""], "integer"),
+        (["1", "2.5", ".5", "1e-3"], "number"),
+        (["1", "nan"], "string"),
+        (["1", "--2"], "string"),
+        (["true", "False", "1"], "boolean"),
+        (["2020-01-31", "1999-12-01"], "date"),
+        (["2020-02-30"], "string"),
+        (["2020-1-31"], "string"),
+        (["", None], "string"),
+    ],
+)
+def test_infer_type(values, expected):
+    """Test inferring the type of a column from its values."""
+
+    assert inference.infer_type(values) == expected
+
+
+def test_infer_categorical():
+    """Test inferring categorical columns from the number of rows."""
+
+    assert inference.infer_type(["a", "b"], nrows=10) == "categorical"
+    assert inference.infer_type(["a", "b"], nrows=2) == "string"
+
+
+def test_typed_values():
+    """Test storing the values of numeric columns in typed arrays."""
+
+    values = inference.typed_values(["7", "", "-12"], "integer")
+    assert list(values) == ["7", "", "-12"]
+    assert values.tolist() == [7, None, -12]
+    assert values.array.typecode == "q"
+
+    assert list(inference.typed_values(["1.5", "1e-05"], "number")) == ["1.5", "1e-05"]
+
+    # Values whose representation would change are kept as strings
+    assert inference.typed_values(["07"], "integer") is None
+    assert inference.typed_values(["1.50"], "number") is None
+    assert inference.typed_values([str(2**64)], "integer") is None
+
+
+def test_read_table_typed():
+    """Test that tables are read with typed columns."""
+
+    rows = tasyba.read_tabular(TEST_DATA_PATH / "countries.csv")
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+
+    assert isinstance(table.column("population").values, TypedValues)
+    assert list(table) == rows
+    assert list(pickle.loads(pickle.dumps(table))) == rows
+    assert inference.infer_schema(table) == {
+        "fields": [
+            {"name": "id", "type": "integer"},
+            {"name": "neighbor_id", "type": "integer"},
+            {"name": "name", "type": "string"},
+            {"name": "population", "type": "integer"},
+        ]
+    }
+
+    # Appending to a typed column stores its values as strings again
+    table.append({"id": "x"})
+    assert table[-1]["id"] == "x"
+    assert table[0]["id"] == "1"
@@ -0,0 +1,77 @@
+"""
+test_instrument
+===============
+
+Tests for the profiling of build stages.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import json
+
+# Import the library
+import tasyba
+from tasyba.__main__ import main
+from tasyba.instrument import stage
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_stage_inactive():
+    """Test that stages record nothing when no profiler is active."""
+
+    with stage("noop") as record:
+        record["rows"] = 1
+
+    assert record == {"rows": 1}
+
+
+def test_profile_caller(tmp_path, monkeypatch, deploy_script):
+    """Test profiling the steps of a deployment script."""
+
+    monkeypatch.chdir(tmp_path)
+    script_path = deploy_script()
+
+    with tasyba.Profiler(dump_dir=tmp_path / "dumps") as profiler:
+        tasyba.caller(script_path)
+
+    steps = [record for record in profiler.records if record["depth"] == 0]
+    assert [record["name"] for record in steps] == [
+        "add_resource",
+        "add_resource",
+        "field_remove",
+        "table_deploy",
+        "table_deploy",
+    ]
+    assert [record["rows"] for record in steps] == [5, 12, None, 5, 12]
+
+    reads = [record for record in profiler.records if record["name"] == "read_table"]
+    assert reads[0]["bytes_read"] == (TEST_DATA_PATH / "countries.csv").stat().st_size
+    assert all(record["wall"] >= 0 for record in profiler.records)
+    assert all(record["peak_memory"] >= 0 for record in profiler.records)
+
+    pages = [record for record in profiler.records if record["name"] == "build_html"]
+    assert pages[0]["bytes_written"] == Path("countries.html").stat().st_size
+
+    # One dump per step, and a report with one line per stage
+    assert len(list((tmp_path / "dumps").glob("*.prof"))) == len(steps)
+    assert len(profiler.report().splitlines()) == len(profiler.records) + 1
+
+    profiler.save(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json", encoding="utf-8") as handler:
+        assert json.load(handler)["stages"] == profiler.records
+
+
+def test_profile_cli(tmp_path, monkeypatch, deploy_script, capsys):
+    """Test profiling a script from the command line."""
+
+    monkeypatch.chdir(tmp_path)
+    script_path = deploy_script()
+
+    main(["--profile", str(script_path)])
+    assert "table_deploy" in capsys.readouterr().err
+
+    main([str(script_path), "--profile-json", str(tmp_path / "profile.json")])
+    with open(tmp_path / "profile.json", encoding="utf-8") as handler:
+        assert json.load(handler)["stages"]
@@ -0,0 +1,157 @@
+"""
+test_links
+==========
+
+Tests for linking the rows of tables through foreign keys.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import shutil
+
+# Import 3rd-party libraries
+import yaml
+
+# Import the library
+import tasyba
+from tasyba.links import (
+    foreign_keys,
+    key_anchors,
+    key_index,
+    parse_links,
+    resolve_links,
+)
+from tasyba.scheduler import step_names
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_resolve_links():
+    """Test resolving the links of a table to the rows of another one."""
+
+    countries = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    assert key_index(countries.column("id")) == {
+        str(idx): idx - 1 for idx in range(1, 6)
+    }
+
+    tables = {"countries": countries}
+    links = parse_links({"neighbor_id": "countries.id"}, "countries")
+    assert links == {"neighbor_id": ("countries", "id")}
+
+    urls = resolve_links(countries, links, tables, {"countries": (2, "html")})
+    neighbors = [
+        urls["neighbor_id"][code] for code in countries.column("neighbor_id").codes
+    ]
+    assert neighbors == [
+        None,
+        "countries-2.html#id-3",
+        "countries.html#id-2",
+        "countries-3.html#id-5",
+        "countries-2.html#id-4",
+    ]
+
+    # Tables not deployed are not linked, and JSON shards have no anchors
+    assert resolve_links(countries, links, tables, {}) == {}
+    urls = resolve_links(countries, links, tables, {"countries": (2, "json")})
+    assert set(urls["neighbor_id"]) == {None, "countries.html"}
+
+
+def test_key_anchors(tmp_path, monkeypatch):
+    """Test that repeated key values only have an anchor on their first row."""
+
+    table = tasyba.Table.from_rows(
+        [{"id": "a"}, {"id": "b"}, {"id": "a"}, {"id": ""}, {"id": "b"}]
+    )
+    anchors = key_anchors(table, ["id", "missing"])
+    assert anchors == {"id": {0: "id-a", 1: "id-b"}}
+
+    monkeypatch.chdir(tmp_path)
+    template_env = tasyba.load_template({})
+    replaces = {
+        "title": "Test",
+        "description": "Test site",
+        "author": "Test",
+        "favicon": "favicon.ico",
+        "mainlink": "index.html",
+        "citation": "Test",
+    }
+    tasyba.build_html_table(
+        "keys", {"keys": table}, replaces, template_env, anchors=anchors
+    )
+    page = (tmp_path / "keys.html").read_text()
+    assert page.count('id="id-a"') == 1
+    assert page.count('id="id-b"') == 1
+    assert page.count("<td>a</td>") == 1
+
+
+def test_foreign_keys():
+    """Test reading foreign keys from a frictionless descriptor."""
+
+    descriptor = {
+        "schema": {
+            "fields": [{"name": "id"}, {"name": "neighbor_id"}],
+            "foreignKeys": [
+                {
+                    "fields": "neighbor_id",
+                    "reference": {"resource": "", "fields": "id"},
+                },
+                {
+                    "fields": ["a", "b"],
+                    "reference": {"resource": "x", "fields": ["a", "b"]},
+                },
+            ],
+        }
+    }
+    assert foreign_keys(descriptor, "countries") == {"neighbor_id": ("countries", "id")}
+
+    reads, _ = step_names(
+        "table_deploy", {"table": "cities", "links": {"country": "countries.id"}}
+    )
+    assert "table:countries" in reads
+
+
+def test_caller_links(tmp_path, monkeypatch):
+    """Test deploying tables linked through a frictionless schema."""
+
+    monkeypatch.chdir(tmp_path)
+    shutil.copy(TEST_DATA_PATH / "countries.csv", "countries.csv")
+    (tmp_path / "cities.csv").write_text("city,country\nParis,2\nRome,4\nOslo,9\n")
+    schema = {
+        "foreignKeys": [
+            {
+                "fields": "country",
+                "reference": {"resource": "countries", "fields": "id"},
+            }
+        ]
+    }
+    (tmp_path / "cities.yaml").write_text(yaml.dump(schema))
+
+    deploy = {
+        "title": "Test",
+        "description": "Test site",
+        "author": "Test",
+        "favicon": "favicon.ico",
+        "mainlink": "index.html",
+        "citation": "Test",
+    }
+    script = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.csv"}},
+            {"add_resource": {"name": "cities", "source": "cities.csv"}},
+            {"table_deploy": dict(deploy, table="countries", page_size=3)},
+            {"table_deploy": dict(deploy, table="cities", links="cities.yaml")},
+        ]
+    }
+    (tmp_path / "script.yaml").write_text(yaml.dump(script))
+    deployment = tasyba.Deployment(tmp_path / "script.yaml")
+    assert deployment.link_keys() == {"countries": {"id"}}
+
+    deployment.run()
+    cities = (tmp_path / "cities.html").read_text()
+    assert '<a href="countries.html#id-2">2</a>' in cities
+    assert '<a href="countries-2.html#id-4">4</a>' in cities
+    assert "<td>9</td>" in cities
+
+    countries = (tmp_path / "countries-2.html").read_text()
+    assert '<td id="id-4">4</td>' in countries
@@ -0,0 +1,82 @@
+"""
+test_mapped
+===========
+
+Tests for the random access to the rows of memory-mapped tabular files.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import 3rd-party libraries
+import pytest
+
+# Import the library
+import tasyba
+import tasyba.mapped
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_mapped_tabular():
+    """Test random access to the rows of a tabular file."""
+
+    expected = tasyba.read_tabular(TEST_DATA_PATH / "countries.csv")
+
+    with tasyba.MappedTabular(TEST_DATA_PATH / "countries.csv", stride=2) as mapped:
+        assert mapped.fields == ["id", "neighbor_id", "name", "population"]
+        assert len(mapped) == len(expected)
+        assert list(mapped) == expected
+        assert [mapped[k] for k in range(len(mapped))] == expected
+        assert mapped[-1] == expected[-1]
+        assert mapped[1:4] == expected[1:4]
+        assert mapped[::2] == expected[::2]
+        assert mapped.offset(0) == len(b"id,neighbor_id,name,population\n")
+
+        with pytest.raises(IndexError):
+            mapped[len(expected)]
+
+
+def test_mapped_tabular_quoted(tmp_path, monkeypatch):
+    """Test indexing rows with quoted newlines, quotes, and blank lines."""
+
+    # Scan in blocks smaller than the rows, to test rows across blocks
+    monkeypatch.setattr(tasyba.mapped, "SCAN_BLOCK_MIN", 8)
+    monkeypatch.setattr(tasyba.mapped, "SCAN_BLOCK", 16)
+
+    filename = tmp_path / "quoted.csv"
+    filename.write_bytes(
+        b"id,text,note\r\n"
+        b'1,"a\r\nmultiline, quoted value",x\r\n'
+        b"\r\n"
+        b'2,"with ""quotes""\n",y\r\n'
+        b'3,5\'10" tall,"z"\r\n'
+        b'4,"",last'
+    )
+    expected = tasyba.read_tabular(filename)
+    assert len(expected) == 4
+
+    with tasyba.MappedTabular(filename, stride=3) as mapped:
+        assert len(mapped) == 4
+        assert list(mapped) == expected
+        assert [mapped[k] for k in range(4)] == expected
+        assert mapped[2:] == expected[2:]
+
+
+def test_mapped_tabular_large(tmp_path):
+    """Test paging through a tab-separated file larger than the sample."""
+
+    lines = ["id\tname"] + [f"{idx}\tname{idx}" for idx in range(1000)]
+    lines.append("1000\tÅngström")
+    filename = tmp_path / "large.tsv"
+    filename.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    with tasyba.MappedTabular(filename, sample_size=256) as mapped:
+        assert mapped.dialect.delimiter == "\t"
+        assert len(mapped) == 1001
+        assert mapped[500] == {"id": "500", "name": "name500"}
+        assert mapped[990:995] == [
+            {"id": str(idx), "name": f"name{idx}"} for idx in range(990, 995)
+        ]
+        assert mapped[1000] == {"id": "1000", "name": "Ångström"}
@@ -0,0 +1,65 @@
+"""
+test_parse
+==========
+
+Tests for parsing tabular files in parallel.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import 3rd-party libraries
+import pytest
+
+# Import the library
+import tasyba
+import tasyba.parse
+from tasyba.parse import read_table_parallel
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_read_table_parallel(tmp_path, jobs):
+    """Test parsing chunks with quoted newlines, blank lines, and ragged rows."""
+
+    rows = ["id;note;value\n", "\n"]
+    for idx in range(100):
+        note = (
+            f'"line {idx}\nnext; ""quoted""\n"' if idx % 7 == 0 else f"note {idx % 5}"
+        )
+        value = "" if idx % 11 == 0 else f";{idx % 3}"
+        rows.append(f"{idx};{note}{value}{';extra' if idx % 13 == 0 else ''}\n")
+        if idx % 17 == 0:
+            rows.append("\n")
+    (tmp_path / "ragged.csv").write_text("".join(rows))
+
+    # Quotes within unquoted values break the parity of quotes
+    rows.insert(50, "50;5'6\" tall;1\n")
+    (tmp_path / "stray.csv").write_text("".join(rows))
+
+    expected = tasyba.read_table(tmp_path / "ragged.csv", typed=False)
+    table = read_table_parallel(tmp_path / "ragged.csv", jobs=jobs, chunk_size=1)
+    assert table.fields == expected.fields
+    assert list(table) == list(expected)
+    assert table.content_hash() == expected.content_hash()
+
+    expected = tasyba.read_table(tmp_path / "stray.csv", typed=False)
+    table = read_table_parallel(tmp_path / "stray.csv", jobs=jobs, chunk_size=64)
+    assert list(table) == list(expected)
+
+    table = read_table_parallel(tmp_path / "ragged.csv", exclude=["note"], chunk_size=1)
+    assert table.fields == ["id", "value"]
+
+
+def test_read_table_jobs(monkeypatch):
+    """Test reading a table in parallel through `read_table()`."""
+
+    monkeypatch.setattr(tasyba.parse, "PARALLEL_MIN", 0)
+    monkeypatch.setattr(tasyba.parse, "CHUNK_MIN", 16)
+
+    expected = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv", jobs=2)
+    assert table.types == expected.types
+    assert list(table) == list(expected)
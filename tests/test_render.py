@@ -0,0 +1,321 @@
+"""
+test_render
+===========
+
+Tests for rendering tables to HTML.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import json
+import sqlite3
+
+# Import the library
+import tasyba
+from tasyba.render import build_assets
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+# Replacements for rendering test pages
+REPLACES = {
+    "title": "Test",
+    "description": "Test site",
+    "author": "Test",
+    "favicon": "favicon.ico",
+    "mainlink": "index.html",
+    "citation": "Test",
+}
+
+
+def render_countries(tmp_path, monkeypatch, **kwargs):
+    """Render the `countries` test table in a temporary directory."""
+
+    monkeypatch.chdir(tmp_path)
+    tables = {"countries": tasyba.read_table(TEST_DATA_PATH / "countries.csv")}
+    template_env = tasyba.load_template({})
+    tasyba.build_html_table("countries", tables, REPLACES, template_env, **kwargs)
+
+
+def test_shard_html(tmp_path, monkeypatch):
+    """Test splitting a table in HTML pages."""
+
+    render_countries(tmp_path, monkeypatch, page_size=2)
+
+    pages = sorted(path.name for path in tmp_path.glob("*.html"))
+    assert pages == ["countries-2.html", "countries-3.html", "countries.html"]
+
+    first = (tmp_path / "countries.html").read_text()
+    last = (tmp_path / "countries-3.html").read_text()
+    assert "France" in first and "Spain" not in first
+    assert "Spain" in last and "France" not in last
+    assert 'href="countries-2.html">Next<' in first
+    assert 'href="countries-2.html">Previous<' in last
+
+
+def test_shard_json(tmp_path, monkeypatch):
+    """Test writing table rows as JSON chunks."""
+
+    render_countries(tmp_path, monkeypatch, page_size=2, shard_format="json")
+
+    page = (tmp_path / "countries.html").read_text()
+    assert "France" not in page
+    assert "countries-data/3.json" in page
+
+    rows = json.loads((tmp_path / "countries-data" / "3.json").read_text())
+    assert rows == [["5", "4", "Spain", "47"]]
+
+
+def test_shard_shrink(tmp_path, monkeypatch):
+    """Test that rebuilding a smaller table removes its stale shards."""
+
+    monkeypatch.chdir(tmp_path)
+    template_env = tasyba.load_template({})
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    manifest = tasyba.BuildManifest()
+
+    def build(table, shard_format):
+        tasyba.build_html_table(
+            "countries",
+            {"countries": table},
+            REPLACES,
+            template_env,
+            manifest=manifest,
+            page_size=2,
+            shard_format=shard_format,
+        )
+
+    # Pages left by an HTML build are removed, with their compressed copies,
+    # when the table is built as JSON chunks
+    build(table, "html")
+    (tmp_path / "countries-3.html.gz").write_bytes(b"")
+    build(table, "json")
+    assert sorted(path.name for path in tmp_path.glob("countries*.html*")) == [
+        "countries.html"
+    ]
+    assert "countries-3.html" not in manifest.entries
+
+    # Only two rows are left, fitting a single chunk
+    build(tasyba.Table.from_rows(list(table)[:2]), "json")
+    assert [path.name for path in (tmp_path / "countries-data").iterdir()] == ["1.json"]
+    assert "countries-data/3.json" not in manifest.entries
+
+
+def test_stream_if_changed(tmp_path):
+    """Test streaming a file to disk, skipping unchanged contents."""
+
+    filename = tmp_path / "page.html"
+    chunks = ["<p>", "Ångström", "</p>"]
+
+    assert tasyba.manifest.stream_if_changed(filename, iter(chunks)) == (True, 17)
+    assert filename.read_text(encoding="utf-8") == "".join(chunks)
+
+    assert tasyba.manifest.stream_if_changed(filename, iter(chunks)) == (False, 17)
+    assert list(tmp_path.iterdir()) == [filename]
+
+
+def test_build_time(tmp_path, monkeypatch):
+    """Test that incremental builds only show the build time on request."""
+
+    render_countries(tmp_path, monkeypatch, current_time="now")
+    assert "compiled on now" in (tmp_path / "countries.html").read_text()
+
+    render_countries(
+        tmp_path, monkeypatch, manifest=tasyba.BuildManifest(), current_time="now"
+    )
+    assert "compiled on" not in (tmp_path / "countries.html").read_text()
+
+    render_countries(
+        tmp_path,
+        monkeypatch,
+        manifest=tasyba.BuildManifest(timestamp=True),
+        current_time="now",
+    )
+    assert "compiled on now" in (tmp_path / "countries.html").read_text()
+
+
+def test_render_stream(tmp_path, monkeypatch):
+    """Test that streamed pages match the template rendered in memory."""
+
+    render_countries(tmp_path, monkeypatch)
+    page = (tmp_path / "countries.html").read_text()
+
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    template = tasyba.load_template({}).get_template("datatable.html")
+    expected = template.render(
+        tables=[{"name": "countries", "url": "http://"}],
+        file="countries.html",
+        current_time=page.split("compiled on ")[1].split("\n")[0],
+        datatable={
+            "columns": [{"name": field} for field in table.fields],
+            "rows": [
+                [{"value": value, "url": None} for value in row]
+                for row in table.iter_rows()
+            ],
+        },
+        **REPLACES,
+    )
+
+    assert page == expected
+
+
+def test_sql_page(tmp_path, monkeypatch):
+    """Test building the SQL page and its typed, prebuilt database."""
+
+    monkeypatch.chdir(tmp_path)
+    table = tasyba.Table.from_rows(
+        tasyba.read_tabular(TEST_DATA_PATH / "countries.csv")
+        + [{"id": "6", "neighbor_id": "", "name": "Côte d'Ivoire", "population": "x"}]
+    )
+    schema = tasyba.describe_resource(TEST_DATA_PATH / "countries.csv").schema
+
+    tasyba.build_sql_page(
+        {"countries": table},
+        REPLACES,
+        tasyba.load_template({}),
+        schemata={"countries": schema},
+    )
+
+    page = (tmp_path / "sql.html").read_text()
+    assert "INSERT" not in page
+    assert 'fetch("database.sqlite")' in page
+
+    connection = sqlite3.connect(tmp_path / "database.sqlite")
+    rows = connection.execute("SELECT * FROM countries ORDER BY id").fetchall()
+    assert rows[0] == (1, None, "Britain", 67)
+    assert rows[-1] == (6, None, "Côte d'Ivoire", "x")
+
+    columns = connection.execute("PRAGMA table_info(countries)").fetchall()
+    assert [column[2] for column in columns] == [
+        "INTEGER",
+        "INTEGER",
+        "TEXT",
+        "INTEGER",
+    ]
+
+
+def test_template_cache(tmp_path, monkeypatch):
+    """Test that template environments are shared and compiled templates cached."""
+
+    render_countries(tmp_path, monkeypatch)
+
+    template_env = tasyba.load_template({})
+    assert tasyba.load_template({}) is template_env
+    assert not template_env.auto_reload
+
+    # Templates used for the page are stored compiled next to the output
+    cache_path = tmp_path / ".tasyba-cache" / "jinja"
+    assert len(list(cache_path.glob("*.cache"))) >= 2
+
+
+def test_parallel_render(tmp_path, monkeypatch):
+    """Test that rendering tables in parallel matches a serial build."""
+
+    tables = {
+        "countries": tasyba.read_table(TEST_DATA_PATH / "countries.csv"),
+        "pivot": tasyba.read_table(TEST_DATA_PATH / "transform-pivot.csv"),
+    }
+    deploys = [
+        ("countries", REPLACES, {}, {}),
+        ("pivot", REPLACES, {}, {"page_size": 5}),
+    ]
+
+    outputs = []
+    for jobs in [1, 2]:
+        output_path = tmp_path / f"jobs{jobs}"
+        output_path.mkdir()
+        monkeypatch.chdir(output_path)
+        manifest = tasyba.BuildManifest()
+        tasyba.build_html_tables(
+            deploys, tables, manifest=manifest, current_time="now", jobs=jobs
+        )
+        outputs.append(
+            (
+                {path.name: path.read_bytes() for path in output_path.glob("*.html")},
+                manifest.entries,
+            )
+        )
+
+    assert len(outputs[0][0]) == 4
+    assert outputs[0] == outputs[1]
+
+
+def test_build_assets(tmp_path, monkeypatch):
+    """Test that assets are fingerprinted and referenced by pages."""
+
+    monkeypatch.chdir(tmp_path)
+    template_env = tasyba.load_template({})
+    assets = build_assets(template_env, REPLACES)
+
+    assert json.loads((tmp_path / "assets.json").read_text()) == assets
+    assert (tmp_path / assets["main.css"]).read_text() == template_env.get_template(
+        "main.css"
+    ).render(**REPLACES)
+
+    tables = {"countries": tasyba.read_table(TEST_DATA_PATH / "countries.csv")}
+    replaces = dict(REPLACES, assets=assets)
+    tasyba.build_html_table("countries", tables, replaces, template_env)
+    page = (tmp_path / "countries.html").read_text()
+    assert f'<link href="{assets["main.css"]}" rel="stylesheet">' in page
+
+    # Assets of previous builds that are no longer listed are removed
+    for name in ["main.0000abcd.css", "main.0000abcd.css.gz"]:
+        (tmp_path / name).write_text("old")
+    (tmp_path / "assets.json").write_text(json.dumps({"main.css": "main.0000abcd.css"}))
+    assert build_assets(template_env, REPLACES) == assets
+    assert not list(tmp_path.glob("main.0000abcd.*"))
+    assert (tmp_path / assets["main.css"]).exists()
+
+
+def test_search_page(tmp_path, monkeypatch):
+    """Test that pages with a search index link to it."""
+
+    render_countries(tmp_path, monkeypatch, search=True)
+    page = (tmp_path / "countries.html").read_text()
+
+    assert 'id="table_search"' in page
+    assert '"url": "countries-search"' in page
+    assert (tmp_path / "countries-search" / "index.json").exists()
+
+
+def test_render_body(tmp_path, monkeypatch):
+    """Test that the rendered body matches the cells, with links and escaping."""
+
+    monkeypatch.chdir(tmp_path)
+    rows = [{"id": "1", "name": "a & <b>"}, {"id": "2", "name": "c"}] * 3
+    table = tasyba.Table.from_rows(rows)
+    links = {"name": ["other.html#x", None, None]}
+    anchors = {"id": {0: "id-1", 1: "id-2"}}
+    template_env = tasyba.load_template({})
+    tasyba.build_html_table(
+        "t", {"t": table}, REPLACES, template_env, links=links, anchors=anchors
+    )
+    page = (tmp_path / "t.html").read_text()
+
+    assert '<td id="id-1">1</td>' in page
+    assert '<td><a href="other.html#x">a &amp; &lt;b&gt;</a></td>' in page
+    assert "<td>c</td>" in page
+
+    # The body is the one of the template loop, also for escaped values
+    rows = [{"id": "1", "name": "a & <b>"}, {"id": "2", "name": "\"c\" 'd'"}] * 3
+    table = tasyba.Table.from_rows(rows)
+    links = {"name": ["other.html?a=1&b=2", None]}
+    tasyba.build_html_table(
+        "t", {"t": table}, REPLACES, template_env, links=links, anchors=anchors
+    )
+    page = (tmp_path / "t.html").read_text()
+    expected = template_env.get_template("datatable.html").render(
+        tables=[{"name": "t", "url": "http://"}],
+        file="t.html",
+        current_time=page.split("compiled on ")[1].split("\n")[0],
+        datatable={
+            "columns": [{"name": "id"}, {"name": "name"}],
+            "rows": tasyba.render._iter_cells(
+                table, ["id", "name"], None, None, links, anchors
+            ),
+        },
+        **REPLACES,
+    )
+
+    assert "<td>&#34;c&#34; &#39;d&#39;</td>" in page
+    assert page == expected
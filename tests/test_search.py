@@ -0,0 +1,56 @@
+"""
+test_search
+===========
+
+Tests for building client-side search indexes.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import json
+
+# Import the library
+import tasyba
+from tasyba.search import build_postings, build_search_index, encode_rows, shard_name
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_build_postings():
+    """Test building the posting lists of the tokens of a table."""
+
+    table = tasyba.Table.from_rows(
+        [
+            {"name": "New York", "state": "New York"},
+            {"name": "Newark", "state": "New Jersey"},
+            {"name": "York", "state": "Pennsylvania"},
+        ]
+    )
+    postings = build_postings(table, table.fields)
+
+    assert list(postings["new"]) == [0, 1]
+    assert list(postings["york"]) == [0, 2]
+    assert list(postings["newark"]) == [1]
+    assert encode_rows([3, 5, 10]) == [3, 2, 5]
+
+
+def test_build_search_index(tmp_path, monkeypatch):
+    """Test writing the sharded search index of a table."""
+
+    monkeypatch.chdir(tmp_path)
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+
+    manifest = tasyba.BuildManifest()
+    url = build_search_index("countries", table, manifest=manifest)
+    index = json.loads((tmp_path / url / "index.json").read_text())
+    assert index["rows"] == len(table)
+
+    shard = json.loads((tmp_path / url / f"{shard_name('france')}.json").read_text())
+    assert shard == {"france": [1]}
+    assert len(list((tmp_path / url).glob("*.json"))) == len(index["shards"]) + 1
+
+    # Shards of tokens no longer in the table are removed
+    table.remove_fields(["name"])
+    build_search_index("countries", table, manifest=manifest)
+    assert not (tmp_path / url / f"{shard_name('france')}.json").exists()
@@ -0,0 +1,63 @@
+"""
+test_table
+==========
+
+Tests for the column-oriented table representation.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+
+# Import the library
+import tasyba
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def test_table_roundtrip():
+    """Test that a table returns the rows it was built from."""
+
+    rows = tasyba.read_tabular(TEST_DATA_PATH / "transform-pivot.csv")
+    table = tasyba.Table.from_rows(rows)
+
+    assert len(table) == len(rows)
+    assert table.fields == ["region", "gender", "style", "units"]
+    assert list(table) == rows
+    assert table[-1] == rows[-1]
+
+    # Values are dictionary encoded, so each distinct one is stored once
+    assert sorted(table.column("region").values) == ["east", "west"]
+
+
+def test_table_remove_fields():
+    """Test removing fields from a table."""
+
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    table.remove_fields(["neighbor_id", "population"])
+
+    assert table.fields == ["id", "name"]
+    assert table[1] == {"id": "2", "name": "France"}
+    assert list(table.iter_rows(["name"]))[2] == ("Germany",)
+
+
+def test_column_widening():
+    """Test that dictionary codes are widened as distinct values grow."""
+
+    column = tasyba.table.Column(str(idx) for idx in range(70000))
+
+    assert column.codes.typecode == "I"
+    assert column[300] == "300"
+    assert list(column)[-1] == "69999"
+
+
+def test_column_extend():
+    """Test appending the rows of a column to another one."""
+
+    column = tasyba.table.Column(["a", "b", "a"])
+    column.extend(tasyba.table.Column(["a", "c"]))
+    column.extend(tasyba.table.Column(str(idx) for idx in range(300)))
+
+    assert column.codes.typecode == "H"
+    assert list(column) == ["a", "b", "a", "a", "c"] + [str(idx) for idx in range(300)]
+    assert column.values[:3] == ["a", "b", "c"]
@@ -0,0 +1,105 @@
+"""
+test_transpose
+==============
+
+Tests for transposing tables out of core.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import io
+
+# Import 3rd-party libraries
+import pytest
+import yaml
+
+# Import the library
+import tasyba
+from tasyba.transpose import transpose_rows, transpose_table
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+@pytest.mark.parametrize("block_size", [1, 2, 10])
+def test_transpose_rows(block_size):
+    """Test transposing rows in blocks of different sizes."""
+
+    rows = [
+        ["name", "note", "value"],
+        ["a", 'say "hi", bye', "1"],
+        ["b", None],
+        ["c", "multi\nline", "3", "extra"],
+    ]
+    output = io.BytesIO()
+    assert transpose_rows(rows, output, block_size) == (3, 4)
+    assert output.getvalue().decode("utf-8").split("\r\n") == [
+        "name,a,b,c",
+        'note,"say ""hi"", bye",,"multi\nline"',
+        "value,1,,3",
+        "",
+    ]
+
+
+def test_transpose_table():
+    """Test that transposing a table twice restores it."""
+
+    table = tasyba.read_table(TEST_DATA_PATH / "countries.csv")
+    transposed = transpose_table(table, block_size=7)
+    assert len(transposed) == len(table.fields) - 1
+    assert transposed.fields[0] == table.fields[0]
+
+    restored = transpose_table(transposed, block_size=3)
+    assert restored.fields == table.fields
+    assert list(restored) == list(table)
+
+
+def test_script_transpose():
+    """Test that scripts type transposed values as their original fields."""
+
+    config = {
+        "steps": [
+            {"add_resource": {"name": "pivot", "source": "transform-pivot.csv"}},
+            {"table_transpose": {"name": "pivot", "block_size": 4}},
+        ]
+    }
+    resource = tasyba.run_makefile(config, TEST_DATA_PATH).get_resource("pivot")
+    rows = resource.read_rows()
+
+    # Columns mixing values of different fields are typed `any`, as when
+    # transposing the typed values, and keep the values of numeric fields
+    # as numbers
+    assert [field.type for field in resource.schema.fields[:3]] == [
+        "string",
+        "any",
+        "any",
+    ]
+    assert rows[0]["east"] == "boy"
+    assert rows[2]["region"] == "units"
+    assert rows[2]["east"] == 12
+
+
+def test_caller_transpose(tmp_path, monkeypatch):
+    """Test transposing a table in a deployment script."""
+
+    monkeypatch.chdir(tmp_path)
+    script = {
+        "steps": [
+            {
+                "add_resource": {
+                    "name": "pivot",
+                    "source": str(TEST_DATA_PATH / "transform-pivot.csv"),
+                }
+            },
+            {"table_transpose": {"name": "pivot", "block_size": 4}},
+        ]
+    }
+    (tmp_path / "script.yaml").write_text(yaml.dump(script))
+    deployment = tasyba.Deployment(tmp_path / "script.yaml")
+    deployment.run()
+
+    # Repeated values of the first field are numbered, as in frictionless
+    transposed = deployment.tables["pivot"]
+    assert transposed.fields[:3] == ["region", "east", "east2"]
+    assert transposed.fields[6:9] == ["east6", "west", "west2"]
+    assert [row["region"] for row in transposed] == ["gender", "style", "units"]
@@ -0,0 +1,114 @@
+"""
+test_watcher
+============
+
+Tests for rebuilding a site as its files change.
+"""
+
+# Import Python standard libraries
+from pathlib import Path
+import os
+import shutil
+
+# Import 3rd-party libraries
+import yaml
+
+# Import the library
+import tasyba
+from tasyba.render import template_dir
+
+# Obtain the path to the test data
+TEST_DATA_PATH = Path(__file__).parent / "data"
+
+
+def touch(filename, content):
+    """Write a file, making sure its modification time changes."""
+
+    stats = filename.stat()
+    filename.write_text(content)
+    os.utime(filename, ns=(stats.st_atime_ns, stats.st_mtime_ns + 10**9))
+
+
+def write_watched_script(path):
+    """Write a deployment script reading copies of the test data."""
+
+    shutil.copytree(template_dir({}), path / "templates")
+    for source in ["countries.csv", "transform-pivot.csv"]:
+        shutil.copy(TEST_DATA_PATH / source, path / source)
+
+    deploy = {
+        "template_path": str(path / "templates"),
+        "title": "Test",
+        "description": "Test site",
+        "author": "Test",
+        "favicon": "favicon.ico",
+        "mainlink": "index.html",
+        "citation": "Test",
+    }
+    script = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.csv"}},
+            {"add_resource": {"name": "pivot", "source": "transform-pivot.csv"}},
+            {"field_remove": {"table": "pivot", "fields": ["style"]}},
+            {"table_deploy": dict(deploy, table="countries")},
+            {"table_deploy": dict(deploy, table="pivot")},
+        ]
+    }
+    script_path = path / "script.yaml"
+    script_path.write_text(yaml.dump(script))
+
+    return script_path
+
+
+def test_watcher(tmp_path, monkeypatch):
+    """Test that changes only run the steps they affect."""
+
+    monkeypatch.chdir(tmp_path)
+    watcher = tasyba.Watcher(write_watched_script(tmp_path))
+
+    assert watcher.poll() == {0, 1, 2, 3, 4}
+    assert watcher.poll() == set()
+
+    # Changing a source runs its pages again, and those listing it
+    source = tmp_path / "countries.csv"
+    touch(source, source.read_text() + "\n6,,Atlantis,0")
+    assert watcher.poll() == {0, 3, 4}
+    assert "Atlantis" in (tmp_path / "countries.html").read_text()
+
+    # Changing the source of a modified table loads it again
+    source = tmp_path / "transform-pivot.csv"
+    touch(source, source.read_text())
+    assert watcher.poll() == {1, 2, 3, 4}
+
+    # Changing a template only renders the pages again
+    template = tmp_path / "templates" / "datatable.html"
+    touch(template, template.read_text().replace("</table>", "</table><!-- x -->"))
+    assert watcher.poll() == {3, 4}
+    assert "<!-- x -->" in (tmp_path / "pivot.html").read_text()
+
+    # Errors are reported, and the failed steps run again on the next change
+    source.unlink()
+    assert watcher.poll() == set()
+    shutil.copy(TEST_DATA_PATH / "transform-pivot.csv", source)
+    assert watcher.poll() == {1, 2, 3, 4}
+
+
+def test_affected_steps(tmp_path):
+    """Test computing the steps affected by changed files."""
+
+    script = {
+        "steps": [
+            {"add_resource": {"name": "countries", "source": "countries.csv"}},
+            {"table_deploy": {"table": "countries"}},
+            {"field_remove": {"table": "countries", "fields": ["name"]}},
+        ]
+    }
+    script_path = tmp_path / "script.yaml"
+    script_path.write_text(yaml.dump(script))
+    deployment = tasyba.Deployment(script_path)
+
+    # Templates are only read by deploy steps; as the table is modified
+    # after being deployed, it must be loaded again
+    template = template_dir({}) / "datatable.html"
+    assert deployment.affected_steps([template]) == {0, 1, 2}
+    assert deployment.affected_steps([tmp_path / "other.csv"]) == set()